@@ -0,0 +1,118 @@
+"""
+Cache dei risultati di analisi indirizzata per contenuto.
+La chiave è lo SHA-256 di tutti gli input che determinano il risultato:
+hash del video, altezza e massa, fps, soglie del JumpAnalyzer, parametri di
+MediaPipe, file analizzato (originale o proxy) e versione del codice di analisi.
+Stessi input -> stessi risultati: calibrazione e analisi vengono saltate.
+
+Ogni voce è un file <chiave>.bin nel formato di series_codec (metadati JSON +
+traiettoria/velocità float32). I risultati sono salvati senza gli id della run
+(trace, profilo): il trace dell'analisi originale è a parte in 'trace_id'. L'ultimo uso è la data di modifica del file
+(aggiornata a ogni lettura); oltre MAX_ENTRIES si cancellano le voci più vecchie.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import series_codec
+
+CACHE_VERSION = 1  # Da incrementare se cambia il contenuto salvato nelle voci
+MAX_ENTRIES = 200
+RUN_FIELDS = ('trace_id', 'profile_id')  # Id della singola run, non parte del risultato
+
+
+def code_version(modules):
+    """Impronta dei sorgenti dei moduli di analisi (eseguibile congelato: solo CACHE_VERSION)"""
+    digest = hashlib.sha256(str(CACHE_VERSION).encode('ascii'))
+    for module in modules:
+        path = getattr(module, '__file__', None)
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except (OSError, TypeError):
+            digest.update(getattr(module, '__name__', '').encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def cache_key(**inputs):
+    """Chiave deterministica dagli input dell'analisi"""
+    canonical = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, folder, max_entries=MAX_ENTRIES):
+        self.folder = folder
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.bin")
+
+    def get(self, key):
+        """Voce in cache: {'calibration', 'final_results', 'trace_id', 'trajectory', 'velocity'} oppure None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                meta, series = series_codec.unpack(f.read())
+            os.utime(path)  # Aggiorna l'ultimo uso (LRU)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return {**meta, **series}
+
+    def put(self, key, calibration, final_results, trajectory, velocity, trace_id=None):
+        os.makedirs(self.folder, exist_ok=True)
+        final_results = {name: value for name, value in final_results.items() if name not in RUN_FIELDS}
+        payload = series_codec.pack({'calibration': calibration, 'final_results': final_results, 'trace_id': trace_id},
+                                    {'trajectory': trajectory, 'velocity': velocity})
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.bin'):
+                continue
+            try:
+                entries.append((os.path.getmtime(os.path.join(self.folder, name)), name))
+            except OSError:
+                pass
+        return entries
+
+    def _evict(self):
+        with self.lock:
+            entries = sorted(self._entries())
+            for _, name in entries[:max(0, len(entries) - self.max_entries)]:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self.lock:
+            for _, name in self._entries():
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self._entries()), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,251 @@
+"""
+Trace per frame dell'analisi e replay deterministico.
+
+Durante analysis_loop ogni frame decodificato aggiunge un record a dimensione fissa:
+
+    header:  b'JTRC' | uint16 LE versione | uint32 LE lunghezza | metadati JSON
+             (fps, altezza frame, rapporto cm/px, soglie, statura, massa, ...)
+    record:  t float64 | hip_y float64 | altezza cm float32 | velocità float32
+             | rilevato uint8 | stato uint8 | flag fasi uint8 | riservato uint8
+             | 33 landmark x, y, z, visibility float32
+
+Il file è solo in append (scritto a blocchi): un'analisi interrotta lascia un
+prefisso valido e la lettura scarta l'eventuale record finale incompleto.
+
+Il replay ripete JumpAnalyzer.process_frame sui frame rilevati con gli stessi
+timestamp e quote (float64, quindi stesso risultato dell'analisi originale),
+senza decodifica né inferenza: migliaia di frame al secondo, anche con soglie diverse.
+"""
+
+import json
+import os
+import shutil
+import struct
+import threading
+import uuid
+from datetime import datetime
+from functools import lru_cache
+
+from jump_analyzer import JumpAnalyzer
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+MAGIC = b'JTRC'
+VERSION = 1
+LANDMARKS = 33
+FLUSH_EVERY = 64  # Record in memoria prima della scrittura
+TRACE_EXTENSION = '.trace'
+
+
+@lru_cache(maxsize=1)
+def record_dtype():
+    """dtype del record (creato al primo uso: NumPy non è importato all'avvio)"""
+    return np.dtype([
+        ('t', '<f8'),
+        ('hip_y', '<f8'),
+        ('height', '<f4'),
+        ('velocity', '<f4'),
+        ('detected', 'u1'),
+        ('status', 'u1'),
+        ('flags', 'u1'),
+        ('reserved', 'u1'),
+        ('landmarks', '<f4', (LANDMARKS, 4)),
+    ])
+
+
+# Stato restituito da process_frame <-> codice nel record (0 = frame senza persona)
+STATUS_CODES = {'calibrazione_baseline': 1, 'pronto': 2, 'attesa_calibrazione': 3, 'analisi': 4}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+# Bit dei flag: stato del rilevamento dopo il frame
+FLAG_JUMP_STARTED = 1
+FLAG_JUMP_ENDED = 2
+FLAG_CONTACT_START = 4
+FLAG_CONTACT_END = 8
+FLAG_ECCENTRIC = 16
+FLAG_CONCENTRIC = 32
+
+
+def phase_flags(analyzer):
+    return ((FLAG_JUMP_STARTED if analyzer.jump_started else 0)
+            | (FLAG_JUMP_ENDED if analyzer.jump_ended else 0)
+            | (FLAG_CONTACT_START if analyzer.contact_start_frame is not None else 0)
+            | (FLAG_CONTACT_END if analyzer.contact_end_frame is not None else 0)
+            | (FLAG_ECCENTRIC if analyzer.eccentric_start_frame is not None else 0)
+            | (FLAG_CONCENTRIC if analyzer.concentric_start_frame is not None else 0))
+
+
+class TraceWriter:
+    """Scrittura in append dei record di un'analisi"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.trace_id = meta.get('trace_id')
+        self.lock = threading.Lock()
+        self.pending = []
+        self.frames = 0
+        header = json.dumps(meta, separators=(',', ':'), default=str).encode('utf-8')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + struct.pack('<HI', VERSION, len(header)) + header)
+
+    def append(self, t, landmarks=None, hip_y=None, status=None, height=None, analyzer=None):
+        """Un record per frame; landmarks None = nessuna persona rilevata"""
+        record = np.zeros(1, record_dtype())
+        record['t'] = t
+        record['hip_y'] = np.nan if hip_y is None else hip_y
+        record['height'] = np.nan if height is None else height
+        record['velocity'] = np.nan
+        if landmarks is not None:
+            record['detected'] = 1
+            record['landmarks'][0] = [(point.x, point.y, point.z, point.visibility) for point in landmarks]
+        if status is not None:
+            record['status'] = STATUS_CODES.get(status, 0)
+        if analyzer is not None:
+            record['flags'] = phase_flags(analyzer)
+            if status == 'analisi' and analyzer.hip_velocities:
+                record['velocity'] = analyzer.hip_velocities[-1]
+        with self.lock:
+            self.pending.append(record.tobytes())
+            self.frames += 1
+            if len(self.pending) >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        if self.pending and not self.file.closed:
+            self.file.write(b''.join(self.pending))
+            self.file.flush()
+        self.pending = []
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.file.close()
+
+
+def read_trace(path):
+    """(metadati, array strutturato record_dtype()) di un file di trace"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError('File di trace non valido')
+    version, length = struct.unpack_from('<HI', data, 4)
+    if version != VERSION:
+        raise ValueError(f"Versione del trace non supportata: {version}")
+    offset = 10 + length
+    meta = json.loads(data[10:offset].decode('utf-8'))
+    record = record_dtype()
+    count = (len(data) - offset) // record.itemsize
+    return meta, np.frombuffer(data, dtype=record, count=count, offset=offset)
+
+
+def run_analyzer(analyzer, times, hip_ys):
+    """
+    Quote dell'anca -> (traiettoria, velocità, stati) raccolte come in analyze_pose_results.
+    Condiviso da replay e dagli strumenti di benchmark.
+    """
+    trajectory, velocity, statuses = [], [], []
+    for t, hip_y in zip(times, hip_ys):
+        status, height = analyzer.process_frame(hip_y, t)
+        statuses.append(status)
+        if status != "analisi":
+            continue
+        trajectory.append({'t': round(t, 3), 'y': round(height, 2)})
+        if analyzer.hip_velocities:
+            velocity.append({'t': round(t, 3), 'v': round(analyzer.hip_velocities[-1], 2)})
+    return trajectory, velocity, statuses
+
+
+def replay(meta, records, thresholds=None):
+    """
+    Ripete il JumpAnalyzer sui frame rilevati del trace.
+    thresholds: soglie da sostituire a quelle registrate (None = replay identico).
+    Restituisce (analyzer, traiettoria, velocità, consistente), dove consistente indica
+    che gli stati per frame e i flag delle fasi finali coincidono con quelli registrati.
+    """
+    analyzer = JumpAnalyzer(fps=meta['fps'], thresholds={**meta.get('thresholds', {}), **(thresholds or {})})
+    analyzer.pixel_to_cm_ratio = meta['pixel_to_cm_ratio']
+    analyzer.calibrated_with_height = True
+    analyzer.person_height_cm = meta.get('person_height_cm')
+
+    detected = records[records['detected'] == 1]
+    trajectory, velocity, statuses = run_analyzer(analyzer, detected['t'].tolist(), detected['hip_y'].tolist())
+    replayed = np.array([STATUS_CODES.get(status, 0) for status in statuses], dtype='u1')
+    consistent = bool(np.array_equal(replayed, detected['status']))
+    if consistent and detected.size:
+        consistent = int(detected['flags'][-1]) == phase_flags(analyzer)
+    return analyzer, trajectory, velocity, consistent
+
+
+class TraceStore:
+    """
+    Cartella dei trace (<id>.trace), con i più vecchi cancellati oltre max_traces.
+    I trace dei salti salvati sono copiati in keep_folder (mai cancellati) e
+    restano disponibili per replay e sweep dei parametri.
+    """
+
+    def __init__(self, folder, max_traces=50, keep_folder=None):
+        self.folder = folder
+        self.max_traces = max_traces
+        self.keep_folder = keep_folder
+
+    def new_id(self):
+        return f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+    def path(self, trace_id):
+        """Percorso del trace (nella cartella dei salvati se presente), None se l'id non è valido"""
+        if not trace_id or not all(c.isalnum() or c == '_' for c in trace_id):
+            return None
+        filename = f"{trace_id}{TRACE_EXTENSION}"
+        if self.keep_folder and os.path.exists(os.path.join(self.keep_folder, filename)):
+            return os.path.join(self.keep_folder, filename)
+        return os.path.join(self.folder, filename)
+
+    def open(self, trace_id, meta):
+        writer = TraceWriter(self.path(trace_id), {**meta, 'trace_id': trace_id})
+        self._evict()
+        return writer
+
+    def keep(self, trace_id):
+        """Copia il trace tra quelli dei salti salvati; False se non esiste più"""
+        path = self.path(trace_id)
+        if not self.keep_folder or not path or not os.path.exists(path):
+            return False
+        if os.path.dirname(path) != self.keep_folder:
+            os.makedirs(self.keep_folder, exist_ok=True)
+            shutil.copyfile(path, os.path.join(self.keep_folder, os.path.basename(path)))
+        return True
+
+    def _entries(self, folder, kept):
+        entries = []
+        try:
+            names = os.listdir(folder)
+        except (OSError, TypeError):
+            return entries
+        for name in names:
+            if not name.endswith(TRACE_EXTENSION):
+                continue
+            try:
+                stat = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            entries.append({'trace_id': name[:-len(TRACE_EXTENSION)], 'size': stat.st_size,
+                            'modified': stat.st_mtime, 'kept': kept})
+        return entries
+
+    def list(self):
+        """Trace disponibili, dal più recente: [{'trace_id', 'size', 'modified', 'kept'}]"""
+        kept = self._entries(self.keep_folder, True)
+        kept_ids = {entry['trace_id'] for entry in kept}
+        traces = kept + [entry for entry in self._entries(self.folder, False) if entry['trace_id'] not in kept_ids]
+        traces.sort(key=lambda trace: trace['modified'], reverse=True)
+        return traces
+
+    def _evict(self):
+        recent = sorted(self._entries(self.folder, False), key=lambda trace: trace['modified'], reverse=True)
+        for trace in recent[self.max_traces:]:
+            try:
+                os.remove(os.path.join(self.folder, f"{trace['trace_id']}{TRACE_EXTENSION}"))
+            except OSError:
+                pass
@@ -3,22 +3,55 @@ Flask Backend Ottimizzato per Jump Analyzer Pro
 Miglioramenti: Lazy loading dei modelli AI, caching, gestione errori, performance
 """
 
-from flask import Flask, request, jsonify, send_file
-from flask_cors import CORS
-import cv2
-import mediapipe as mp
-import numpy as np
 import time
+STARTUP_T0 = time.perf_counter()  # Riferimento dei tempi di avvio riportati da /api/health
+
+from flask import Flask, request, jsonify, send_file, Response, g, has_request_context
+from flask_cors import CORS
+from lazy_imports import lazy_module, start_warm_up, status as readiness_status
 import os
 import base64
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import threading
+import multiprocessing
+import signal
 import json
+import sys
 from functools import lru_cache
 # Import ottimizzati (il caricamento pesante è gestito internamente ora)
-from contour import get_head_y
-from jump_analyzer import JumpAnalyzer
+from contour import get_head_y, get_segmenter
+from jump_analyzer import DEFAULT_THRESHOLDS, JumpAnalyzer
+from jump_metrics import (build_final_results, calculate_average_force_from_velocity, calculate_concentric_time,
+                          calculate_contact_time, calculate_eccentric_time, calculate_estimated_power,
+                          calculate_takeoff_velocity, compute_derived_velocity, enhance_results, get_phase_times)
+from frame_timing import FrameClock, get_video_fps, measured_fps, save_timestamps
+from capture import CapturePipeline, FrameConsumer, RingBufferRecorder
+from cameras import (CameraWatcher, apply_mode, claim_camera, get_camera_modes,
+                     open_camera, release_camera, wait_for_probe)
+from frame_server import frame_server
+from file_jobs import file_job_executor
+from thumbnails import thumbnail_jobs, thumbnails_path
+from proxy import proxy_jobs, proxy_path
+from ingest import ContentIndex, IngestError, IngestFile, file_hash, ingest_stream
+from storage import StorageManager
+from results_store import results_store
+import series_codec
+from history import rows_to_jumps, summarize, summarize_by
+from analysis_cache import RUN_FIELDS, AnalysisCache, cache_key, code_version
+from metrics import metrics
+from profiling import ProfileStore
+from analysis_trace import TraceStore, read_trace, replay as replay_trace
+from sweep import SweepError, check_sweep, run_sweep
+from jobs import InferenceLimiter, JobExecutor, JobRejected, cancelled, report_progress
+from run_state import EMPTY_ANALYSIS, AnalysisRun, CalibrationRun
+import sessions
+from sessions import DEFAULT_SESSION, SessionError, SessionRegistry
+from waitress import create_server
+
+cv2 = lazy_module('cv2')
+mp = lazy_module('mediapipe')
+np = lazy_module('numpy')
 
 app = Flask(__name__)
 CORS(app)
@@ -29,38 +62,79 @@ ALLOWED_EXTENSIONS = {'mp4', 'avi', 'mov', 'mkv', 'wmv'}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024
+app.config['UPLOAD_QUOTA_BYTES'] = 20 * 1024 * 1024 * 1024  # Oltre, sfratto LRU (storage.py)
+
+# Indice hash contenuto -> file caricato (deduplica degli upload)
+content_index = ContentIndex(UPLOAD_FOLDER)
 
 # NOTA: Abbiamo rimosso l'inizializzazione globale di mp_pose per velocizzare l'avvio
 
-# Stato applicazione con lock per thread safety
-state_lock = threading.RLock()
-app_state = {
-    'video_path': None,
-    'is_recording': False,
-    'is_analyzing': False,
-    'is_calibrating': False,
-    'is_paused': False,
-    'current_frame': 0,
-    'total_frames': 0,
-    'cap': None,
-    'analyzer': None,
-    'video_writer': None,
-    'person_height_cm': 174.0,
-    'body_mass_kg': 62.0,
-    'fps': 30,
-    'camera_index': 0,
-    'current_video_frame': None,
-    'realtime_data': {},
-    'trajectory_data': [],
-    'velocity_data': [],
-    'analysis_thread': None,
-    'last_frame_time': 0,  # Cache timing
-    'frame_cache': None,   # Frame caching
+# Stato per sessione (postazione) con lock per thread safety: impostazioni e riferimenti ai run.
+# I dati per frame di calibrazione e analisi stanno negli oggetti del run (run_state.py),
+# scritti solo dal thread di lavoro e letti tramite snapshot immutabili, senza lock.
+def new_session_state():
+    return {
+        'video_path': None,
+        'is_recording': False,
+        'is_calibrating': False,
+        'analyzer': None,
+        'analysis_run': None,  # AnalysisRun corrente (analisi del video, live, cache o replay)
+        'calibration_run': None,
+        'calibration_result': None,
+        'video_writer': None,
+        'capture_pipeline': None,
+        'last_capture_stats': None,
+        'live_analysis': False,
+        'armed_recorder': None,
+        'person_height_cm': 174.0,
+        'body_mass_kg': 62.0,
+        'fps': 30,
+        'camera_index': 0,
+        'camera_mode': None,  # Modalità di cattura richiesta (width, height, fps, fourcc)
+        'recording_camera_index': None,
+        'record_start_time': None,
+        'analysis_source': None,  # File effettivamente analizzato (originale o proxy)
+        'video_hash': None,  # SHA-256 del video (per le registrazioni calcolato in background a fine registrazione)
+        'analysis_cache_key': None,  # Chiave della cache per l'analisi in corso (None = non salvare)
+        'calibration_profile_id': None,
+        'analysis_profile_id': None,
+        'last_trace_id': None,
+        'frame_timestamps': [],  # Timestamp di cattura della registrazione in corso
+        'calibration_job_id': None,
+        'analysis_job_id': None,
+    }
+
+
+# Sessioni per id (header X-Session-Id o ?session=, 'default' se assente): sessions.py
+session_registry = SessionRegistry(new_session_state)
+
+# Impostazioni comuni a tutte le sessioni (riguardano file e cartelle condivise)
+settings_lock = threading.Lock()
+shared_settings = {
+    'proxy_enabled': False,  # Proxy di analisi (MJPG tutto intra) per i video caricati
+    'analysis_cache_enabled': True,
+    'profiling_enabled': False,  # Profilo (pstats + stack campionati) di ogni calibrazione/analisi
+    'trace_enabled': True,  # Trace per frame di ogni analisi (landmark, quota anca, stato) per il replay
 }
 
+# Elenco webcam mantenuto in background (aprire i dispositivi è lento)
+camera_watcher = CameraWatcher()
+
 # Costanti per ottimizzazione
 FRAME_CACHE_DURATION = 0.033  # ~30fps max update rate
 MIN_POLL_INTERVAL = 0.1 
+WRITER_QUEUE_SECONDS = 2  # Frame bufferizzabili in attesa di scrittura su disco
+LIVE_QUEUE_SIZE = 2       # Frame in attesa di inferenza live (oltre si scartano i più vecchi)
+LIVE_TAIL_SECONDS = 1.0   # Registrazione mantenuta dopo l'atterraggio in modalità live
+# Registrazione armata (ring buffer in memoria, su disco solo la finestra del salto)
+ARMED_PRE_TRIGGER_SECONDS = 2.0
+ARMED_POST_LANDING_SECONDS = 1.0
+ARMED_MAX_WINDOW_SECONDS = 10.0
+ARMED_MAX_BUFFER_BYTES = 512 * 1024 * 1024
+# Parametri MediaPipe Pose di calibrazione e analisi (fanno parte della chiave di cache)
+POSE_MODEL_COMPLEXITY = 1
+POSE_MIN_DETECTION_CONFIDENCE = 0.5
+POSE_MIN_TRACKING_CONFIDENCE = 0.5
 
 
 def allowed_file(filename):
@@ -76,41 +150,260 @@ def safe_release(obj):
         print(f"Error releasing object: {e}")
 
 
+def current_session():
+    """Sessione del thread di lavoro (sessions.bind) o della richiesta HTTP, altrimenti la default"""
+    session = sessions.current()
+    if session is None:
+        session = g.get('session') if has_request_context() else None
+    return session or session_registry.default
+
+
+def acquire_state_lock(lock):
+    """Acquisisce il lock dello stato misurando l'attesa (solo con le metriche attive)"""
+    if not metrics.enabled:
+        lock.acquire()
+        return
+    start = time.perf_counter()
+    lock.acquire()
+    metrics.observe(('state', 'lock_wait'), time.perf_counter() - start)
+
+
 def get_state(key=None):
-    """Thread-safe state getter"""
-    with state_lock:
+    """Thread-safe state getter (stato della sessione corrente)"""
+    session = current_session()
+    acquire_state_lock(session.lock)
+    try:
         if key:
-            return app_state.get(key)
-        return app_state.copy()
+            return session.state.get(key)
+        return session.state.copy()
+    finally:
+        session.lock.release()
 
 
 def set_state(**kwargs):
-    """Thread-safe state setter"""
-    with state_lock:
-        app_state.update(kwargs)
+    """Thread-safe state setter (stato della sessione corrente)"""
+    session = current_session()
+    acquire_state_lock(session.lock)
+    try:
+        session.state.update(kwargs)
+    finally:
+        session.lock.release()
+
+
+def get_setting(key):
+    with settings_lock:
+        return shared_settings[key]
+
+
+def set_setting(**kwargs):
+    with settings_lock:
+        shared_settings.update(kwargs)
+
+
+@app.before_request
+def select_session():
+    """Sessione indicata dal client (X-Session-Id o ?session=), creata al primo uso"""
+    session_id = request.headers.get('X-Session-Id') or request.args.get('session')
+    try:
+        g.session = session_registry.get(session_id)
+    except SessionError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    g.session_explicit = bool(session_id)
+
+
+def analysis_snapshot():
+    """Snapshot immutabile dell'analisi corrente (vuoto se nessuna)"""
+    run = get_state('analysis_run')
+    return run.snapshot if run else EMPTY_ANALYSIS
+
+
+def session_file_tag():
+    """Prefisso dei file salvati da una sessione non default (upload nello stesso secondo non collidono)"""
+    session_id = current_session().session_id
+    return '' if session_id == DEFAULT_SESSION else f"{session_id}_"
+
+
+def storage_protected():
+    """Da non sfrattare: video correnti delle sessioni, video con job in corso e ultimo trace di ogni sessione"""
+    states = [session.state for session in session_registry.list()]
+    current = {state.get('video_path') for state in states}
+    traces = {trace_store.path(state.get('last_trace_id')) for state in states}
+    return current | traces | thumbnail_jobs.pending() | proxy_jobs.pending()
+
+
+def storage_evicted(video_path):
+    """Prima di cancellare un video: chiude i decoder e lo toglie dall'indice"""
+    frame_server.release(video_path)
+    frame_server.release(proxy_path(video_path))
+    content_index.remove_path(video_path)
+
+
+# Quota della cartella upload con sfratto LRU in background (cache, trace e profili inclusi)
+storage = StorageManager(UPLOAD_FOLDER, allowed_file, quota_bytes=app.config['UPLOAD_QUOTA_BYTES'],
+                         protected=storage_protected, on_evict=storage_evicted,
+                         derived=('analysis_cache', 'traces', 'profiles'))
+
+# Risultati di analisi già calcolati, per contenuto del video e parametri
+analysis_cache = AnalysisCache(os.path.join(UPLOAD_FOLDER, 'analysis_cache'))
+ANALYSIS_CODE_VERSION = code_version([sys.modules['jump_analyzer'], sys.modules['jump_metrics'],
+                                      sys.modules['contour'], sys.modules[__name__]])
+
+
+def analysis_cache_key(video_path, source, analyzer):
+    """Chiave della cache per gli input correnti; None finché l'hash del video non è noto (registrazioni)"""
+    video_hash = get_state('video_hash')
+    if not video_hash:
+        return None
+    return cache_key(
+        video_hash=video_hash,
+        source='proxy' if source != video_path else 'original',
+        person_height_cm=get_state('person_height_cm'),
+        body_mass_kg=get_state('body_mass_kg'),
+        fps=analyzer.fps,
+        thresholds=analyzer.thresholds,
+        model_complexity=POSE_MODEL_COMPLEXITY,
+        min_detection_confidence=POSE_MIN_DETECTION_CONFIDENCE,
+        min_tracking_confidence=POSE_MIN_TRACKING_CONFIDENCE,
+        code_version=ANALYSIS_CODE_VERSION
+    )
+
+
+# Profili opzionali delle singole esecuzioni (scaricabili da /api/profiles)
+profile_store = ProfileStore(os.path.join(UPLOAD_FOLDER, 'profiles'))
+
+
+# Trace per frame delle analisi (replay senza decodifica né inferenza)
+trace_store = TraceStore(os.path.join(UPLOAD_FOLDER, 'traces'),
+                         keep_folder=os.path.join(results_store.data_dir, 'traces'))
+
+
+# Lavori in background su un esecutore limitato (id, avanzamento, annullamento)
+job_executor = JobExecutor()
+JOB_REPLACE_TIMEOUT = 5.0   # Attesa della fine del lavoro precedente dello stesso tipo
+JOB_SHUTDOWN_TIMEOUT = 10.0
+# Thread del server WSGI: le richieste non eseguono lavori lunghi, bastano pochi thread
+REQUEST_THREADS = 8
+
+
+# Inferenze MediaPipe contemporanee (tutte le sessioni), servite a turno: /api/settings/inference
+inference_limiter = InferenceLimiter()
+
+
+def job_progress(job_id):
+    job = job_executor.get(job_id) if job_id else None
+    return job.snapshot() if job else None
+
+
+def submit_job(kind, target, *args):
+    """Accoda un lavoro eseguito nella sessione corrente (a turno con le altre sessioni)"""
+    session = current_session()
+    return job_executor.submit(kind, sessions.bind(session, target), *args, session_id=session.session_id)
+
+
+def stop_session_jobs(kind):
+    """Annulla e attende i lavori di un tipo della sessione corrente (JobRejected se non terminano)"""
+    job_executor.stop_kind(kind, JOB_REPLACE_TIMEOUT, session_id=current_session().session_id)
+
+
+def run_pose(pose, image, loop):
+    """Inferenza MediaPipe con uno slot del limitatore (l'attesa è misurata a parte)"""
+    with metrics.stage(loop, 'inference_wait'):
+        inference_limiter.acquire()
+    try:
+        with metrics.stage(loop, 'pose'):
+            return pose.process(image)
+    finally:
+        inference_limiter.release()
+
+
+# Warm-up dopo il bind della porta: import pesanti e modelli, mentre la GUI è già utilizzabile
+WARM_UP_MODULES = ('numpy', 'cv2', 'mediapipe')
+startup = {'listening_after_s': None, 'warm_up_thread': None}
+
+
+def warm_up_pose():
+    """Grafo e pesi di MediaPipe Pose su un'istanza usa e getta (i file restano in cache del SO)"""
+    with mp.solutions.pose.Pose(static_image_mode=False, model_complexity=POSE_MODEL_COMPLEXITY,
+                                min_detection_confidence=POSE_MIN_DETECTION_CONFIDENCE,
+                                min_tracking_confidence=POSE_MIN_TRACKING_CONFIDENCE) as pose:
+        pose.process(np.zeros((64, 64, 3), dtype=np.uint8))
+
+
+WARM_UP_MODELS = (
+    ('pose', warm_up_pose),
+    # Solo costruzione: l'istanza è condivisa, get_head_y serializza le chiamate a process()
+    ('segmenter', get_segmenter),
+)
+
+
+def worker_target(target, kind, options):
+    """
+    Target del thread di lavoro, profilato se abilitato o richiesto ({"profile": true}).
+    Restituisce (target, id del profilo o None).
+    """
+    enabled = options['profile'] if 'profile' in options else get_setting('profiling_enabled')
+    if not enabled:
+        return target, None
+    profile_id, profiled_target = profile_store.wrap(target, kind)
+    return profiled_target, profile_id
+
+
+def use_analysis_cache(options):
+    """Cache attiva se abilitata e non esclusa dalla richiesta ({"use_cache": false})"""
+    return (get_setting('analysis_cache_enabled') and options.get('use_cache', True) is not False
+            and not get_state('is_recording'))
+
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Stato di avvio: server in ascolto, import differiti e modelli caricati dal warm-up"""
+    readiness = readiness_status()
+    return jsonify({
+        'success': True,
+        'status': 'ready' if readiness['ready'] else 'warming_up',
+        'uptime_s': round(time.perf_counter() - STARTUP_T0, 3),
+        'listening_after_s': startup['listening_after_s'],
+        **readiness
+    })
 
 
 @app.route('/api/cameras', methods=['GET'])
 def get_cameras():
-    """Ottiene lista webcam disponibili (ottimizzato)"""
-    cameras = []
-    # Ridotto il range e migliorato il controllo per velocità
-    for i in range(3): 
-        # Su Windows CAP_DSHOW è più veloce nell'apertura
-        try:
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-        except:
-            cap = cv2.VideoCapture(i)
-            
-        if cap.isOpened():
-            cameras.append(i)
-            cap.release()
-        else:
-            # Se la 0 fallisce, probabilmente non ce ne sono altre, ma controlliamo fino a 1
-            if i == 0: continue
-            break 
-            
-    return jsonify({'cameras': cameras if cameras else [0]})
+    """Lista webcam dalla cache del watcher in background (risposta immediata)"""
+    cameras = camera_watcher.cameras(refresh=request.args.get('refresh') == '1')
+    return jsonify({
+        'cameras': cameras if cameras else [0],
+        'probing': camera_watcher.is_probing(),
+        'updated_at': camera_watcher.updated_at or None
+    })
+
+
+@app.route('/api/cameras/<int:index>/modes', methods=['GET'])
+def camera_modes(index):
+    """Modalità (risoluzione, fps, fourcc) supportate dalla camera, dalla cache (sonda in background)"""
+    refresh = request.args.get('refresh') == '1'
+    measure = request.args.get('measure') == '1'
+    modes, probing = get_camera_modes(index, refresh=refresh, measure=measure)
+    return jsonify({'success': True, 'index': index, 'modes': modes, 'probing': probing})
+
+
+@app.route('/api/settings/camera_mode', methods=['POST'])
+def set_camera_mode():
+    """Modalità di cattura richiesta alla camera (es. 1280x720 @ 120 fps MJPG)"""
+    data = request.json or {}
+    try:
+        mode = {
+            'width': int(data['width']),
+            'height': int(data['height']),
+            'fps': float(data['fps']),
+            'fourcc': str(data.get('fourcc') or 'MJPG')[:4]
+        }
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Modalità camera non valida'})
+    if not (1 <= mode['fps'] <= 240) or len(mode['fourcc']) != 4:
+        return jsonify({'success': False, 'error': 'Modalità camera non valida'})
+    set_state(camera_mode=mode)
+    return jsonify({'success': True, 'mode': mode})
 
 
 @app.route('/api/settings/camera', methods=['POST'])
@@ -162,53 +455,216 @@ def set_mass():
         return jsonify({'success': False, 'error': 'Valore non valido'})
 
 
+@app.route('/api/settings/proxy', methods=['POST'])
+def set_proxy():
+    """Abilita la creazione del proxy di analisi per i video caricati"""
+    data = request.json or {}
+    set_setting(proxy_enabled=bool(data.get('enabled', False)))
+    return jsonify({'success': True, 'enabled': get_setting('proxy_enabled')})
+
+
+@app.route('/api/settings/storage_quota', methods=['POST'])
+def set_storage_quota():
+    """Quota in byte della cartella upload (oltre, sfratto dei video meno usati)"""
+    data = request.json or {}
+    try:
+        quota_bytes = int(data.get('quota_bytes'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Quota non valida'})
+    storage.set_quota(quota_bytes)
+    return jsonify({'success': True, 'quota_bytes': storage.quota_bytes})
+
+
+@app.route('/api/storage/usage', methods=['GET'])
+def storage_usage():
+    """Spazio usato dalla cartella upload (video e derivati), quota e video in ordine di ultimo accesso"""
+    return jsonify({'success': True, **storage.usage()})
+
+
+@app.route('/api/settings/analysis_cache', methods=['POST'])
+def set_analysis_cache():
+    """Abilita/disabilita la cache dei risultati di analisi ({"enabled": bool, "clear": bool})"""
+    data = request.json or {}
+    if 'enabled' in data:
+        set_setting(analysis_cache_enabled=bool(data['enabled']))
+    if data.get('clear'):
+        analysis_cache.clear()
+    return jsonify({'success': True, 'enabled': get_setting('analysis_cache_enabled'),
+                    **analysis_cache.stats()})
+
+
+@app.route('/api/settings/metrics', methods=['POST'])
+def set_metrics():
+    """Abilita i timer per fase del loop di analisi (disabilitati: costo trascurabile)"""
+    data = request.json or {}
+    metrics.enabled = bool(data.get('enabled', False))
+    return jsonify({'success': True, 'enabled': metrics.enabled})
+
+
+@app.route('/api/settings/profiling', methods=['POST'])
+def set_profiling():
+    """Profila ogni calibrazione/analisi ({"enabled": bool}); per una sola esecuzione: {"profile": true} allo start"""
+    data = request.json or {}
+    set_setting(profiling_enabled=bool(data.get('enabled', False)))
+    return jsonify({'success': True, 'enabled': get_setting('profiling_enabled')})
+
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    return jsonify({'success': True, 'profiles': profile_store.list()})
+
+
+@app.route('/api/profiles/<run_id>/<name>', methods=['GET'])
+def download_profile(run_id, name):
+    """File di un profilo: pstats, collapsed (flamegraph), summary, meta"""
+    path = profile_store.path(run_id, name)
+    if path is None:
+        return jsonify({'success': False, 'error': 'Profilo non disponibile'})
+    return send_file(os.path.abspath(path), as_attachment=True,
+                     download_name=f"{run_id}_{os.path.basename(path)}")
+
+
+def collect_queue_metrics():
+    """Code delle pipeline di cattura (per sessione), cache dei frame e inferenze, al momento dello scrape"""
+    for session in session_registry.list():
+        pipeline = session.state.get('capture_pipeline')
+        if pipeline is None:
+            continue
+        for name, consumer in pipeline.stats()['consumers'].items():
+            metrics.set_gauge('jump_queue_depth', consumer['queue_depth'], consumer=name,
+                              session=session.session_id)
+            metrics.set_gauge('jump_queue_dropped', consumer['dropped'], consumer=name,
+                              session=session.session_id)
+    for key, value in frame_server.stats().items():
+        metrics.set_gauge(f'jump_frame_server_{key}', value)
+    inference = inference_limiter.stats()
+    metrics.set_gauge('jump_inference_running', inference['running'])
+    metrics.set_gauge('jump_inference_waiting', inference['waiting'])
+
+
+metrics.add_collector(collect_queue_metrics)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metriche in formato testo Prometheus"""
+    return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+def get_analysis_path(video_path):
+    """File da usare per analisi e scrubbing: il proxy se pronto, altrimenti l'originale"""
+    return proxy_jobs.ready_path(video_path) or video_path
+
+
+def upload_filepath(original_name):
+    """Percorso di destinazione di un upload; IngestError se il nome non è accettato"""
+    if not original_name:
+        raise IngestError('Nessun file selezionato')
+    if not allowed_file(original_name):
+        raise IngestError('Formato file non supportato')
+    filename = secure_filename(original_name)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{timestamp}_{session_file_tag()}{filename}"
+    return os.path.join(app.config['UPLOAD_FOLDER'], filename)
+
+
+def ingest_multipart():
+    """
+    Upload multipart letto in streaming: la parte del file è scritta da IngestFile
+    mentre arriva (header e dimensione verificati subito, nessuno spool intermedio).
+    Restituisce (digest, percorso, campi del form).
+    """
+    targets = []
+    
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        if targets:
+            raise IngestError('Un solo file per upload')
+        targets.append(IngestFile(upload_filepath(filename), max_bytes=app.config['MAX_CONTENT_LENGTH']))
+        return targets[0]
+    
+    parser = request.make_form_data_parser()
+    parser.stream_factory = stream_factory
+    try:
+        _, form, files = parser.parse(request.stream, request.mimetype, request.content_length,
+                                      request.mimetype_params)
+        if 'video' not in files:
+            raise IngestError('Nessun file caricato')
+        video_hash, _ = targets[0].finish()
+    except Exception:
+        for target in targets:
+            target.abort()
+        raise
+    return video_hash, targets[0].filepath, form
+
+
 @app.route('/api/video/upload', methods=['POST'])
 def upload_video():
-    if 'video' not in request.files:
-        return jsonify({'success': False, 'error': 'Nessun file caricato'})
-    
-    file = request.files['video']
-    if file.filename == '':
-        return jsonify({'success': False, 'error': 'Nessun file selezionato'})
-    
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    # Due modalità, entrambe in streaming: multipart (campo 'video') oppure corpo
+    # grezzo (Content-Type: application/octet-stream, nome in ?filename=)
+    form = {}
+    try:
+        if request.mimetype == 'application/octet-stream':
+            filepath = upload_filepath(request.args.get('filename', ''))
+            video_hash, _ = ingest_stream(request.stream, filepath, max_bytes=app.config['MAX_CONTENT_LENGTH'])
+        else:
+            video_hash, filepath, form = ingest_multipart()
+    except IngestError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Errore salvataggio: {str(e)}'})
+    filename = os.path.basename(filepath)
+    
+    # Contenuto già noto: si riusa il file esistente con i suoi artefatti
+    existing = content_index.lookup(video_hash)
+    deduplicated = existing is not None
+    if deduplicated:
+        if os.path.abspath(existing) != os.path.abspath(filepath):
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+        filepath = existing
+        filename = os.path.basename(existing)
+    
+    # Verifica video
+    test_cap = cv2.VideoCapture(filepath)
+    if test_cap.isOpened():
+        fps = test_cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(test_cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        test_cap.release()
         
-        try:
-            file.save(filepath)
-        except Exception as e:
-            return jsonify({'success': False, 'error': f'Errore salvataggio: {str(e)}'})
+        if not deduplicated:
+            content_index.add(video_hash, filepath)
         
-        # Verifica video
-        test_cap = cv2.VideoCapture(filepath)
-        if test_cap.isOpened():
-            fps = test_cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(test_cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            test_cap.release()
-            
-            set_state(video_path=filepath,
-                      current_video_frame=None,
-                      frame_cache=None,
-                      last_frame_time=0)
-            
-            return jsonify({
-                'success': True,
-                'video_path': filename,
-                'fps': fps,
-                'total_frames': total_frames
-            })
-        else:
-            test_cap.release()
+        set_state(video_path=filepath, video_hash=video_hash)
+        current_session().video_frame.set(None)
+        storage.touch(filepath)
+        thumbnail_jobs.schedule(filepath)
+        storage.request_eviction()
+        
+        # Proxy di analisi opzionale (impostazione o campo 'proxy' del form/query)
+        use_proxy = (get_setting('proxy_enabled') or form.get('proxy') == '1'
+                     or request.args.get('proxy') == '1')
+        if use_proxy:
+            proxy_jobs.schedule(filepath)
+        
+        return jsonify({
+            'success': True,
+            'video_path': filename,
+            'video_hash': video_hash,
+            'deduplicated': deduplicated,
+            'fps': fps,
+            'total_frames': total_frames,
+            'proxy_status': proxy_jobs.get_status(filepath) if use_proxy else None
+        })
+    else:
+        test_cap.release()
+        if not deduplicated:
             try:
                 os.remove(filepath)
             except:
                 pass
-            return jsonify({'success': False, 'error': 'File video non valido'})
-    
-    return jsonify({'success': False, 'error': 'Formato file non supportato'})
+        return jsonify({'success': False, 'error': 'File video non valido'})
 
 
 @app.route('/api/recording/start', methods=['POST'])
@@ -216,14 +672,29 @@ def start_recording():
     if get_state('is_recording'):
         return stop_recording()
     
+    options = request.get_json(silent=True) or {}
+    live_analysis = bool(options.get('live_analysis', False))
+    armed = bool(options.get('armed', False))
+    try:
+        pre_trigger_seconds = float(options.get('pre_trigger_seconds', ARMED_PRE_TRIGGER_SECONDS))
+        post_landing_seconds = float(options.get('post_landing_seconds', ARMED_POST_LANDING_SECONDS))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Parametri registrazione armata non validi'})
+    
     camera_index = get_state('camera_index')
+    # Riserva il dispositivo: il watcher in background e le altre sessioni non lo apriranno più
+    if not claim_camera(camera_index):
+        return jsonify({'success': False, 'error': f'Camera {camera_index} già in uso da un\'altra sessione'})
     # Prefer DirectShow on Windows for faster device init and lower latency
-    try:
-        cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
-    except Exception:
-        cap = cv2.VideoCapture(camera_index)
+    cap = open_camera(camera_index)
+    if not cap.isOpened():
+        # Una sonda già avviata può tenere occupato il dispositivo per un istante
+        cap.release()
+        wait_for_probe(camera_index)
+        cap = open_camera(camera_index)
     
     if not cap.isOpened():
+        release_camera(camera_index)
         return jsonify({'success': False, 'error': f'Impossibile aprire camera {camera_index}'})
     
     # Buffer size ridotto
@@ -232,11 +703,12 @@ def start_recording():
     except Exception:
         pass
 
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    # Modalità scelta dall'utente (es. MJPG ad alto frame rate), altrimenti 720p
+    requested_mode = get_state('camera_mode') or {'width': 1280, 'height': 720}
+    negotiated_mode = apply_mode(cap, requested_mode)
     
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    width = negotiated_mode['width']
+    height = negotiated_mode['height']
 
     # Warm-up: read and discard
     try:
@@ -246,95 +718,305 @@ def start_recording():
         pass
     
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"recording_{timestamp}.mp4"
+    filename = f"recording_{session_file_tag()}{timestamp}.mp4"
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
     
     fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    fps = get_state('fps')
+    fps = negotiated_mode['fps'] if requested_mode.get('fps') and negotiated_mode['fps'] > 0 else get_state('fps')
     video_writer = cv2.VideoWriter(filepath, fourcc, fps, (width, height))
+    timestamps = []
     
     set_state(
         video_path=filepath,
-        cap=cap,
+        video_hash=None,
         video_writer=video_writer,
+        recording_camera_index=camera_index,
         is_recording=True,
+        live_analysis=live_analysis,
         record_start_time=time.time(),
-        current_video_frame=None,
-        frame_cache=None,
-        last_frame_time=0
+        frame_timestamps=timestamps
     )
+    session = current_session()
+    session.video_frame.set(None)
+    
+    # Cattura e codifica su thread separati: la lettura dalla camera non aspetta mai
+    # la scrittura su disco né la codifica JPEG dell'anteprima
+    pipeline = CapturePipeline(cap, fps)
+    analyzer = None
+    
+    if live_analysis:
+        # L'analisi live pubblica anche l'anteprima annotata
+        analyzer = JumpAnalyzer(fps=fps)
+        run = AnalysisRun('live', analyzer, get_state('body_mass_kg'))
+        set_state(analyzer=analyzer, analysis_run=run)
+        pipeline.add_consumer(FrameConsumer(
+            'live_analysis',
+            LiveAnalysisHandler(session, run, get_state('person_height_cm'), stop_after_landing=not armed),
+            maxsize=LIVE_QUEUE_SIZE, keep_latest=True
+        ))
+    else:
+        pipeline.add_consumer(FrameConsumer(
+            'preview', make_preview_handler(session.video_frame), maxsize=1, keep_latest=True
+        ))
+    
+    armed_recorder = None
+    if armed:
+        # Solo la finestra pre-trigger -> post-atterraggio finisce su disco.
+        # Con l'analisi live il trigger è il decollo, altrimenti il movimento.
+        armed_recorder = RingBufferRecorder(
+            video_writer, timestamps, fps,
+            pre_seconds=pre_trigger_seconds,
+            post_seconds=post_landing_seconds,
+            max_seconds=ARMED_MAX_WINDOW_SECONDS,
+            max_buffer_bytes=ARMED_MAX_BUFFER_BYTES,
+            analyzer=analyzer,
+            on_done=sessions.bind(session, finish_recording_async)
+        )
+        pipeline.add_consumer(FrameConsumer('writer', armed_recorder, maxsize=int(fps * WRITER_QUEUE_SECONDS)))
+    else:
+        pipeline.add_consumer(FrameConsumer(
+            'writer', make_writer_handler(video_writer, timestamps),
+            maxsize=int(fps * WRITER_QUEUE_SECONDS)
+        ))
     
-    thread = threading.Thread(target=recording_loop, daemon=True)
-    thread.start()
+    set_state(capture_pipeline=pipeline, armed_recorder=armed_recorder)
+    pipeline.start()
     
-    return jsonify({'success': True, 'message': 'Registrazione avviata'})
+    return jsonify({
+        'success': True,
+        'message': 'Registrazione armata' if armed else 'Registrazione avviata',
+        'live_analysis': live_analysis,
+        'armed': armed,
+        'camera_mode': negotiated_mode
+    })
 
 
-def recording_loop():
-    last_update = 0
-    update_interval = 0.033 
+def make_writer_handler(writer, timestamps):
+    """Consumatore che scrive i frame su disco registrandone il timestamp di cattura"""
+    def handle(index, timestamp, frame):
+        writer.write(frame)
+        timestamps.append(timestamp)
+    return handle
+
+
+def make_preview_handler(frame_slot, update_interval=0.033):
+    """Consumatore che aggiorna l'anteprima JPEG della sessione (rate limited)"""
+    last_update = [0.0]
     
-    while get_state('is_recording'):
-        cap = get_state('cap')
-        writer = get_state('video_writer')
+    def handle(index, timestamp, frame):
+        current_time = time.time()
+        if current_time - last_update[0] < update_interval:
+            return
+        _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70]) # Quality reduced for speed
+        frame_slot.set(base64.b64encode(buffer).decode('utf-8'))
+        last_update[0] = current_time
+    return handle
+
+
+class LiveAnalysisHandler:
+    """
+    Consumatore che analizza i frame mentre vengono registrati (modalità live).
+    Calibra sulla persona in posizione eretta, poi passa ogni frame a
+    JumpAnalyzer.process_frame. Se l'inferenza resta indietro la coda scarta i
+    frame più vecchi: i timestamp reali mantengono corrette le metriche.
+    I risultati sono pronti all'atterraggio; la registrazione si chiude dopo
+    LIVE_TAIL_SECONDS e l'MP4 resta solo per la revisione.
+    Ogni frame è elaborato nella sessione che ha avviato la registrazione.
+    """
+
+    def __init__(self, session, run, person_height_cm, stop_after_landing=True):
+        self.session = session
+        self.run = run
+        self.analyzer = run.analyzer
+        self.person_height_cm = person_height_cm
+        self.stop_after_landing = stop_after_landing
+        self.pose = None
+        self.last_update = 0
+        self.landing_time = None
+        self.finished = False
+
+    def __call__(self, index, timestamp, frame):
+        if self.finished:
+            return
+        with sessions.activate(self.session):
+            self.process(index, timestamp, frame)
+
+    def process(self, index, timestamp, frame):
+        if self.pose is None:
+            self.pose = mp.solutions.pose.Pose(
+                min_detection_confidence=POSE_MIN_DETECTION_CONFIDENCE,
+                min_tracking_confidence=POSE_MIN_TRACKING_CONFIDENCE,
+                model_complexity=POSE_MODEL_COMPLEXITY
+            )
         
-        if not cap or not cap.isOpened() or not writer:
-            break
+        analyzer = self.analyzer
+        frame_height = frame.shape[0]
+        
+        with metrics.stage('live', 'cvt_rgb'):
+            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image.flags.writeable = False
+        results = run_pose(self.pose, image, 'live')
+        image.flags.writeable = True
+        with metrics.stage('live', 'cvt_bgr'):
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
         
-        ret, frame = cap.read()
-        if not ret:
-            break
+        if not analyzer.calibrated_with_height:
+            calibrated = results.pose_landmarks is not None and analyzer.calibrate_with_person_height(
+                self.person_height_cm, results.pose_landmarks, frame_height, frame=frame
+            )
+            if calibrated:
+                set_state(calibration_result={
+                    'success': True,
+                    'ratio': analyzer.pixel_to_cm_ratio,
+                    'height': self.person_height_cm
+                })
+            else:
+                cv2.putText(image, "Cerco persona in posizione eretta...", (10, 40),
+                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
+        else:
+            analyze_pose_results(image, results, self.run, frame_height, timestamp, loop='live')
         
-        writer.write(frame)
+        self.run.current_frame = index + 1
         
-        # Update frame for streaming (rate limited)
         current_time = time.time()
-        if current_time - last_update >= update_interval:
-            try:
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70]) # Quality reduced for speed
-                set_state(current_video_frame=base64.b64encode(buffer).decode('utf-8'))
-                last_update = current_time
-            except Exception as e:
-                print(f"Error encoding frame: {e}")
+        if current_time - self.last_update >= FRAME_CACHE_DURATION:
+            with metrics.stage('live', 'encode'):
+                _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                encoded = base64.b64encode(buffer).decode('utf-8')
+            self.session.video_frame.set(encoded)
+            self.run.publish()
+            self.last_update = current_time
         
-        time.sleep(0.001) 
+        if analyzer.jump_ended:
+            if self.landing_time is None:
+                # Risultati disponibili subito all'atterraggio
+                self.landing_time = timestamp
+                self.run.finish(build_final_results(analyzer, self.run.body_mass_kg))
+            elif self.stop_after_landing and timestamp - self.landing_time >= LIVE_TAIL_SECONDS:
+                # Non si può fermare la pipeline dal suo stesso thread consumatore
+                self.finished = True
+                finish_recording_async()
+
+    def close(self):
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
 
 
 @app.route('/api/recording/stop', methods=['POST'])
 def stop_recording():
-    set_state(is_recording=False)
-    time.sleep(0.1) 
+    return jsonify(finish_recording())
+
+
+def finish_recording_async():
+    """
+    Chiusura della registrazione richiesta da un thread della pipeline (non può fermare sé stesso).
+    Thread dedicato e non l'esecutore: in coda dietro ad analisi lunghe la camera resterebbe
+    aperta e il writer continuerebbe a scrivere frame.
+    """
+    threading.Thread(target=sessions.bind(current_session(), finish_recording),
+                     name='recording-stop', daemon=True).start()
+
+
+def finish_recording():
+    """Ferma la pipeline di cattura, chiude il file e salva i timestamp"""
+    # Presa in carico atomica: stop manuale e stop automatico possono sovrapporsi
+    session = current_session()
+    with session.lock:
+        pipeline = session.state.get('capture_pipeline')
+        writer = session.state.get('video_writer')
+        session.state.update(is_recording=False, capture_pipeline=None, video_writer=None)
+    
+    stats = None
+    if pipeline:
+        # Ferma la cattura e attende che il writer smaltisca la coda
+        pipeline.stop()
+        safe_release(pipeline.cap)
+        release_camera(get_state('recording_camera_index'))
+        stats = pipeline.stats()
+    safe_release(writer)
     
-    cap = get_state('cap')
-    writer = get_state('video_writer')
+    set_state(capture_pipeline=None, video_writer=None, last_capture_stats=stats)
     
-    safe_release(cap)
-    safe_release(writer)
+    # Analisi live interrotta prima dell'atterraggio: risultati parziali
+    # (la pipeline è ferma, il run non ha più un thread che lo scrive)
+    run = get_state('analysis_run')
+    if get_state('live_analysis') and run is not None and run.kind == 'live' and run.analyzing:
+        run.finish(build_final_results(run.analyzer, run.body_mass_kg))
     
-    set_state(cap=None, video_writer=None)
+    video_path = get_state('video_path')
+    timestamps = list(get_state('frame_timestamps') or [])
+    if video_path and timestamps:
+        try:
+            save_timestamps(video_path, timestamps)
+        except Exception as e:
+            print(f"Errore salvataggio timestamp: {e}")
     
-    filename = os.path.basename(get_state('video_path') or '')
+    # Registrazione armata senza trigger: nessun frame scritto, il file è vuoto
+    armed_recorder = get_state('armed_recorder')
+    triggered = armed_recorder is None or armed_recorder.trigger_time is not None
+    if not triggered and video_path:
+        try:
+            os.remove(video_path)
+        except OSError:
+            pass
+        video_path = None
+        set_state(video_path=None)
+    
+    if video_path:
+        storage.touch(video_path)
+        thumbnail_jobs.schedule(video_path)
+        # Hash del contenuto fuori dalla richiesta: poi cache delle analisi e deduplica valgono anche qui
+        try:
+            file_job_executor.submit('hash', sessions.bind(session, hash_recording), video_path)
+        except JobRejected as e:
+            print(f"Hash registrazione non accodato: {e}")
+        storage.request_eviction()
     
-    return jsonify({
+    filename = os.path.basename(video_path or '')
+    
+    return {
         'success': True,
-        'message': 'Registrazione completata',
-        'video_path': filename
+        'message': 'Registrazione completata' if triggered else 'Nessun salto rilevato, niente da salvare',
+        'video_path': filename,
+        'triggered': triggered,
+        'frames': len(timestamps),
+        'measured_fps': round(measured_fps(timestamps) or 0, 2),
+        'capture_stats': stats
+    }
+
+
+def hash_recording(video_path):
+    """SHA-256 della registrazione conclusa: indice dei contenuti e video_hash della sessione"""
+    try:
+        video_hash = file_hash(video_path)
+    except OSError as e:
+        print(f"Errore hash registrazione: {e}")
+        return
+    content_index.add(video_hash, video_path)
+    session = current_session()
+    with session.lock:
+        # Nel frattempo la sessione può essere passata a un altro video
+        if session.state.get('video_path') == video_path:
+            session.state['video_hash'] = video_hash
+
+
+@app.route('/api/recording/status', methods=['GET'])
+def recording_status():
+    """Stato registrazione con contatori di frame persi / in ritardo"""
+    pipeline = get_state('capture_pipeline')
+    armed_recorder = get_state('armed_recorder')
+    return jsonify({
+        'is_recording': get_state('is_recording'),
+        'capture_stats': pipeline.stats() if pipeline else get_state('last_capture_stats'),
+        'armed': armed_recorder.stats() if armed_recorder else None
     })
 
 
 @app.route('/api/video/frame', methods=['GET'])
 def get_video_frame():
-    current_time = time.time()
-    last_time = get_state('last_frame_time')
-    
-    if current_time - last_time < FRAME_CACHE_DURATION:
-        frame = get_state('frame_cache')
-        if frame:
-            return jsonify({'success': True, 'frame': frame})
-    
-    frame = get_state('current_video_frame')
+    frame = current_session().video_frame.get()
     if frame:
-        set_state(last_frame_time=current_time, frame_cache=frame)
         return jsonify({'success': True, 'frame': frame})
     
     return jsonify({'success': False})
@@ -346,29 +1028,65 @@ def start_calibration():
     if not video_path or not os.path.exists(video_path):
         return jsonify({'success': False, 'error': 'Nessun video disponibile'})
     
-    fps = get_state('fps')
+    # Una calibrazione ancora in corso viene annullata e attesa prima della nuova
+    try:
+        stop_session_jobs('calibration')
+    except JobRejected as e:
+        return jsonify({'success': False, 'error': str(e)})
+    
+    storage.touch(video_path)
+    # Calibrazione e analisi usano lo stesso file (il proxy, se già pronto)
+    source = get_analysis_path(video_path)
+    
+    # FPS reale del file (sidecar o container), l'impostazione utente è solo il fallback
+    fps = get_video_fps(source, default=get_state('fps'))
     analyzer = JumpAnalyzer(fps=fps)
     
-    set_state(is_calibrating=True, analyzer=analyzer)
+    # Stessi input già analizzati: calibrazione dalla cache, nessun passaggio su MediaPipe
+    options = request.get_json(silent=True) or {}
+    key = analysis_cache_key(video_path, source, analyzer) if use_analysis_cache(options) else None
+    if key:
+        entry = analysis_cache.get(key)
+        ratio = entry and (entry.get('calibration') or {}).get('ratio')
+        if ratio:
+            person_height = get_state('person_height_cm')
+            analyzer.pixel_to_cm_ratio = ratio
+            analyzer.calibrated_with_height = True
+            analyzer.person_height_cm = person_height
+            set_state(analyzer=analyzer, analysis_source=source,
+                      calibration_result={'success': True, 'ratio': ratio, 'height': person_height,
+                                          'cached': True})
+            return jsonify({'success': True, 'message': 'Calibrazione dalla cache', 'cached': True})
+    
+    target, profile_id = worker_target(calibration_loop, 'calibration', options)
+    run = CalibrationRun(analyzer, source, get_state('person_height_cm'), max_frames=int(analyzer.fps * 5))
+    set_state(is_calibrating=True, analyzer=analyzer, analysis_source=source, calibration_run=run,
+              calibration_profile_id=profile_id, calibration_result=None)
     
-    thread = threading.Thread(target=calibration_loop, daemon=True)
-    thread.start()
+    try:
+        job = submit_job('calibration', target, run)
+    except JobRejected as e:
+        set_state(is_calibrating=False)
+        return jsonify({'success': False, 'error': str(e)})
+    set_state(calibration_job_id=job.job_id)
     
-    return jsonify({'success': True, 'message': 'Calibrazione avviata'})
+    return jsonify({'success': True, 'message': 'Calibrazione avviata', 'profile_id': profile_id,
+                    'job_id': job.job_id})
 
 
-def calibration_loop():
-    """Loop calibrazione con inizializzazione Lazy di MediaPipe"""
-    video_path = get_state('video_path')
-    cap = cv2.VideoCapture(video_path)
+def calibration_loop(run):
+    """Loop calibrazione con inizializzazione Lazy di MediaPipe (run: CalibrationRun)"""
+    cap = cv2.VideoCapture(run.source)
     
     if not cap.isOpened():
         set_state(is_calibrating=False)
         return
     
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = get_state('fps')
-    max_frames = int(fps * 5)
+    analyzer = run.analyzer
+    max_frames = run.max_frames
+    frame_slot = current_session().video_frame
+    run.metrics = metrics.begin_run()
     
     calibration_success = False
     frames_checked = 0
@@ -381,23 +1099,28 @@ def calibration_loop():
     # ==============================
     
     with mp_pose_local.Pose(
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-        model_complexity=1
+        min_detection_confidence=POSE_MIN_DETECTION_CONFIDENCE,
+        min_tracking_confidence=POSE_MIN_TRACKING_CONFIDENCE,
+        model_complexity=POSE_MODEL_COMPLEXITY
     ) as pose:
         
-        while cap.isOpened() and get_state('is_calibrating') and frames_checked < max_frames:
-            ret, frame = cap.read()
+        while cap.isOpened() and not run.stopped and frames_checked < max_frames and not cancelled():
+            with metrics.stage('calibration', 'decode'):
+                ret, frame = cap.read()
             if not ret:
                 break
             
             frames_checked += 1
+            run.frames_checked = frames_checked
+            report_progress(frames_checked, max_frames)
             
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with metrics.stage('calibration', 'cvt_rgb'):
+                image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             image.flags.writeable = False
-            results = pose.process(image)
+            results = run_pose(pose, image, 'calibration')
             image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            with metrics.stage('calibration', 'cvt_bgr'):
+                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
             
             if results.pose_landmarks:
                 mp_drawing.draw_landmarks(
@@ -405,12 +1128,10 @@ def calibration_loop():
                     landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
                 )
                 
-                analyzer = get_state('analyzer')
-                person_height = get_state('person_height_cm')
-                
-                success = analyzer.calibrate_with_person_height(
-                    person_height, results.pose_landmarks, frame_height, frame=image
-                )
+                with metrics.stage('calibration', 'calibrate'):
+                    success = analyzer.calibrate_with_person_height(
+                        run.person_height_cm, results.pose_landmarks, frame_height, frame=image
+                    )
                 
                 if success:
                     cv2.putText(image, "CALIBRAZIONE COMPLETATA!", (10, 40),
@@ -431,8 +1152,10 @@ def calibration_loop():
             current_time = time.time()
             if current_time - last_update >= FRAME_CACHE_DURATION:
                 try:
-                    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    set_state(current_video_frame=base64.b64encode(buffer).decode('utf-8'))
+                    with metrics.stage('calibration', 'encode'):
+                        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                        encoded = base64.b64encode(buffer).decode('utf-8')
+                    frame_slot.set(encoded)
                     last_update = current_time
                 except Exception as e:
                     print(f"Error encoding frame: {e}")
@@ -442,14 +1165,15 @@ def calibration_loop():
                 break
     
     cap.release()
+    metrics.end_run()
     
-    analyzer = get_state('analyzer')
     set_state(
         is_calibrating=False,
         calibration_result={
             'success': calibration_success,
             'ratio': analyzer.pixel_to_cm_ratio if calibration_success else None,
-            'height': get_state('person_height_cm') if calibration_success else None
+            'height': run.person_height_cm if calibration_success else None,
+            'profile_id': get_state('calibration_profile_id')
         }
     )
 
@@ -461,9 +1185,13 @@ def calibration_status():
         set_state(calibration_result=None)
         return jsonify(result)
     
+    run = get_state('calibration_run')
     return jsonify({
         'success': get_state('is_calibrating'),
-        'in_progress': get_state('is_calibrating')
+        'in_progress': get_state('is_calibrating'),
+        'frames_checked': run.frames_checked if run else 0,
+        'max_frames': run.max_frames if run else 0,
+        'job': job_progress(get_state('calibration_job_id'))
     })
 
 
@@ -477,574 +1205,325 @@ def start_analysis():
     if not analyzer or not analyzer.calibrated_with_height:
         return jsonify({'success': False, 'error': 'Sistema non calibrato'})
     
+    # L'analisi precedente ancora attiva scriverebbe sugli stessi dati: annullata e attesa
+    try:
+        stop_session_jobs('analysis')
+    except JobRejected as e:
+        return jsonify({'success': False, 'error': str(e)})
+    
+    # Stesso file della calibrazione: il rapporto pixel/cm dipende dalla risoluzione
+    source = get_state('analysis_source')
+    if not source or not os.path.exists(source):
+        source = video_path
+    
+    options = request.get_json(silent=True) or {}
+    key = analysis_cache_key(video_path, source, analyzer) if use_analysis_cache(options) else None
+    entry = analysis_cache.get(key) if key else None
+    if entry:
+        # Risultato già calcolato per gli stessi input: pronto subito
+        final_results = {name: value for name, value in entry['final_results'].items()
+                         if name not in RUN_FIELDS}
+        # Il trace dell'analisi originale vale per questi input, se non è stato cancellato
+        trace_id = entry.get('trace_id')
+        trace_path = trace_store.path(trace_id)
+        if trace_path and os.path.exists(trace_path):
+            final_results['trace_id'] = trace_id
+        else:
+            trace_id = None
+        run = AnalysisRun.completed('cached', analyzer, get_state('body_mass_kg'), entry['trajectory'],
+                                    entry['velocity'], final_results)
+        set_state(analysis_source=source, analysis_cache_key=None, analysis_run=run, last_trace_id=trace_id)
+        return jsonify({'success': True, 'message': 'Risultati dalla cache', 'cached': True})
+    
+    target, profile_id = worker_target(analysis_loop, 'analysis', options)
+    run = AnalysisRun('analysis', analyzer, get_state('body_mass_kg'))
     set_state(
-        is_analyzing=True,
-        trajectory_data=[],
-        velocity_data=[],
-        realtime_data={}
+        analysis_source=source,
+        analysis_cache_key=key,
+        analysis_profile_id=profile_id,
+        analysis_run=run
     )
     
-    thread = threading.Thread(target=analysis_loop, daemon=True)
-    set_state(analysis_thread=thread)
-    thread.start()
+    try:
+        job = submit_job('analysis', target, run, source)
+    except JobRejected as e:
+        run.finish(None)
+        return jsonify({'success': False, 'error': str(e)})
+    set_state(analysis_job_id=job.job_id)
     
-    return jsonify({'success': True, 'message': 'Analisi avviata'})
+    return jsonify({'success': True, 'message': 'Analisi avviata', 'profile_id': profile_id,
+                    'job_id': job.job_id})
 
 
-def analysis_loop():
-    """Loop analisi con inizializzazione Lazy di MediaPipe"""
-    video_path = get_state('video_path')
+def analysis_loop(run, video_path):
+    """
+    Loop analisi con inizializzazione Lazy di MediaPipe.
+    run: AnalysisRun posseduto da questo thread; nel ciclo nessun accesso allo stato della sessione.
+    """
     cap = cv2.VideoCapture(video_path)
     
     if not cap.isOpened():
-        set_state(is_analyzing=False)
+        run.finish(None)
         return
     
-    set_state(cap=cap)
-    
+    analyzer = run.analyzer
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     
-    set_state(total_frames=total_frames, current_frame=0)
+    run.total_frames = total_frames
+    run.publish()
+    frame_slot = current_session().video_frame
     last_update = 0
+    clock = FrameClock(video_path, analyzer.fps)
+    trace = open_analysis_trace(run, video_path, frame_width, frame_height, total_frames)
+    run.metrics = metrics.begin_run()
+    # Gauge per sessione: analisi contemporanee non si sovrascrivono
+    session_id = current_session().session_id
+    metrics.set_gauge('jump_source_fps', round(analyzer.fps, 3), loop='analysis', session=session_id)
+    run_start = time.perf_counter()
+    frames_processed = 0
     
     # === LAZY LOADING MEDIAPIPE ===
     mp_pose_local = mp.solutions.pose
-    mp_drawing = mp.solutions.drawing_utils
-    mp_drawing_styles = mp.solutions.drawing_styles
     # ==============================
     
+    completed = False  # True solo se il video è stato letto fino in fondo
+    
     with mp_pose_local.Pose(
-        min_detection_confidence=0.5,
-        min_tracking_confidence=0.5,
-        model_complexity=1
+        min_detection_confidence=POSE_MIN_DETECTION_CONFIDENCE,
+        min_tracking_confidence=POSE_MIN_TRACKING_CONFIDENCE,
+        model_complexity=POSE_MODEL_COMPLEXITY
     ) as pose:
         
-        while cap.isOpened() and get_state('is_analyzing'):
-            if get_state('is_paused'):
+        while cap.isOpened() and not run.stopped and not cancelled():
+            if run.paused:
+                if not run.snapshot.paused:
+                    run.publish()  # Pausa visibile ai lettori (pubblica solo questo thread)
                 time.sleep(0.1)
                 continue
+            if run.snapshot.paused:
+                run.publish()
             
-            ret, frame = cap.read()
+            with metrics.stage('analysis', 'decode'):
+                ret, frame = cap.read()
             if not ret:
+                completed = True
                 break
             
             current_frame = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
-            set_state(current_frame=current_frame)
+            run.current_frame = current_frame
+            report_progress(current_frame, total_frames)
+            frame_time = clock.timestamp(cap, current_frame - 1)
             
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            with metrics.stage('analysis', 'cvt_rgb'):
+                image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             image.flags.writeable = False
-            results = pose.process(image)
+            results = run_pose(pose, image, 'analysis')
             image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            with metrics.stage('analysis', 'cvt_bgr'):
+                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
             
-            if results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    image, results.pose_landmarks, mp_pose_local.POSE_CONNECTIONS,
-                    landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
-                )
-                
-                left_hip = results.pose_landmarks.landmark[mp_pose_local.PoseLandmark.LEFT_HIP]
-                right_hip = results.pose_landmarks.landmark[mp_pose_local.PoseLandmark.RIGHT_HIP]
-                hip_y = ((left_hip.y + right_hip.y) / 2) * frame_height
-                
-                analyzer = get_state('analyzer')
-                status, current_height = analyzer.process_frame(hip_y)
-                
-                if status == "calibrazione_baseline":
-                    cv2.putText(image, "CALIBRAZIONE BASELINE", (10, 40),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
-                elif status == "analisi":
-                    if analyzer.jump_started:
-                        cv2.putText(image, "SALTO IN CORSO!", (10, 40),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
-                    else:
-                        cv2.putText(image, "FASE PREPARATORIA", (10, 40),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 215, 0), 3)
-
-                    cv2.putText(image, f"Altezza: {current_height:.1f} cm", (10, 90),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                    
-                    # Update data
-                    t_seconds = analyzer.current_frame / max(1, analyzer.fps)
-                    
-                    traj_data = get_state('trajectory_data')
-                    traj_data.append({'t': round(t_seconds, 3), 'y': round(current_height, 2)})
-                    set_state(trajectory_data=traj_data)
-                    
-                    if len(analyzer.hip_velocities) > 0:
-                        vel_data = get_state('velocity_data')
-                        vel_data.append({
-                            't': round(t_seconds, 3),
-                            'v': round(analyzer.hip_velocities[-1], 2)
-                        })
-                        set_state(velocity_data=vel_data)
-                    
-                    body_mass = get_state('body_mass_kg')
-                    set_state(realtime_data={
-                        'current_height': round(current_height, 1),
-                        'max_height': round(analyzer.max_jump_height_cm, 1),
-                        'takeoff_velocity': round(analyzer.get_takeoff_velocity(), 1),
-                        'estimated_power': round(analyzer.get_estimated_power(body_mass), 1)
-                    })
+            analyze_pose_results(image, results, run, frame_height, frame_time, trace=trace)
             
-            # Update frame
+            # Update frame e snapshot per i lettori (rate limited)
             current_time = time.time()
             if current_time - last_update >= FRAME_CACHE_DURATION:
                 try:
-                    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    set_state(current_video_frame=base64.b64encode(buffer).decode('utf-8'))
-                    last_update = current_time
+                    with metrics.stage('analysis', 'encode'):
+                        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+                        encoded = base64.b64encode(buffer).decode('utf-8')
+                    frame_slot.set(encoded)
                 except Exception as e:
                     print(f"Error encoding frame: {e}")
+                run.publish()
+                last_update = current_time
+            
+            frames_processed += 1
+            if metrics.enabled:
+                metrics.set_gauge('jump_achieved_fps',
+                                  round(frames_processed / max(time.perf_counter() - run_start, 1e-6), 3),
+                                  loop='analysis', session=session_id)
             
-            # Stop recording when jump ends
-            if get_state('is_recording'):
-                analyzer = get_state('analyzer')
-                if analyzer and analyzer.jump_ended:
-                    try:
-                        stop_recording()
-                    except:
-                        set_state(is_recording=False)
+            # Stop recording when jump ends (stato della sessione letto solo a salto concluso)
+            if analyzer.jump_ended and get_state('is_recording'):
+                try:
+                    finish_recording()
+                except Exception:
+                    set_state(is_recording=False)
     
     cap.release()
-    set_state(cap=None, is_analyzing=False)
     
     # Prepara risultati finali
-    analyzer = get_state('analyzer')
-    body_mass = get_state('body_mass_kg')
-    
-    set_state(final_results={
-        'max_height': round(analyzer.max_jump_height_cm, 2),
-        'flight_time': round(analyzer.get_flight_time(), 3),
-        'fall_time': round(analyzer.get_fall_time(), 3),
-        'contact_time': round(analyzer.get_contact_time(), 3),
-        'eccentric_time': round(analyzer.get_eccentric_time(), 3),
-        'concentric_time': round(analyzer.get_concentric_time(), 3),
-        'takeoff_velocity': round(analyzer.get_takeoff_velocity(), 2),
-        'estimated_power': round(analyzer.get_estimated_power(body_mass), 1),
-        'average_force': round(analyzer.get_average_force(body_mass), 1),
-        'jump_detected': analyzer.jump_started,
-        'body_mass_kg': body_mass
-    })
+    final_results = build_final_results(analyzer, run.body_mass_kg)
+    if metrics.enabled:
+        elapsed = time.perf_counter() - run_start
+        final_results['metrics'] = {
+            'stages': metrics.run_summary('analysis', run.metrics),
+            'state_lock': metrics.run_summary('state', run.metrics).get('lock_wait'),
+            'frames': frames_processed,
+            'achieved_fps': round(frames_processed / elapsed, 2) if elapsed > 0 else None,
+            'source_fps': round(analyzer.fps, 2)
+        }
+    metrics.end_run()
+    profile_id = get_state('analysis_profile_id')
+    if profile_id:
+        final_results['profile_id'] = profile_id
+    if trace is not None:
+        trace.close()
+        final_results['trace_id'] = trace.trace_id
+        set_state(last_trace_id=trace.trace_id)
+    # Stato finale e risultati pubblicati insieme: chi vede analyzing=False trova i risultati
+    run.finish(final_results)
+    
+    # Analisi completa: salvataggio in cache per gli stessi input
+    key = get_state('analysis_cache_key')
+    if completed and key:
+        try:
+            analysis_cache.put(key, {'ratio': analyzer.pixel_to_cm_ratio}, final_results,
+                               run.trajectory, run.velocity, trace_id=final_results.get('trace_id'))
+        except Exception as e:
+            print(f"Errore salvataggio cache analisi: {e}")
+
+
+def open_analysis_trace(run, video_path, frame_width, frame_height, total_frames):
+    """Trace dell'analisi che sta per iniziare (None se disabilitato)"""
+    if not get_setting('trace_enabled'):
+        return None
+    analyzer = run.analyzer
+    trace_id = trace_store.new_id()
+    try:
+        trace = trace_store.open(trace_id, {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'source': os.path.basename(video_path),
+            'video_hash': get_state('video_hash'),
+            'fps': analyzer.fps,
+            'frame_width': frame_width,
+            'frame_height': frame_height,
+            'total_frames': total_frames,
+            'pixel_to_cm_ratio': analyzer.pixel_to_cm_ratio,
+            'person_height_cm': analyzer.person_height_cm,
+            'body_mass_kg': run.body_mass_kg,
+            'thresholds': analyzer.thresholds,
+            'model_complexity': POSE_MODEL_COMPLEXITY,
+        })
+    except OSError as e:
+        print(f"Errore apertura trace: {e}")
+        return None
+    return trace
+
+
+def analyze_pose_results(image, results, run, frame_height, frame_time, loop='analysis', trace=None):
+    """
+    Elabora i landmark di un frame: disegna la posa, aggiorna il JumpAnalyzer,
+    le scritte di stato e i dati real-time (traiettoria, velocità, metriche).
+    Condiviso tra l'analisi del video salvato e l'analisi live in registrazione.
+    run: AnalysisRun del thread chiamante (dati scritti senza lock, pubblicati dal loop).
+    trace: TraceWriter dell'analisi, riceve un record per ogni frame.
+    """
+    analyzer = run.analyzer
+    if not results.pose_landmarks:
+        if trace is not None:
+            trace.append(frame_time)
+        return None
+    
+    mp_pose_local = mp.solutions.pose
+    mp_drawing = mp.solutions.drawing_utils
+    mp_drawing_styles = mp.solutions.drawing_styles
+    
+    with metrics.stage(loop, 'draw'):
+        mp_drawing.draw_landmarks(
+            image, results.pose_landmarks, mp_pose_local.POSE_CONNECTIONS,
+            landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
+        )
+    
+    left_hip = results.pose_landmarks.landmark[mp_pose_local.PoseLandmark.LEFT_HIP]
+    right_hip = results.pose_landmarks.landmark[mp_pose_local.PoseLandmark.RIGHT_HIP]
+    hip_y = ((left_hip.y + right_hip.y) / 2) * frame_height
+    
+    with metrics.stage(loop, 'process_frame'):
+        status, current_height = analyzer.process_frame(hip_y, frame_time)
+    
+    if trace is not None:
+        trace.append(frame_time, results.pose_landmarks.landmark, hip_y, status, current_height, analyzer)
+    
+    if status == "calibrazione_baseline":
+        cv2.putText(image, "CALIBRAZIONE BASELINE", (10, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 255), 3)
+    elif status == "analisi":
+        if analyzer.jump_started:
+            cv2.putText(image, "SALTO IN CORSO!", (10, 40),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+        else:
+            cv2.putText(image, "FASE PREPARATORIA", (10, 40),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 215, 0), 3)
+
+        cv2.putText(image, f"Altezza: {current_height:.1f} cm", (10, 90),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+        
+        # Update data (timestamp reale del frame)
+        run.add_sample(
+            frame_time, current_height,
+            velocity=analyzer.hip_velocities[-1] if analyzer.hip_velocities else None,
+            realtime={
+                'current_height': round(current_height, 1),
+                'max_height': round(analyzer.max_jump_height_cm, 1),
+                'takeoff_velocity': round(analyzer.get_takeoff_velocity(), 1),
+                'estimated_power': round(analyzer.get_estimated_power(run.body_mass_kg), 1)
+            })
+    
+    return status
 
 
 @app.route('/api/analysis/status', methods=['GET'])
 def analysis_status():
+    snapshot = analysis_snapshot()
     return jsonify({
-        'is_analyzing': get_state('is_analyzing'),
-        'is_paused': get_state('is_paused'),
-        'current_frame': get_state('current_frame'),
-        'total_frames': get_state('total_frames')
+        'is_analyzing': snapshot.analyzing,
+        'is_paused': snapshot.paused,
+        'current_frame': snapshot.current_frame,
+        'total_frames': snapshot.total_frames,
+        'run_id': snapshot.run_id,
+        'job': job_progress(get_state('analysis_job_id'))
     })
 
 
 @app.route('/api/analysis/data', methods=['GET'])
 def analysis_data():
+    snapshot = analysis_snapshot()
     return jsonify({
-        'realtime': get_state('realtime_data'),
-        'trajectory': get_state('trajectory_data'),
-        'velocity': get_state('velocity_data')
+        'realtime': snapshot.realtime,
+        'trajectory': snapshot.trajectory,
+        'velocity': snapshot.velocity
     })
 
 
-# Funzioni di calcolo per i risultati
-G = 9.81 
-
-def compute_derived_velocity(trajectory_data):
-    """Calcola la velocità derivata dalla traiettoria"""
-    if not trajectory_data or len(trajectory_data) < 2:
-        return []
-    
-    velocities = []
-    for i in range(1, len(trajectory_data)):
-        prev = trajectory_data[i - 1]
-        curr = trajectory_data[i]
-        delta_t = curr['t'] - prev['t']
-        
-        if delta_t <= 0 or not np.isfinite(delta_t):
-            continue
-        
-        delta_y = curr['y'] - prev['y']
-        velocities.append({
-            't': curr['t'],
-            'v': delta_y / delta_t
-        })
-    
-    if len(velocities) == 0:
-        return []
-    
-    return [{'t': trajectory_data[0]['t'], 'v': 0}] + velocities
-
-
-def get_phase_times(trajectory_data, velocity_data):
-    if not trajectory_data or len(trajectory_data) < 2 or not velocity_data or len(velocity_data) < 2:
-        return None
-    
-    baseline_height = trajectory_data[0].get('y', 0) if trajectory_data else 0
-    contact_start_time = None
-    eccentric_start_time = None
-    eccentric_end_time = None
-    concentric_start_time = None
-    concentric_end_time = None
-    takeoff_time = None
-    
-    for i, vel_point in enumerate(velocity_data):
-        if vel_point['v'] < 0 and contact_start_time is None:
-            height_at_time = next((t for t in trajectory_data if abs(t['t'] - vel_point['t']) < 0.01), None)
-            if height_at_time and height_at_time['y'] < baseline_height:
-                contact_start_time = vel_point['t']
-                eccentric_start_time = vel_point['t']
-                break
-            elif height_at_time is None:
-                contact_start_time = vel_point['t']
-                eccentric_start_time = vel_point['t']
-                break
-    
-    min_velocity = float('inf')
-    min_velocity_index = -1
-    for i, vel_point in enumerate(velocity_data):
-        if vel_point['v'] < min_velocity:
-            min_velocity = vel_point['v']
-            min_velocity_index = i
-    
-    if min_velocity_index >= 0:
-        eccentric_end_time = velocity_data[min_velocity_index]['t']
-        concentric_start_time = velocity_data[min_velocity_index]['t']
-    
-    min_height = float('inf')
-    min_height_index = -1
-    for i, traj_point in enumerate(trajectory_data):
-        if traj_point['y'] < min_height:
-            min_height = traj_point['y']
-            min_height_index = i
-    
-    if min_height_index >= 0:
-        for i in range(min_height_index + 1, len(trajectory_data)):
-            if trajectory_data[i]['y'] >= baseline_height:
-                velocity_at_time = next((v for v in velocity_data if abs(v['t'] - trajectory_data[i]['t']) < 0.01), None)
-                if velocity_at_time and velocity_at_time['v'] > 0:
-                    takeoff_time = trajectory_data[i]['t']
-                    concentric_end_time = trajectory_data[i]['t']
-                    break
-    
-    return {
-        'contactStart': contact_start_time,
-        'contactEnd': takeoff_time,
-        'eccentricStart': eccentric_start_time,
-        'eccentricEnd': eccentric_end_time,
-        'concentricStart': concentric_start_time,
-        'concentricEnd': concentric_end_time,
-        'takeoff': takeoff_time
-    }
-
-
-def calculate_average_force_from_velocity(velocity_data, trajectory_data, body_mass_kg=70.0):
-    if not velocity_data or len(velocity_data) < 2 or body_mass_kg <= 0:
-        return 0
-    
-    CONTACT_THRESHOLD = 5.0
-    height_map = {point['t']: point['y'] for point in trajectory_data} if trajectory_data else {}
-    accelerations = []
-    for i in range(1, len(velocity_data)):
-        prev = velocity_data[i - 1]
-        curr = velocity_data[i]
-        delta_t = curr['t'] - prev['t']
-        
-        if delta_t > 0 and np.isfinite(delta_t):
-            v1_ms = prev['v'] / 100
-            v2_ms = curr['v'] / 100
-            a_ms2 = (v2_ms - v1_ms) / delta_t
-            accelerations.append({
-                'time': curr['t'],
-                'a_ms2': a_ms2,
-                'velocity': curr['v']
-            })
-    
-    if len(accelerations) == 0:
-        return 0
-    
-    forces = []
-    for acc in accelerations:
-        height = height_map.get(acc['time'])
-        is_in_contact = height is not None and abs(height) <= CONTACT_THRESHOLD
-        
-        if is_in_contact and abs(acc['a_ms2']) > 0.05:
-            force = body_mass_kg * (acc['a_ms2'] + G)
-            if force > body_mass_kg * G * 0.3 and acc['velocity'] >= 0:
-                forces.append(force)
-    
-    if len(forces) == 0:
-        return 0
-    
-    return sum(forces) / len(forces)
-
-
-def calculate_takeoff_velocity(trajectory_data, velocity_data):
-    if not trajectory_data or len(trajectory_data) < 2 or not velocity_data or len(velocity_data) < 2:
-        return 0
-    
-    baseline_height = trajectory_data[0].get('y', 0) if trajectory_data else 0
-    takeoff_time = None
-    min_height = float('inf')
-    min_height_index = -1
-    
-    for i, point in enumerate(trajectory_data):
-        if point['y'] < min_height:
-            min_height = point['y']
-            min_height_index = i
-    
-    if min_height_index >= 0:
-        for i in range(min_height_index + 1, len(trajectory_data)):
-            if trajectory_data[i]['y'] >= baseline_height:
-                velocity_at_time = next((v for v in velocity_data if abs(v['t'] - trajectory_data[i]['t']) < 0.01), None)
-                if velocity_at_time and velocity_at_time['v'] > 0:
-                    takeoff_time = trajectory_data[i]['t']
-                    break
-    
-    h_max_volo = 0
-    if takeoff_time is not None:
-        for point in trajectory_data:
-            if point['t'] > takeoff_time and point['y'] > h_max_volo:
-                h_max_volo = point['y']
-    else:
-        if min_height_index >= 0:
-            for i in range(min_height_index + 1, len(trajectory_data)):
-                if trajectory_data[i]['y'] > h_max_volo:
-                    h_max_volo = trajectory_data[i]['y']
-    
-    if h_max_volo > 0:
-        h_max_m = h_max_volo / 100
-        v_decollo_ms = np.sqrt(2 * G * h_max_m)
-        return v_decollo_ms * 100
-    
-    if takeoff_time is not None:
-        velocity_at_takeoff = next((v for v in velocity_data if abs(v['t'] - takeoff_time) < 0.01), None)
-        if velocity_at_takeoff and velocity_at_takeoff['v'] > 0:
-            return velocity_at_takeoff['v']
-    
-    max_velocity = 0
-    for vel_point in velocity_data:
-        if vel_point['v'] > max_velocity:
-            max_velocity = vel_point['v']
-    
-    return max_velocity
-
-
-def calculate_concentric_time(trajectory_data, velocity_data, body_mass_kg=70.0):
-    if not trajectory_data or len(trajectory_data) < 2 or not velocity_data or len(velocity_data) < 2:
-        return 0
-    
-    baseline_height = trajectory_data[0].get('y', 0) if trajectory_data else 0
-    concentric_start_time = None
-    concentric_end_time = None
-    
-    min_velocity = float('inf')
-    min_velocity_index = -1
-    for i, vel_point in enumerate(velocity_data):
-        if vel_point['v'] < min_velocity:
-            min_velocity = vel_point['v']
-            min_velocity_index = i
-    
-    if min_velocity_index >= 0:
-        for i in range(min_velocity_index, len(velocity_data)):
-            if velocity_data[i]['v'] > 0 or (i > min_velocity_index and velocity_data[i]['v'] > velocity_data[i - 1]['v'] + 5):
-                concentric_start_time = velocity_data[i]['t']
-                break
-    
-    min_height = float('inf')
-    min_height_index = -1
-    for i, point in enumerate(trajectory_data):
-        if point['y'] < min_height:
-            min_height = point['y']
-            min_height_index = i
-    
-    if min_height_index >= 0 and concentric_start_time is not None:
-        for i in range(min_height_index + 1, len(trajectory_data)):
-            if trajectory_data[i]['y'] >= baseline_height and trajectory_data[i]['t'] >= concentric_start_time:
-                velocity_at_time = next((v for v in velocity_data if abs(v['t'] - trajectory_data[i]['t']) < 0.01), None)
-                if velocity_at_time and velocity_at_time['v'] > 0:
-                    concentric_end_time = trajectory_data[i]['t']
-                    break
-    
-    if concentric_start_time is not None and concentric_end_time is None:
-        max_velocity = 0
-        max_velocity_time = None
-        for vel_point in velocity_data:
-            if vel_point['t'] >= concentric_start_time and vel_point['v'] > max_velocity:
-                max_velocity = vel_point['v']
-                max_velocity_time = vel_point['t']
-        if max_velocity_time is not None:
-            concentric_end_time = max_velocity_time
-    
-    if concentric_start_time is not None and concentric_end_time is not None and concentric_end_time > concentric_start_time:
-        return concentric_end_time - concentric_start_time
-    
-    return 0
-
-
-def calculate_eccentric_time(trajectory_data, velocity_data):
-    if not trajectory_data or len(trajectory_data) < 2 or not velocity_data or len(velocity_data) < 2:
-        return 0
-    
-    baseline_height = trajectory_data[0].get('y', 0) if trajectory_data else 0
-    eccentric_start_time = None
-    eccentric_end_time = None
-    
-    min_velocity = float('inf')
-    min_velocity_index = -1
-    for i, vel_point in enumerate(velocity_data):
-        if vel_point['v'] < min_velocity:
-            min_velocity = vel_point['v']
-            min_velocity_index = i
-    
-    for vel_point in velocity_data:
-        if vel_point['v'] < 0 and eccentric_start_time is None:
-            height_at_time = next((t for t in trajectory_data if abs(t['t'] - vel_point['t']) < 0.01), None)
-            if height_at_time and height_at_time['y'] < baseline_height:
-                eccentric_start_time = vel_point['t']
-                break
-            elif height_at_time is None:
-                eccentric_start_time = vel_point['t']
-                break
-    
-    if min_velocity_index >= 0:
-        eccentric_end_time = velocity_data[min_velocity_index]['t']
-    
-    if eccentric_start_time is not None and eccentric_end_time is not None and eccentric_end_time > eccentric_start_time:
-        return eccentric_end_time - eccentric_start_time
-    
-    return 0
-
-
-def calculate_contact_time(trajectory_data, velocity_data):
-    if not trajectory_data or len(trajectory_data) < 2 or not velocity_data or len(velocity_data) < 2:
-        return 0
-    
-    baseline_height = trajectory_data[0].get('y', 0) if trajectory_data else 0
-    contact_start_time = None
-    contact_end_time = None
-    
-    for vel_point in velocity_data:
-        if vel_point['v'] < 0 and contact_start_time is None:
-            height_at_time = next((t for t in trajectory_data if abs(t['t'] - vel_point['t']) < 0.01), None)
-            if height_at_time and height_at_time['y'] < baseline_height:
-                contact_start_time = vel_point['t']
-                break
-            elif height_at_time is None:
-                contact_start_time = vel_point['t']
-                break
-    
-    min_height = float('inf')
-    min_height_index = -1
-    for i, point in enumerate(trajectory_data):
-        if point['y'] < min_height:
-            min_height = point['y']
-            min_height_index = i
-    
-    if min_height_index >= 0:
-        for i in range(min_height_index + 1, len(trajectory_data)):
-            if trajectory_data[i]['y'] >= baseline_height:
-                velocity_at_time = next((v for v in velocity_data if abs(v['t'] - trajectory_data[i]['t']) < 0.01), None)
-                if velocity_at_time and velocity_at_time['v'] > 0:
-                    contact_end_time = trajectory_data[i]['t']
-                    break
-    
-    if contact_start_time is not None and contact_end_time is None:
-        max_velocity = 0
-        max_velocity_time = None
-        for vel_point in velocity_data:
-            if vel_point['t'] >= contact_start_time and vel_point['v'] > max_velocity:
-                max_velocity = vel_point['v']
-                max_velocity_time = vel_point['t']
-        if max_velocity_time is not None:
-            contact_end_time = max_velocity_time
-    
-    if contact_start_time is not None and contact_end_time is not None and contact_end_time > contact_start_time:
-        return contact_end_time - contact_start_time
-    
-    eccentric_time = calculate_eccentric_time(trajectory_data, velocity_data)
-    concentric_time = calculate_concentric_time(trajectory_data, velocity_data, 70.0)
-    if eccentric_time > 0 and concentric_time > 0:
-        return eccentric_time + concentric_time
-    
-    return 0
-
-
-def calculate_estimated_power(velocity_data, trajectory_data, body_mass_kg=70.0):
-    if not velocity_data or len(velocity_data) < 2 or body_mass_kg <= 0:
-        return 0
-    
-    CONTACT_THRESHOLD = 5.0
-    height_map = {point['t']: point['y'] for point in trajectory_data} if trajectory_data else {}
-    accelerations = []
-    for i in range(1, len(velocity_data)):
-        prev = velocity_data[i - 1]
-        curr = velocity_data[i]
-        delta_t = curr['t'] - prev['t']
-        
-        if delta_t > 0 and np.isfinite(delta_t):
-            v1_ms = prev['v'] / 100
-            v2_ms = curr['v'] / 100
-            a_ms2 = (v2_ms - v1_ms) / delta_t
-            accelerations.append({
-                'time': curr['t'],
-                'a_ms2': a_ms2,
-                'velocity': curr['v']
-            })
-    
-    if len(accelerations) == 0:
-        return 0
-    
-    powers = []
-    for acc in accelerations:
-        height = height_map.get(acc['time'])
-        is_in_contact = height is not None and abs(height) <= CONTACT_THRESHOLD
-        
-        if is_in_contact and acc['velocity'] > 0 and abs(acc['a_ms2']) > 0.05:
-            force = body_mass_kg * (acc['a_ms2'] + G)
-            if force > body_mass_kg * G * 0.3:
-                v_ms = acc['velocity'] / 100
-                power = force * v_ms
-                if power > 0:
-                    powers.append(power)
-    
-    if len(powers) == 0:
-        return 0
-    
-    return max(powers)
+def wants_binary():
+    """True se il client preferisce la codifica binaria delle serie (series_codec.py)"""
+    best = request.accept_mimetypes.best_match(['application/json', 'application/octet-stream'])
+    return best == 'application/octet-stream'
 
 
 @app.route('/api/analysis/results', methods=['GET'])
 def analysis_results():
-    final_results = get_state('final_results')
+    snapshot = analysis_snapshot()
+    final_results = snapshot.final_results
     if not final_results:
         return jsonify({'success': False, 'error': 'Analisi non completata'})
     
-    trajectory_data = get_state('trajectory_data') or []
-    velocity_data = get_state('velocity_data') or []
+    trajectory_data = list(snapshot.trajectory)
     body_mass_kg = get_state('body_mass_kg') or 70.0
     
-    derived_velocity_data = compute_derived_velocity(trajectory_data)
-    
-    calculated_average_force = calculate_average_force_from_velocity(derived_velocity_data, trajectory_data, body_mass_kg)
-    calculated_takeoff_velocity = calculate_takeoff_velocity(trajectory_data, derived_velocity_data)
-    calculated_concentric_time = calculate_concentric_time(trajectory_data, derived_velocity_data, body_mass_kg)
-    calculated_eccentric_time = calculate_eccentric_time(trajectory_data, derived_velocity_data)
-    calculated_contact_time = calculate_contact_time(trajectory_data, derived_velocity_data)
-    calculated_estimated_power = calculate_estimated_power(derived_velocity_data, trajectory_data, body_mass_kg)
+    enhanced_results, derived_velocity_data = enhance_results(final_results, trajectory_data, body_mass_kg)
     phase_times = get_phase_times(trajectory_data, derived_velocity_data)
     
-    enhanced_results = final_results.copy()
-    enhanced_results.update({
-        'calculated_average_force': round(calculated_average_force, 1),
-        'calculated_takeoff_velocity': round(calculated_takeoff_velocity, 1),
-        'calculated_concentric_time': round(calculated_concentric_time, 3),
-        'calculated_eccentric_time': round(calculated_eccentric_time, 3),
-        'calculated_contact_time': round(calculated_contact_time, 3),
-        'calculated_estimated_power': round(calculated_estimated_power, 1),
-    })
+    # Codifica binaria colonnare su richiesta (Accept: application/octet-stream), JSON di default
+    if wants_binary():
+        payload = series_codec.pack(
+            {'success': True, 'results': enhanced_results, 'phase_times': phase_times},
+            {'trajectory': trajectory_data, 'velocity': derived_velocity_data},
+            compress=request.args.get('compress') == '1')
+        return Response(payload, mimetype='application/octet-stream')
     
     return jsonify({
         'success': True,
@@ -1055,59 +1534,241 @@ def analysis_results():
     })
 
 
+@app.route('/api/settings/trace', methods=['POST'])
+def set_trace():
+    """Abilita/disabilita il trace per frame delle analisi ({"enabled": bool})"""
+    data = request.json or {}
+    set_setting(trace_enabled=bool(data.get('enabled', True)))
+    return jsonify({'success': True, 'enabled': get_setting('trace_enabled')})
+
+
+@app.route('/api/traces', methods=['GET'])
+def list_traces():
+    return jsonify({'success': True, 'traces': trace_store.list(), 'last_trace_id': get_state('last_trace_id')})
+
+
+@app.route('/api/traces/<trace_id>', methods=['GET'])
+def download_trace(trace_id):
+    path = trace_store.path(trace_id)
+    if not path or not os.path.exists(path):
+        return jsonify({'success': False, 'error': 'Trace non disponibile'})
+    return send_file(os.path.abspath(path), mimetype='application/octet-stream', as_attachment=True,
+                     download_name=os.path.basename(path))
+
+
+@app.route('/api/analysis/replay', methods=['POST'])
+def replay_analysis():
+    """
+    Ripete l'analisi dal trace per frame, senza decodifica né MediaPipe.
+    {"trace_id": ultimo se assente, "thresholds": {...} soglie alternative,
+     "apply": true per sostituire i risultati correnti con quelli del replay}
+    """
+    data = request.get_json(silent=True) or {}
+    trace_id = data.get('trace_id') or get_state('last_trace_id')
+    path = trace_store.path(trace_id)
+    if not path or not os.path.exists(path):
+        return jsonify({'success': False, 'error': 'Trace non disponibile'})
+    
+    thresholds = data.get('thresholds') or None
+    if thresholds is not None:
+        if not isinstance(thresholds, dict) or set(thresholds) - set(DEFAULT_THRESHOLDS):
+            return jsonify({'success': False, 'error': 'Soglie non valide'})
+        try:
+            thresholds = {key: type(DEFAULT_THRESHOLDS[key])(value) for key, value in thresholds.items()}
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Soglie non valide'})
+    
+    try:
+        meta, records = read_trace(path)
+    except (OSError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)})
+    if not meta.get('pixel_to_cm_ratio'):
+        return jsonify({'success': False, 'error': 'Trace senza calibrazione'})
+    
+    start = time.perf_counter()
+    analyzer, trajectory_data, velocity_data, consistent = replay_trace(meta, records, thresholds)
+    body_mass = meta.get('body_mass_kg') or get_state('body_mass_kg')
+    final_results = build_final_results(analyzer, body_mass)
+    final_results['trace_id'] = trace_id
+    results, derived_velocity_data = enhance_results(final_results, trajectory_data, body_mass)
+    elapsed = time.perf_counter() - start
+    
+    if data.get('apply'):
+        if analysis_snapshot().analyzing:
+            return jsonify({'success': False, 'error': 'Analisi in corso'})
+        run = AnalysisRun.completed('replay', analyzer, body_mass, trajectory_data, velocity_data, final_results)
+        set_state(analyzer=analyzer, analysis_run=run)
+    
+    return jsonify({
+        'success': True,
+        'trace_id': trace_id,
+        'results': results,
+        'thresholds': analyzer.thresholds,
+        # Stessi stati per frame dell'analisi registrata (atteso se le soglie non cambiano)
+        'consistent': consistent,
+        'frames': int(records.size),
+        'detected_frames': int(records['detected'].sum()),
+        'replay_ms': round(elapsed * 1000, 2),
+        'replay_fps': round(records.size / elapsed, 1) if elapsed > 0 else None,
+        'phase_times': get_phase_times(trajectory_data, derived_velocity_data)
+    })
+
+
 @app.route('/api/analysis/pause', methods=['POST'])
 def pause_analysis():
-    if get_state('is_analyzing'):
-        set_state(is_paused=True)
+    run = get_state('analysis_run')
+    if run and run.analyzing:
+        run.pause()
         return jsonify({'success': True})
     return jsonify({'success': False})
 
 
 @app.route('/api/analysis/resume', methods=['POST'])
 def resume_analysis():
-    if get_state('is_analyzing'):
-        set_state(is_paused=False)
+    run = get_state('analysis_run')
+    if run and run.analyzing:
+        run.resume()
         return jsonify({'success': True})
     return jsonify({'success': False})
 
 
 @app.route('/api/analysis/stop', methods=['POST'])
 def stop_analysis():
-    set_state(is_analyzing=False, is_paused=False)
+    run = get_state('analysis_run')
+    if run:
+        run.stop()
+    job_executor.cancel(get_state('analysis_job_id'))
     return jsonify({'success': True})
 
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """
+    Lavori in background (in coda, in corso e recenti), filtrabili con ?kind=analysis.
+    Con una sessione indicata solo quelli della sessione, altrimenti tutti.
+    """
+    session_id = current_session().session_id if g.session_explicit else None
+    return jsonify({'success': True, 'jobs': job_executor.list(request.args.get('kind'), session_id),
+                    'executor': job_executor.stats(), 'file_jobs': file_job_executor.stats()})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_executor.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Lavoro non trovato'})
+    # Il risultato (es. report dello sweep) solo qui, non nell'elenco dei lavori
+    return jsonify({'success': True, 'job': job.snapshot(), 'result': job.result})
+
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Annullamento cooperativo: il lavoro termina al frame successivo"""
+    if not job_executor.cancel(job_id):
+        return jsonify({'success': False, 'error': 'Lavoro non trovato'})
+    return jsonify({'success': True, 'job': job_progress(job_id)})
+
+
+def session_info(session):
+    state = session.state
+    run = state.get('analysis_run')
+    snapshot = run.snapshot if run else EMPTY_ANALYSIS
+    return {
+        'session_id': session.session_id,
+        'video_path': os.path.basename(state['video_path']) if state.get('video_path') else None,
+        'is_recording': state.get('is_recording'),
+        'camera_index': state.get('recording_camera_index') if state.get('is_recording') else state.get('camera_index'),
+        'is_calibrating': state.get('is_calibrating'),
+        'is_analyzing': snapshot.analyzing,
+        'run_id': snapshot.run_id,
+        'created': session.created,
+        'last_seen': session.last_seen
+    }
+
+
+def close_session(session):
+    """Ferma registrazione, calibrazione, analisi e lavori in coda della sessione"""
+    with sessions.activate(session):
+        for key in ('analysis_run', 'calibration_run'):
+            run = get_state(key)
+            if run is not None:
+                run.stop()
+        for job in job_executor.list(session_id=session.session_id):
+            if job['state'] in ('queued', 'running'):
+                job_executor.cancel(job['job_id'])
+        if get_state('is_recording'):
+            finish_recording()
+
+
+@app.route('/api/sessions', methods=['GET'])
+def list_sessions():
+    """Sessioni aperte (una per postazione), lavori in esecuzione e slot di inferenza"""
+    return jsonify({
+        'success': True,
+        'sessions': [session_info(session) for session in session_registry.list()],
+        'max_sessions': session_registry.max_sessions,
+        'inference': inference_limiter.stats(),
+        'executor': job_executor.stats()
+    })
+
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """Apre una sessione ({"session_id": "camera_2"}); le richieste la indicano con X-Session-Id"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('session_id'):
+        return jsonify({'success': False, 'error': 'session_id mancante'})
+    try:
+        session = session_registry.get(str(data['session_id']))
+    except SessionError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    return jsonify({'success': True, 'session': session_info(session)})
+
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """Chiude la sessione: ferma registrazione e lavori, poi la toglie dal registro"""
+    session = session_registry.get(session_id, create=False)
+    if session is None:
+        return jsonify({'success': False, 'error': 'Sessione non trovata'})
+    try:
+        session_registry.remove(session_id)
+    except SessionError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    close_session(session)
+    return jsonify({'success': True})
+
+
+@app.route('/api/settings/inference', methods=['POST'])
+def set_inference():
+    """Inferenze MediaPipe contemporanee su tutte le sessioni ({"max_concurrent": 1..16})"""
+    data = request.json or {}
+    try:
+        limit = int(data.get('max_concurrent'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Valore non valido'})
+    if not 1 <= limit <= 16:
+        return jsonify({'success': False, 'error': 'max_concurrent deve essere tra 1 e 16'})
+    inference_limiter.set_limit(limit)
+    return jsonify({'success': True, **inference_limiter.stats()})
+
+
 @app.route('/api/results/save', methods=['POST'])
 def save_results():
     try:
-        final_results = get_state('final_results')
+        snapshot = analysis_snapshot()
+        final_results = snapshot.final_results
         if not final_results:
             return jsonify({'success': False, 'error': 'Nessun risultato da salvare'})
         
-        trajectory_data = get_state('trajectory_data') or []
-        velocity_data = get_state('velocity_data') or []
+        trajectory_data = list(snapshot.trajectory)
+        velocity_data = list(snapshot.velocity)
         body_mass_kg = get_state('body_mass_kg') or 70.0
         
-        derived_velocity_data = compute_derived_velocity(trajectory_data)
-        
-        calculated_average_force = calculate_average_force_from_velocity(derived_velocity_data, trajectory_data, body_mass_kg)
-        calculated_takeoff_velocity = calculate_takeoff_velocity(trajectory_data, derived_velocity_data)
-        calculated_concentric_time = calculate_concentric_time(trajectory_data, derived_velocity_data, body_mass_kg)
-        calculated_eccentric_time = calculate_eccentric_time(trajectory_data, derived_velocity_data)
-        calculated_contact_time = calculate_contact_time(trajectory_data, derived_velocity_data)
-        calculated_estimated_power = calculate_estimated_power(derived_velocity_data, trajectory_data, body_mass_kg)
+        # Nel file salvato le metriche ricalcolate sostituiscono quelle dell'analisi (chiavi senza prefisso)
+        enhanced_results, derived_velocity_data = enhance_results(final_results, trajectory_data, body_mass_kg, prefix='')
         phase_times = get_phase_times(trajectory_data, derived_velocity_data)
         
-        enhanced_results = final_results.copy()
-        enhanced_results.update({
-            'average_force': round(calculated_average_force, 1),
-            'takeoff_velocity': round(calculated_takeoff_velocity, 1),
-            'concentric_time': round(calculated_concentric_time, 3),
-            'eccentric_time': round(calculated_eccentric_time, 3),
-            'contact_time': round(calculated_contact_time, 3),
-            'estimated_power': round(calculated_estimated_power, 1),
-        })
-        
         save_data = {
             'timestamp': datetime.now().isoformat(),
             'results': enhanced_results,
@@ -1115,13 +1776,17 @@ def save_results():
             'velocity': derived_velocity_data,
             'phase_times': phase_times,
             'settings': {
-                'fps': get_state('fps'),
+                'fps': final_results.get('fps', get_state('fps')),
                 'person_height_cm': get_state('person_height_cm'),
                 'body_mass_kg': body_mass_kg
             }
         }
         
         save_dir = os.path.expanduser('~\\AppData\\Roaming\\Kin.ai\\last_jump')
+        session_id = current_session().session_id
+        if session_id != DEFAULT_SESSION:
+            # Ultimo salto di ogni postazione in una sottocartella propria
+            save_dir = os.path.join(save_dir, session_id)
         os.makedirs(save_dir, exist_ok=True)
         
         file_path = os.path.join(save_dir, 'results.json')
@@ -1129,45 +1794,24 @@ def save_results():
             json.dump(save_data, f, indent=2, ensure_ascii=False)
         
         test_id = None
+        athlete_id = None
         if request.json:
             test_id = request.json.get('test_id')
+            athlete_id = request.json.get('athlete_id')
         
         test_results_path = None
         jump_key = None 
         
         if test_id:
-            test_dir = os.path.expanduser(f'~\\AppData\\Roaming\\Kin.ai\\test_results\\{test_id}')
-            os.makedirs(test_dir, exist_ok=True)
-            
-            test_results_path = os.path.join(test_dir, 'results.json')
-            
-            existing_data = {}
-            if os.path.exists(test_results_path):
-                try:
-                    with open(test_results_path, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                except Exception as e:
-                    print(f"Errore lettura file esistente: {e}")
-                    existing_data = {}
-            
-            jump_keys = [key for key in existing_data.keys() if key.startswith('jump_')]
-            if jump_keys:
-                jump_numbers = []
-                for key in jump_keys:
-                    try:
-                        num = int(key.replace('jump_', ''))
-                        jump_numbers.append(num)
-                    except ValueError:
-                        pass
-                next_jump_num = max(jump_numbers) + 1 if jump_numbers else 1
-            else:
-                next_jump_num = 1
-            
-            jump_key = f'jump_{next_jump_num}'
-            existing_data[jump_key] = save_data
-            
-            with open(test_results_path, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, indent=2, ensure_ascii=False)
+            # Il trace dell'analisi resta disponibile per replay e sweep dei parametri
+            trace_id = enhanced_results.get('trace_id')
+            if trace_id and not trace_store.keep(trace_id):
+                enhanced_results.pop('trace_id')
+            # Archivio SQLite: un INSERT per salto, nessuna riscrittura dei salti precedenti
+            jump_number = results_store.add_jump(str(test_id), save_data,
+                                                 str(athlete_id) if athlete_id is not None else None)
+            jump_key = f'jump_{jump_number}'
+            test_results_path = results_store.path
         
         response = {
             'success': True, 
@@ -1185,19 +1829,94 @@ def save_results():
         return jsonify({'success': False, 'error': f'Errore salvataggio: {str(e)}'})
 
 
+@app.route('/api/tests/<test_id>/results', methods=['GET'])
+def get_test_results(test_id):
+    """Salti salvati di un test, nello stesso formato dei vecchi results.json"""
+    try:
+        jumps = results_store.get_test(test_id)
+        if wants_binary():
+            # Serie dei salti nel payload binario come '<jump_N>.trajectory' / '<jump_N>.velocity'
+            series = {}
+            for key, jump in jumps.items():
+                series[f'{key}.trajectory'] = jump.pop('trajectory')
+                series[f'{key}.velocity'] = jump.pop('velocity')
+            payload = series_codec.pack({'success': True, 'test_id': test_id, 'jumps': jumps}, series,
+                                        compress=request.args.get('compress') == '1')
+            return Response(payload, mimetype='application/octet-stream')
+        return jsonify({'success': True, 'test_id': test_id, 'jumps': jumps})
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Errore lettura risultati: {str(e)}'})
+
+
+def history_filters():
+    """Filtri comuni delle query sullo storico (query string)"""
+    return {
+        'athlete_id': request.args.get('athlete_id'),
+        'test_id': request.args.get('test_id'),
+        'date_from': request.args.get('from'),
+        'date_to': request.args.get('to')
+    }
+
+
+@app.route('/api/history/jumps', methods=['GET'])
+def history_jumps():
+    """Salti salvati (solo metriche) filtrati per atleta, test e date"""
+    try:
+        limit = request.args.get('limit', type=int)
+        rows = results_store.query_jumps(limit=limit, **history_filters())
+        return jsonify({'success': True, 'jumps': rows_to_jumps(rows)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Errore lettura storico: {str(e)}'})
+
+
+@app.route('/api/history/summary', methods=['GET'])
+def history_summary():
+    """Best, media, SD e andamento nel tempo delle metriche, opzionalmente per atleta o test"""
+    group_by = request.args.get('group_by')
+    if group_by not in (None, 'athlete', 'test'):
+        return jsonify({'success': False, 'error': 'group_by deve essere athlete o test'})
+    try:
+        rows = results_store.query_jumps(**history_filters())
+        response = {'success': True, **summarize(rows)}
+        if group_by:
+            response['groups'] = summarize_by(rows, f'{group_by}_id')
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Errore lettura storico: {str(e)}'})
+
+
 @app.route('/api/video/info', methods=['GET'])
 def video_info():
     path = get_state('video_path')
-    total = get_state('total_frames')
-    fps = get_state('fps')
+    total = analysis_snapshot().total_frames
+    fps = get_video_fps(path, default=get_state('fps')) if path and os.path.exists(path) else get_state('fps')
     return jsonify({
         'success': True,
         'video_path': os.path.basename(path) if path else None,
         'total_frames': total,
-        'fps': fps
+        'fps': fps,
+        'proxy_status': proxy_jobs.get_status(path) if path else None
     })
 
 
+@app.route('/api/video/thumbnails', methods=['GET'])
+def video_thumbnails():
+    """Miniature di tutto il video in un unico binario cacheabile (formato in thumbnails.py)"""
+    path = get_state('video_path')
+    if not path or not os.path.exists(path):
+        return jsonify({'success': False, 'error': 'Nessun video disponibile'})
+    
+    status = thumbnail_jobs.get_status(path)
+    if status == 'missing':
+        thumbnail_jobs.schedule(path)
+        status = 'pending'
+    if status != 'ready':
+        return jsonify({'success': False, 'status': status})
+    
+    return send_file(os.path.abspath(thumbnails_path(path)), mimetype='application/octet-stream',
+                     conditional=True, etag=True, max_age=86400)
+
+
 @app.route('/api/video/frame_at', methods=['GET'])
 def video_frame_at():
     try:
@@ -1209,30 +1928,85 @@ def video_frame_at():
     if not path or not os.path.exists(path):
         return jsonify({'success': False, 'error': 'Nessun video disponibile'})
 
-    cap = cv2.VideoCapture(path)
-    if not cap.isOpened():
-        return jsonify({'success': False, 'error': 'Impossibile aprire il video'})
-    
-    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    index = max(0, min(index, total - 1))
-    
-    cap.set(cv2.CAP_PROP_POS_FRAMES, index)
-    ret, frame = cap.read()
-    cap.release()
-    
-    if not ret or frame is None:
+    storage.touch(path)
+    # Decoder persistente + cache dei frame codificati (scrubbing veloce)
+    result = frame_server.frame_at(get_analysis_path(path), index)
+    if result is None:
         return jsonify({'success': False, 'error': 'Frame non disponibile'})
     
-    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-    
+    frame, index, total = result
     return jsonify({
         'success': True,
-        'frame': base64.b64encode(buffer).decode('utf-8'),
+        'frame': frame,
         'index': index,
         'total_frames': total
     })
 
 
+@app.route('/api/analysis/sweep', methods=['POST'])
+def sweep_thresholds():
+    """
+    Sweep delle soglie di rilevamento sui trace dei salti salvati, in parallelo
+    su più processi e senza nuova inferenza. Avviato come lavoro in background:
+    il report è in GET /api/jobs/<job_id> a lavoro concluso.
+    {"grid": {"jump_start": [0.03, 0.05, 0.07], "phase_velocity": [3, 5, 8], ...},
+     "trace_ids": [...] oppure i filtri "athlete_id", "test_id", "from", "to" dei salti salvati,
+     "workers": numero di processi (default: tutti i core liberi)}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('trace_ids'):
+            trace_ids = [str(trace_id) for trace_id in data['trace_ids']]
+        else:
+            rows = results_store.jump_traces(athlete_id=data.get('athlete_id'), test_id=data.get('test_id'),
+                                             date_from=data.get('from'), date_to=data.get('to'))
+            trace_ids = [row[2] for row in rows]
+        workers = int(data['workers']) if data.get('workers') else None
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'error': f'Richiesta non valida: {str(e)}'})
+    
+    traces = {}
+    for trace_id in trace_ids:
+        path = trace_store.path(trace_id)
+        if path and os.path.exists(path):
+            traces[trace_id] = path
+    
+    try:
+        combinations = check_sweep(traces, data.get('grid'))
+        job = submit_job('sweep', run_sweep, traces, data.get('grid'), workers)
+    except (SweepError, JobRejected) as e:
+        return jsonify({'success': False, 'error': str(e)})
+    
+    return jsonify({
+        'success': True,
+        'job_id': job.job_id,
+        'combinations': len(combinations),
+        'traces': len(traces),
+        'missing_traces': len(set(trace_ids)) - len(traces)
+    })
+
+
 if __name__ == '__main__':
-    print("🚀 Avvio server Flask su http://127.0.0.1:5000 (Ottimizzato)")
-    app.run(debug=False, host='127.0.0.1', port=5000, threaded=True)
\ No newline at end of file
+    # Processi di lavoro dello sweep nell'eseguibile PyInstaller
+    multiprocessing.freeze_support()
+    print("🚀 Avvio server su http://127.0.0.1:5000 (waitress)")
+    # Bind subito, warm-up in background: la GUI riceve risposte mentre MediaPipe si carica
+    server = create_server(app, host='127.0.0.1', port=5000, threads=REQUEST_THREADS)
+    startup['listening_after_s'] = round(time.perf_counter() - STARTUP_T0, 3)
+    print(f"✅ In ascolto dopo {startup['listening_after_s']} s, warm-up dei modelli in corso")
+    startup['warm_up_thread'] = start_warm_up(WARM_UP_MODULES, WARM_UP_MODELS)
+    camera_watcher.start()
+    storage.start()
+    # SIGTERM come Ctrl+C: chiusura ordinata dei lavori e della registrazione
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        for session in session_registry.list():
+            close_session(session)
+        pending = job_executor.shutdown(JOB_SHUTDOWN_TIMEOUT) + file_job_executor.shutdown(JOB_SHUTDOWN_TIMEOUT)
+        if pending:
+            print(f"⚠️ Lavori non terminati alla chiusura: {', '.join(pending)}")
\ No newline at end of file
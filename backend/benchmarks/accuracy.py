@@ -0,0 +1,286 @@
+"""
+Accuratezza vs velocità delle modalità veloci della pipeline.
+
+Traiettorie analitiche dell'anca (synthetic.py: contromovimento, spinta, volo
+parabolico, atterraggio) passano per JumpAnalyzer e per le metriche di app.py
+(build_final_results + enhance_results). Per ogni configurazione si riportano
+l'errore su altezza, tempo di volo, tempo di contatto e velocità di stacco
+rispetto ai valori veri, accanto al throughput.
+
+Modalità traiettoria (veloce, senza video): fps sorgente x stride (un frame ogni N)
+x rumore gaussiano sulla quota dell'anca (px) x filtro causale (none, mean:N,
+median:N, ema:alpha), con più prove per il rumore.
+
+Modalità video (--video): il salto è renderizzato e la quota dell'anca è ricavata
+da MediaPipe con fattore di scala del frame, stride e model_complexity scelti;
+il throughput include decodifica, ridimensionamento e posa. La calibrazione usa
+il rapporto cm/px vero, così l'errore misurato è solo quello di tracking e rilevamento.
+
+    cd backend
+    python benchmarks/accuracy.py --fps 60,120 --stride 1,2,4 --noise 0,1,2 --smoothing none,ema:0.5
+    python benchmarks/accuracy.py --video --scales 1,0.5,0.25 --complexity 0,1 --output accuracy.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+
+from analysis_trace import run_analyzer
+from synthetic import cm_per_pixel, ground_truth, hip_y_pixels, jump_params, render_jump_video, sample_times
+
+# Metrica dei risultati -> metrica vera di riferimento
+COMPARED = {
+    'max_height': 'max_height',
+    'flight_time': 'flight_time',
+    'contact_time': 'contact_time',
+    'calculated_contact_time': 'contact_time',
+    'takeoff_velocity': 'takeoff_velocity',
+    'calculated_takeoff_velocity': 'takeoff_velocity',
+}
+
+
+def parse_list(text, cast=float):
+    return [cast(value) for value in text.split(',') if value.strip()]
+
+
+def smooth(values, spec):
+    """Filtro causale (usa solo i campioni passati, come farebbe il loop in tempo reale)"""
+    if spec == 'none':
+        return values
+    kind, _, param = spec.partition(':')
+    out = np.empty_like(values)
+    if kind == 'ema':
+        alpha = float(param or 0.5)
+        out[0] = values[0]
+        for i in range(1, len(values)):
+            out[i] = alpha * values[i] + (1 - alpha) * out[i - 1]
+        return out
+    size = int(param or 3)
+    reduce = {'mean': np.mean, 'median': np.median}.get(kind)
+    if reduce is None:
+        raise ValueError(f"Filtro sconosciuto: {spec}")
+    for i in range(len(values)):
+        out[i] = reduce(values[max(0, i - size + 1):i + 1])
+    return out
+
+
+def run_series(app, times, hip_px, fps, ratio, body_mass, thresholds=None):
+    """
+    Quote dell'anca (px) -> risultati come nell'analisi reale (stessa raccolta
+    di traiettoria e velocità del replay dei trace).
+    Restituisce (risultati, secondi spesi nel JumpAnalyzer e nelle metriche).
+    """
+    analyzer = app.JumpAnalyzer(fps=fps, thresholds=thresholds)
+    analyzer.pixel_to_cm_ratio = ratio
+    analyzer.calibrated_with_height = True
+
+    start = time.perf_counter()
+    trajectory, _, _ = run_analyzer(analyzer, [float(t) for t in times], [float(y) for y in hip_px])
+    final_results = app.build_final_results(analyzer, body_mass)
+    results, _ = app.enhance_results(final_results, trajectory, body_mass)
+    return results, time.perf_counter() - start
+
+
+def errors(results, truth):
+    return {metric: float(results[metric]) - truth[reference] for metric, reference in COMPARED.items()}
+
+
+def aggregate(trials):
+    """Bias (errore medio) ed errore assoluto medio per metrica su più prove"""
+    summary = {}
+    for metric in COMPARED:
+        values = np.array([trial[metric] for trial in trials])
+        summary[metric] = {'bias': round(float(values.mean()), 4),
+                           'mae': round(float(np.abs(values).mean()), 4)}
+    return summary
+
+
+def trajectory_configs(args, app, body_mass):
+    rows = []
+    rng = np.random.default_rng(args.seed)
+    for jump_height, fps in itertools.product(args.jump_heights, args.fps):
+        jump = jump_params(jump_height_cm=jump_height)
+        truth = ground_truth(jump)
+        times = sample_times(jump, fps)
+        clean = hip_y_pixels(times, jump, args.height)
+        ratio = cm_per_pixel(jump, args.height)
+        for stride, noise, smoothing in itertools.product(args.stride, args.noise, args.smoothing):
+            trials, elapsed, frames = [], 0.0, 0
+            for _ in range(args.trials if noise > 0 else 1):
+                hip_px = clean[::stride] + rng.normal(0.0, noise, clean[::stride].shape) if noise > 0 \
+                    else clean[::stride]
+                results, seconds = run_series(app, times[::stride], smooth(hip_px, smoothing),
+                                              fps / stride, ratio, body_mass)
+                trials.append(errors(results, truth))
+                elapsed += seconds
+                frames += len(hip_px)
+            rows.append({
+                'mode': 'trajectory',
+                'jump_height_cm': jump_height,
+                'source_fps': fps,
+                'stride': stride,
+                'effective_fps': fps / stride,
+                'noise_px': noise,
+                'smoothing': smoothing,
+                'trials': len(trials),
+                'throughput_fps': round(frames / elapsed, 1) if elapsed > 0 else None,
+                'errors': aggregate(trials),
+            })
+    return rows
+
+
+def extract_hip_series(video_path, scale, stride, complexity):
+    """
+    Quota dell'anca per frame con MediaPipe, nelle unità (px) del frame originale.
+    I frame senza persona rilevata sono saltati, come nel loop di analisi.
+    """
+    import mediapipe as mp
+    mp_pose = mp.solutions.pose
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    times, hips = [], []
+    processed = 0
+    index = -1
+
+    start = time.perf_counter()
+    with mp_pose.Pose(model_complexity=complexity, min_detection_confidence=0.5,
+                      min_tracking_confidence=0.5) as pose:
+        while True:
+            # grab() senza decodifica completa per i frame saltati
+            if not cap.grab():
+                break
+            index += 1
+            if index % stride:
+                continue
+            _, frame = cap.retrieve()
+            if scale != 1.0:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            processed += 1
+            if not results.pose_landmarks:
+                continue
+            landmarks = results.pose_landmarks.landmark
+            left_hip = landmarks[mp_pose.PoseLandmark.LEFT_HIP]
+            right_hip = landmarks[mp_pose.PoseLandmark.RIGHT_HIP]
+            times.append(index / fps)
+            hips.append((left_hip.y + right_hip.y) / 2 * frame_height)
+    elapsed = time.perf_counter() - start
+    cap.release()
+    return np.array(times), np.array(hips), processed, elapsed, index + 1, fps
+
+
+def video_configs(args, app, body_mass):
+    jump = jump_params(jump_height_cm=args.jump_heights[0])
+    workdir = tempfile.mkdtemp(prefix='jump_accuracy_')
+    video_path = os.path.join(workdir, 'synthetic.mp4')
+    truth = render_jump_video(video_path, jump, args.width, args.height, args.video_fps)
+    ratio = cm_per_pixel(jump, args.height)
+    print(f"Video sintetico {video_path}: {truth['frames']} frame "
+          f"{args.width}x{args.height}@{args.video_fps}")
+
+    rows = []
+    for scale, stride, complexity in itertools.product(args.scales, args.stride, args.complexity):
+        times, hips, processed, elapsed, total, fps = extract_hip_series(video_path, scale, stride, complexity)
+        for smoothing in args.smoothing:
+            row = {
+                'mode': 'video',
+                'jump_height_cm': args.jump_heights[0],
+                'source_fps': fps,
+                'stride': stride,
+                'effective_fps': fps / stride,
+                'scale': scale,
+                'resolution': f"{int(args.width * scale)}x{int(args.height * scale)}",
+                'model_complexity': complexity,
+                'smoothing': smoothing,
+                'throughput_fps': round(processed / elapsed, 1) if elapsed > 0 else None,
+                # Secondi di video analizzati per secondo di calcolo (>1: più veloce del tempo reale)
+                'realtime_factor': round(total / fps / elapsed, 2) if elapsed > 0 else None,
+                'detected': f"{len(hips)}/{processed}",
+            }
+            if len(hips) < 2:
+                row['errors'] = None
+            else:
+                results, _ = run_series(app, times, smooth(hips, smoothing), fps / stride, ratio, body_mass)
+                row['errors'] = aggregate([errors(results, truth)])
+            rows.append(row)
+    return rows, truth
+
+
+def print_table(rows):
+    header = (f"{'configurazione':44s} {'fps eff':>7s} {'frame/s':>9s} "
+              f"{'altezza':>8s} {'volo ms':>8s} {'contatto ms':>11s} {'v0 cm/s':>8s}")
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        if row['mode'] == 'video':
+            label = f"{row['resolution']} c{row['model_complexity']} s{row['stride']} {row['smoothing']}"
+        else:
+            label = (f"{row['jump_height_cm']:g}cm {row['source_fps']:g}fps s{row['stride']} "
+                     f"rumore {row['noise_px']:g}px {row['smoothing']}")
+        errors = row['errors']
+        if errors is None:
+            print(f"{label:44s} {row['effective_fps']:7.1f} {row['throughput_fps'] or 0:9.1f}  nessuna posa")
+            continue
+        print(f"{label:44s} {row['effective_fps']:7.1f} {row['throughput_fps'] or 0:9.1f} "
+              f"{errors['max_height']['mae']:8.2f} {errors['flight_time']['mae'] * 1000:8.1f} "
+              f"{errors['calculated_contact_time']['mae'] * 1000:11.1f} "
+              f"{errors['calculated_takeoff_velocity']['mae']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jump-heights', type=parse_list, default=[30.0], help='cm, separati da virgola')
+    parser.add_argument('--fps', type=parse_list, default=[30.0, 60.0, 120.0])
+    parser.add_argument('--stride', type=lambda text: parse_list(text, int), default=[1, 2])
+    parser.add_argument('--noise', type=parse_list, default=[0.0, 1.0, 2.0], help='Deviazione standard (px)')
+    parser.add_argument('--smoothing', type=lambda text: parse_list(text, str), default=['none', 'ema:0.5'])
+    parser.add_argument('--trials', type=int, default=20, help='Prove per configurazione con rumore')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--body-mass', type=float, default=70.0)
+    parser.add_argument('--video', action='store_true', help='Anche la modalità video (MediaPipe)')
+    parser.add_argument('--video-fps', type=float, default=60)
+    parser.add_argument('--scales', type=parse_list, default=[1.0, 0.5])
+    parser.add_argument('--complexity', type=lambda text: parse_list(text, int), default=[0, 1])
+    parser.add_argument('--output', default=None, help='File JSON dei risultati')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    # app.py crea uploads/ nella directory corrente: ambiente di lavoro temporaneo
+    os.chdir(tempfile.mkdtemp(prefix='jump_accuracy_'))
+    import app
+
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'config': vars(args),
+              'truth': ground_truth(jump_params(jump_height_cm=args.jump_heights[0]))}
+    rows = trajectory_configs(args, app, args.body_mass)
+    print("Traiettorie analitiche (errore assoluto medio)")
+    print_table(rows)
+    report['trajectory'] = rows
+
+    if args.video:
+        video_rows, video_truth = video_configs(args, app, args.body_mass)
+        print("\nVideo sintetico con MediaPipe (errore assoluto)")
+        print_table(video_rows)
+        report['video'] = video_rows
+        report['video_truth'] = video_truth
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=float)
+        print(f"Risultati salvati in {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""
+Benchmark della pipeline di analisi su un video sintetico (valori veri noti).
+
+Misura, sullo stesso video generato da synthetic.py:
+- calibration_loop e analysis_loop completi (frame/s e tempo per fase da metrics)
+- get_head_y (segmentazione) sui frame del video
+- JumpAnalyzer.process_frame sulla traiettoria analitica dell'anca
+- le funzioni calculate_* di app.py, compute_derived_velocity, get_phase_times
+- /api/video/frame_at in scorrimento sequenziale e ad accesso casuale
+
+I risultati (frame/s, latenze p50/p95/p99) sono salvati in JSON insieme a commit,
+versioni delle librerie e configurazione, per confrontare versioni diverse:
+
+    cd backend
+    python benchmarks/run_benchmarks.py --output bench_new.json --compare bench_old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import cv2
+import numpy as np
+
+from synthetic import cm_per_pixel, hip_y_pixels, jump_params, render_jump_video, sample_times
+
+
+def summarize(samples, frames=None):
+    """Statistiche di una serie di durate (s): frame/s, media e percentili in ms"""
+    samples = np.asarray(samples, dtype=float)
+    if samples.size == 0:
+        return {'n': 0}
+    total = float(samples.sum())
+    count = samples.size if frames is None else frames
+    return {
+        'n': int(samples.size),
+        'fps': round(count / total, 2) if total > 0 else None,
+        'mean_ms': round(float(samples.mean()) * 1000, 4),
+        'p50_ms': round(float(np.percentile(samples, 50)) * 1000, 4),
+        'p95_ms': round(float(np.percentile(samples, 95)) * 1000, 4),
+        'p99_ms': round(float(np.percentile(samples, 99)) * 1000, 4),
+    }
+
+
+def timed(function, *args, repeat=1, **kwargs):
+    """Durate (s) di `repeat` chiamate; restituisce anche l'ultimo risultato"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def versions():
+    found = {'python': platform.python_version(), 'platform': platform.platform()}
+    for package in ('opencv-python', 'mediapipe', 'numpy', 'flask'):
+        try:
+            found[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            found[package] = None
+    found['cv2'] = cv2.__version__
+    return found
+
+
+def calibrated_analyzer(app, fps, jump, frame_height):
+    """JumpAnalyzer già calibrato con il rapporto vero (cm/px) del video sintetico"""
+    analyzer = app.JumpAnalyzer(fps=fps)
+    analyzer.pixel_to_cm_ratio = cm_per_pixel(jump, frame_height)
+    analyzer.calibrated_with_height = True
+    analyzer.person_height_cm = jump['person_height_cm']
+    return analyzer
+
+
+def bench_calibration(app, video_path, fps, repeat):
+    """calibration_loop completo; la pausa di 1s dopo il successo è esclusa dal tempo per fase"""
+    results = []
+    for _ in range(repeat):
+        run = app.CalibrationRun(app.JumpAnalyzer(fps=fps), video_path, app.get_state('person_height_cm'),
+                                 max_frames=int(fps * 5))
+        app.set_state(is_calibrating=True, calibration_result=None)
+        start = time.perf_counter()
+        app.calibration_loop(run)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'elapsed_s': round(elapsed, 3),
+            'result': app.get_state('calibration_result'),
+            'stages': app.metrics.run_summary('calibration', run.metrics),
+        })
+    return results
+
+
+def bench_analysis(app, video_path, fps, jump, frame_height, repeat):
+    runs = []
+    final = None
+    for _ in range(repeat):
+        run = app.AnalysisRun('analysis', calibrated_analyzer(app, fps, jump, frame_height),
+                              app.get_state('body_mass_kg'))
+        app.set_state(analysis_cache_key=None, analysis_run=run)
+        start = time.perf_counter()
+        app.analysis_loop(run, video_path)
+        elapsed = time.perf_counter() - start
+        final = run.final_results
+        measured = final.get('metrics') or {}
+        runs.append({
+            'elapsed_s': round(elapsed, 3),
+            'frames': measured.get('frames'),
+            'achieved_fps': measured.get('achieved_fps'),
+            'stages': measured.get('stages'),
+            'state_lock': measured.get('state_lock'),
+        })
+    results = {key: value for key, value in final.items() if key != 'metrics'}
+    return runs, results, run.trajectory, run.velocity
+
+
+def bench_head_y(app, video_path, limit):
+    cap = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    app.get_head_y(frames[0])  # Caricamento del modello escluso dalla misura
+    samples = []
+    for frame in frames:
+        start = time.perf_counter()
+        app.get_head_y(frame)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_process_frame(app, jump, fps, frame_height, repeat):
+    """process_frame sulla quota dell'anca in pixel ricavata dalla traiettoria analitica"""
+    times = sample_times(jump, fps)
+    hip_px = hip_y_pixels(times, jump, frame_height)
+    samples = []
+    analyzer = None
+    for _ in range(repeat):
+        analyzer = calibrated_analyzer(app, fps, jump, frame_height)
+        for t, hip_y in zip(times, hip_px):
+            start = time.perf_counter()
+            analyzer.process_frame(float(hip_y), float(t))
+            samples.append(time.perf_counter() - start)
+    summary = summarize(samples)
+    summary['max_height'] = round(analyzer.max_jump_height_cm, 2)
+    summary['flight_time'] = round(analyzer.get_flight_time(), 3)
+    return summary
+
+
+def bench_calculations(app, trajectory, velocity, body_mass, repeat):
+    if not trajectory or not velocity:
+        return {}
+    calls = {
+        'compute_derived_velocity': lambda: app.compute_derived_velocity(trajectory),
+        'get_phase_times': lambda: app.get_phase_times(trajectory, velocity),
+        'calculate_average_force_from_velocity':
+            lambda: app.calculate_average_force_from_velocity(velocity, trajectory, body_mass),
+        'calculate_takeoff_velocity': lambda: app.calculate_takeoff_velocity(trajectory, velocity),
+        'calculate_concentric_time': lambda: app.calculate_concentric_time(trajectory, velocity, body_mass),
+        'calculate_eccentric_time': lambda: app.calculate_eccentric_time(trajectory, velocity),
+        'calculate_contact_time': lambda: app.calculate_contact_time(trajectory, velocity),
+        'calculate_estimated_power': lambda: app.calculate_estimated_power(velocity, trajectory, body_mass),
+    }
+    results = {}
+    for name, call in calls.items():
+        samples, value = timed(call, repeat=repeat)
+        results[name] = summarize(samples)
+        if isinstance(value, (int, float)):
+            results[name]['value'] = round(float(value), 4)
+    return results
+
+
+def bench_frame_at(app, video_path, total_frames, count, seed=0):
+    """Scrubbing tramite l'endpoint: indici consecutivi e indici casuali"""
+    client = app.app.test_client()
+    app.set_state(video_path=video_path)
+    app.frame_server.frame_at(app.get_analysis_path(video_path), 0)  # Apertura decoder esclusa
+
+    def run(indices):
+        samples = []
+        for index in indices:
+            start = time.perf_counter()
+            response = client.get(f'/api/video/frame_at?index={index}')
+            samples.append(time.perf_counter() - start)
+            if not response.get_json().get('success'):
+                raise RuntimeError(f"frame_at fallito all'indice {index}")
+        return summarize(samples)
+
+    count = min(count, total_frames)
+    rng = random.Random(seed)
+    return {
+        'sequential': run(range(count)),
+        'random': run([rng.randrange(total_frames) for _ in range(count)]),
+    }
+
+
+def compare(old, new, path=''):
+    """Stampa il rapporto nuovo/vecchio di fps e latenze per le voci comuni"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in new:
+            if key in old:
+                compare(old[key], new[key], f"{path}.{key}" if path else key)
+        return
+    if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+        return
+    if path.endswith(('fps', '_ms', 'elapsed_s')):
+        ratio = new / old
+        print(f"{path:70s} {old:>12.3f} -> {new:>12.3f}  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--fps', type=float, default=60)
+    parser.add_argument('--duration', type=float, default=None, help='Secondi (default: durata del salto)')
+    parser.add_argument('--jump-height', type=float, default=30.0, help='Altezza del salto (cm)')
+    parser.add_argument('--person-height', type=float, default=175.0, help='Statura della figura (cm)')
+    parser.add_argument('--body-mass', type=float, default=70.0)
+    parser.add_argument('--repeat', type=int, default=1, help='Ripetizioni dei loop completi')
+    parser.add_argument('--head-frames', type=int, default=60, help='Frame per get_head_y')
+    parser.add_argument('--frames-at', type=int, default=120, help='Richieste per frame_at')
+    parser.add_argument('--skip-calibration', action='store_true')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', default=None, help='JSON di un benchmark precedente')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    jump = jump_params(jump_height_cm=args.jump_height, person_height_cm=args.person_height)
+
+    # app.py crea uploads/ nella directory corrente: ambiente di lavoro temporaneo
+    workdir = tempfile.mkdtemp(prefix='jump_bench_')
+    os.chdir(workdir)
+    import app
+
+    app.metrics.enabled = True
+    app.set_state(person_height_cm=args.person_height, body_mass_kg=args.body_mass)
+
+    video_path = os.path.join(workdir, 'synthetic.mp4')
+    start = time.perf_counter()
+    truth = render_jump_video(video_path, jump, args.width, args.height, args.fps, args.duration)
+    print(f"Video sintetico {video_path}: {truth['frames']} frame {args.width}x{args.height}@{args.fps} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'versions': versions(),
+        'config': {**vars(args), 'jump': jump,
+                   'pose_model_complexity': app.POSE_MODEL_COMPLEXITY},
+        'truth': truth,
+        'results': {},
+    }
+    results = report['results']
+
+    if not args.skip_calibration:
+        print("calibration_loop...")
+        results['calibration_loop'] = bench_calibration(app, video_path, args.fps, args.repeat)
+
+    print("analysis_loop...")
+    runs, final, trajectory, velocity = bench_analysis(app, video_path, args.fps, jump, args.height,
+                                                       args.repeat)
+    results['analysis_loop'] = {'runs': runs, 'final_results': final}
+
+    print("get_head_y...")
+    results['get_head_y'] = bench_head_y(app, video_path, args.head_frames)
+
+    print("process_frame...")
+    results['process_frame'] = bench_process_frame(app, jump, args.fps, args.height,
+                                                   max(args.repeat, 20))
+
+    print("calculate_*...")
+    results['calculations'] = bench_calculations(app, trajectory, velocity, args.body_mass,
+                                                 max(args.repeat, 50))
+
+    print("video_frame_at...")
+    results['video_frame_at'] = bench_frame_at(app, video_path, truth['frames'], args.frames_at)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"Risultati salvati in {output}")
+
+    best = max(runs, key=lambda run: run['achieved_fps'] or 0)
+    print(f"analysis_loop: {best['achieved_fps']} frame/s "
+          f"(altezza {final['max_height']} cm, vera {truth['max_height']:.2f})")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        print(f"\nConfronto con {args.compare} (commit {old.get('commit')}):")
+        compare(old.get('results', {}), results)
+
+
+if __name__ == '__main__':
+    main()
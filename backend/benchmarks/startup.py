@@ -0,0 +1,164 @@
+"""
+Benchmark dell'avvio del backend: tempo dal lancio del processo alla prima
+risposta HTTP, alla lista camere e al warm-up completato (/api/health "ready").
+
+Ogni ripetizione avvia un processo nuovo (python app.py, oppure l'eseguibile
+PyInstaller con --exe) in una directory temporanea e interroga la porta 5000:
+
+    cd backend
+    python benchmarks/startup.py --repeat 5 --output startup_new.json --compare startup_old.json
+    python benchmarks/startup.py --exe exe_build/dist/JumpAnalyzerBackend.exe
+
+Per riferimento è misurato anche l'import diretto di numpy, cv2 e mediapipe
+(il costo che prima era pagato prima del bind della porta).
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST, PORT = '127.0.0.1', 5000
+POLL_INTERVAL = 0.02
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def port_in_use():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        return s.connect_ex((HOST, PORT)) == 0
+
+
+def get_json(path, timeout=2.0):
+    """JSON della risposta, None se il server non risponde ancora"""
+    try:
+        with urllib.request.urlopen(f"http://{HOST}:{PORT}{path}", timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def heavy_imports():
+    """Secondi per importare i moduli pesanti in un processo nuovo"""
+    code = ('import time; t = time.perf_counter(); import numpy, cv2, mediapipe; '
+            'print(time.perf_counter() - t)')
+    output = subprocess.check_output([sys.executable, '-c', code], text=True)
+    return round(float(output.strip().splitlines()[-1]), 3)
+
+
+def run_once(command, timeout):
+    """Un avvio: tempi (s dal lancio) di prima risposta, camere e readiness"""
+    workdir = tempfile.mkdtemp(prefix='jump_startup_')
+    # Dati utente isolati: il processo crea il proprio database dei risultati
+    env = {**os.environ, 'HOME': workdir, 'USERPROFILE': workdir}
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {'first_response_s': None, 'cameras_s': None, 'ready_s': None, 'health': None}
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Il backend è terminato con codice {process.returncode}")
+            health = get_json('/api/health')
+            now = time.perf_counter() - start
+            if health is not None:
+                if result['first_response_s'] is None:
+                    result['first_response_s'] = round(now, 3)
+                    if get_json('/api/cameras', timeout=timeout) is not None:
+                        result['cameras_s'] = round(time.perf_counter() - start, 3)
+                if health.get('status') == 'ready':
+                    result['ready_s'] = round(now, 3)
+                    result['health'] = health
+                    break
+            time.sleep(POLL_INTERVAL)
+        else:
+            raise RuntimeError(f"Backend non pronto entro {timeout} s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def summarize(runs):
+    summary = {}
+    for key in ('first_response_s', 'cameras_s', 'ready_s'):
+        values = sorted(run[key] for run in runs if run[key] is not None)
+        if values:
+            summary[key] = {'min': values[0], 'median': values[len(values) // 2], 'max': values[-1]}
+    return summary
+
+
+def compare(old, new):
+    for key, values in new.items():
+        if key in old and old[key].get('median'):
+            ratio = values['median'] / old[key]['median']
+            print(f"{key:20s} {old[key]['median']:>8.3f} -> {values['median']:>8.3f} s  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--exe', default=None, help="Eseguibile del backend (default: python app.py)")
+    parser.add_argument('--timeout', type=float, default=120.0, help='Secondi massimi per avvio')
+    parser.add_argument('--output', default='startup.json')
+    parser.add_argument('--compare', default=None, help='JSON di un benchmark di avvio precedente')
+    args = parser.parse_args()
+
+    if port_in_use():
+        sys.exit(f"La porta {PORT} è già in uso: chiudere il backend in esecuzione")
+    command = [os.path.abspath(args.exe)] if args.exe else [sys.executable, os.path.join(BACKEND_DIR, 'app.py')]
+
+    runs = []
+    for i in range(args.repeat):
+        run = run_once(command, args.timeout)
+        runs.append(run)
+        print(f"avvio {i + 1}: prima risposta {run['first_response_s']} s, camere {run['cameras_s']} s, "
+              f"pronto {run['ready_s']} s")
+        while port_in_use():
+            time.sleep(0.1)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'command': command,
+        'heavy_imports_s': None if args.exe else heavy_imports(),
+        'summary': summarize(runs),
+        'runs': runs,
+    }
+    output = os.path.abspath(args.output)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Import diretti numpy+cv2+mediapipe: {report['heavy_imports_s']} s")
+    print(f"Risultati salvati in {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            old = json.load(f)
+        print(f"\nConfronto con {args.compare} (commit {old.get('commit')}):")
+        compare(old.get('summary', {}), report['summary'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Salti sintetici con valori veri noti.
+- Traiettoria analitica dell'anca per un countermovement jump parametrico:
+  quiete, discesa (eccentrica), spinta ad accelerazione costante (concentrica),
+  volo parabolico, ammortizzazione dell'atterraggio, quiete
+- Video di una figura umana disegnata che esegue il salto (MediaPipe la rileva),
+  a risoluzione, fps e durata scelti
+
+Convenzioni: spostamenti in cm verso l'alto positivi, tempi in secondi.
+"""
+
+import cv2
+import numpy as np
+
+G_CM = 981.0  # Accelerazione di gravità in cm/s^2
+
+DEFAULT_JUMP = {
+    'person_height_cm': 175.0,
+    'jump_height_cm': 30.0,           # Salita dell'anca in volo rispetto alla stazione eretta
+    'countermovement_depth_cm': 25.0,
+    'eccentric_time': 0.45,           # Discesa del contromovimento
+    'landing_depth_cm': 15.0,
+    'landing_time': 0.4,
+    'quiet_before': 2.0,              # Stazione eretta iniziale (baseline e calibrazione)
+    'quiet_after': 1.0,
+}
+
+
+def jump_params(**overrides):
+    """Parametri del salto: DEFAULT_JUMP con le chiavi indicate sostituite"""
+    unknown = set(overrides) - set(DEFAULT_JUMP)
+    if unknown:
+        raise ValueError(f"Parametri sconosciuti: {sorted(unknown)}")
+    return {**DEFAULT_JUMP, **overrides}
+
+
+def phase_times(jump):
+    """Istanti di inizio di ogni fase e valori veri derivati dai parametri"""
+    takeoff_velocity = np.sqrt(2 * G_CM * jump['jump_height_cm'])
+    # Spinta ad accelerazione costante dalla quiete: depth = v0 * t / 2
+    concentric_time = 2 * jump['countermovement_depth_cm'] / takeoff_velocity
+    flight_time = 2 * takeoff_velocity / G_CM
+    start = jump['quiet_before']
+    takeoff = start + jump['eccentric_time'] + concentric_time
+    landing = takeoff + flight_time
+    return {
+        'countermovement_start': start,
+        'concentric_start': start + jump['eccentric_time'],
+        'takeoff': takeoff,
+        'landing': landing,
+        'recovered': landing + jump['landing_time'],
+        'end': landing + jump['landing_time'] + jump['quiet_after'],
+        'takeoff_velocity': takeoff_velocity,
+        'concentric_time': concentric_time,
+        'flight_time': flight_time,
+    }
+
+
+def ground_truth(jump):
+    """Metriche vere del salto, con le stesse unità dei risultati dell'app"""
+    phases = {key: float(value) for key, value in phase_times(jump).items()}
+    return {
+        'max_height': float(jump['jump_height_cm']),
+        'flight_time': phases['flight_time'],
+        'contact_time': jump['eccentric_time'] + phases['concentric_time'],
+        'eccentric_time': float(jump['eccentric_time']),
+        'concentric_time': phases['concentric_time'],
+        'takeoff_velocity': phases['takeoff_velocity'],
+        'takeoff_time': phases['takeoff'],
+        'landing_time': phases['landing'],
+    }
+
+
+def hip_displacement(t, jump):
+    """Spostamento verticale dell'anca (cm, verso l'alto) agli istanti t"""
+    t = np.asarray(t, dtype=float)
+    phases = phase_times(jump)
+    depth = jump['countermovement_depth_cm']
+    v0 = phases['takeoff_velocity']
+    y = np.zeros_like(t)
+
+    # Discesa: profilo a coseno, velocità nulla agli estremi
+    tau = t - phases['countermovement_start']
+    mask = (tau >= 0) & (t < phases['concentric_start'])
+    y[mask] = -depth * (1 - np.cos(np.pi * tau[mask] / jump['eccentric_time'])) / 2
+
+    # Spinta ad accelerazione costante fino alla velocità di stacco
+    tau = t - phases['concentric_start']
+    mask = (tau >= 0) & (t < phases['takeoff'])
+    y[mask] = -depth + 0.5 * (v0 / phases['concentric_time']) * tau[mask] ** 2
+
+    # Volo parabolico
+    tau = t - phases['takeoff']
+    mask = (tau >= 0) & (t < phases['landing'])
+    y[mask] = v0 * tau[mask] - 0.5 * G_CM * tau[mask] ** 2
+
+    # Ammortizzazione e ritorno in stazione eretta
+    tau = t - phases['landing']
+    mask = (tau >= 0) & (t < phases['recovered'])
+    y[mask] = -jump['landing_depth_cm'] * np.sin(np.pi * tau[mask] / jump['landing_time'])
+    return y
+
+
+def sample_times(jump, fps, duration=None):
+    """Istanti dei frame a fps costante per tutta la durata del salto"""
+    duration = duration or phase_times(jump)['end']
+    return np.arange(int(round(duration * fps))) / fps
+
+
+# --- Rendering ---
+
+BACKGROUND = (200, 200, 190)
+FLOOR = (120, 120, 120)
+SKIN = (140, 170, 220)
+SHIRT = (60, 60, 200)
+PANTS = (90, 60, 40)
+SHOES = (30, 30, 30)
+
+# Proporzioni rispetto alla statura (altezza anca, busto, testa: somma = 1)
+HIP_RATIO = 0.53
+TORSO_RATIO = 0.285
+HEAD_RATIO = 0.185
+
+# Posizione nel frame: la figura occupa il 70% dell'altezza, il pavimento inizia al 92%
+FIGURE_FRACTION = 0.70
+GROUND_FRACTION = 0.92
+
+
+def cm_per_pixel(jump, frame_height):
+    """Rapporto vero cm/px del video renderizzato (quello che la calibrazione dovrebbe trovare)"""
+    return jump['person_height_cm'] / (frame_height * FIGURE_FRACTION)
+
+
+def hip_y_pixels(t, jump, frame_height):
+    """Quota dell'anca in pixel (asse y verso il basso, come i landmark MediaPipe)"""
+    scale = 1.0 / cm_per_pixel(jump, frame_height)
+    standing = HIP_RATIO * jump['person_height_cm']
+    return int(frame_height * GROUND_FRACTION) - (standing + hip_displacement(t, jump)) * scale
+
+
+def draw_figure(image, center_x, ground_y, scale, displacement, person_height_cm):
+    """
+    Disegna la figura: scale in px/cm, displacement = spostamento dell'anca (cm).
+    A terra i piedi restano fermi e le ginocchia si piegano; in volo sale tutto il corpo.
+    """
+    height = person_height_cm * scale
+    lift = max(displacement, 0.0) * scale
+    hip_y = ground_y - HIP_RATIO * height - displacement * scale
+    foot_y = ground_y - lift
+    leg = HIP_RATIO * height
+    reach = foot_y - hip_y
+    knee_out = np.sqrt(max((leg / 2) ** 2 - (reach / 2) ** 2, 0.0))
+
+    for side in (-1, 1):
+        hip_x = center_x + side * 0.06 * height
+        foot_x = center_x + side * 0.07 * height
+        knee = (int(hip_x + side * knee_out), int(hip_y + reach / 2))
+        cv2.line(image, (int(hip_x), int(hip_y)), knee, PANTS, max(1, int(0.07 * height)))
+        cv2.line(image, knee, (int(foot_x), int(foot_y)), PANTS, max(1, int(0.06 * height)))
+        cv2.line(image, (int(foot_x), int(foot_y)), (int(foot_x + 0.08 * height), int(foot_y)),
+                 SHOES, max(1, int(0.035 * height)))
+
+    shoulder_y = hip_y - TORSO_RATIO * height
+    cv2.rectangle(image, (int(center_x - 0.11 * height), int(shoulder_y)),
+                  (int(center_x + 0.11 * height), int(hip_y + 0.02 * height)), SHIRT, -1)
+    for side in (-1, 1):
+        shoulder_x = center_x + side * 0.12 * height
+        elbow = (int(shoulder_x + side * 0.04 * height), int(shoulder_y + 0.17 * height))
+        wrist = (int(shoulder_x + side * 0.05 * height), int(shoulder_y + 0.33 * height))
+        cv2.line(image, (int(shoulder_x), int(shoulder_y + 0.02 * height)), elbow, SHIRT,
+                 max(1, int(0.05 * height)))
+        cv2.line(image, elbow, wrist, SKIN, max(1, int(0.04 * height)))
+
+    head_center_y = shoulder_y - 0.115 * height
+    cv2.line(image, (int(center_x), int(shoulder_y)), (int(center_x), int(shoulder_y - 0.05 * height)),
+             SKIN, max(1, int(0.05 * height)))
+    cv2.ellipse(image, (int(center_x), int(head_center_y)), (int(0.055 * height), int(0.07 * height)),
+                0, 0, 360, SKIN, -1)
+    for side in (-1, 1):
+        cv2.circle(image, (int(center_x + side * 0.02 * height), int(head_center_y - 0.01 * height)),
+                   max(1, int(0.006 * height)), (20, 20, 20), -1)
+
+
+def render_jump_video(path, jump, width=1280, height=720, fps=60, duration=None, fourcc='mp4v'):
+    """
+    Scrive il video del salto e restituisce i valori veri.
+    La figura occupa FIGURE_FRACTION dell'altezza del frame.
+    """
+    ground_y = int(height * GROUND_FRACTION)
+    scale = 1.0 / cm_per_pixel(jump, height)
+    times = sample_times(jump, fps, duration)
+    displacements = hip_displacement(times, jump)
+
+    background = np.empty((height, width, 3), np.uint8)
+    background[:] = BACKGROUND
+    background[ground_y:] = FLOOR
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Impossibile creare il video {path}")
+    try:
+        for displacement in displacements:
+            frame = background.copy()
+            draw_figure(frame, width / 2, ground_y, scale, float(displacement), jump['person_height_cm'])
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    truth = ground_truth(jump)
+    truth.update({'frames': len(times), 'fps': fps, 'width': width, 'height': height})
+    return truth
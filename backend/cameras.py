@@ -0,0 +1,280 @@
+"""
+Gestione webcam: apertura dispositivi, enumerazione in background e
+negoziazione delle modalità di cattura.
+Molte camere USB arrivano a 60-120 fps solo in MJPG, quindi le modalità
+(risoluzione, fps, fourcc) supportate vengono sondate e messe in cache per indice.
+Aprire un dispositivo può richiedere secondi: l'elenco delle camere e le sonde
+delle modalità girano in thread in background e le richieste HTTP leggono solo
+la cache. Una sonda lascia il dispositivo appena la registrazione lo riserva.
+"""
+
+import threading
+import time
+
+from lazy_imports import lazy_module
+
+cv2 = lazy_module('cv2')
+
+# Combinazioni candidate provate sul dispositivo (dalla più comune alla più veloce)
+CANDIDATE_FOURCCS = ('MJPG', 'YUY2')
+CANDIDATE_RESOLUTIONS = ((640, 480), (1280, 720), (1920, 1080))
+CANDIDATE_FPS = (30, 60, 90, 120)
+
+MAX_CAMERAS = 3
+CAMERA_LIST_TTL = 30.0  # Secondi di validità dell'elenco camere in cache
+
+_modes_cache = {}
+_modes_threads = {}  # indice -> thread della sonda delle modalità in corso
+_modes_lock = threading.Lock()
+
+# Dispositivi in uso dalla registrazione: le sonde non li aprono mai
+_claimed = set()
+_probing = {}  # indice -> Event impostato a sonda conclusa
+_device_lock = threading.Lock()
+
+
+def claim_camera(index):
+    """Riserva il dispositivo per la registrazione (le sonde lo salteranno). False se già riservato"""
+    with _device_lock:
+        if index in _claimed:
+            return False
+        _claimed.add(index)
+        return True
+
+
+def release_camera(index):
+    with _device_lock:
+        _claimed.discard(index)
+
+
+def is_claimed(index):
+    with _device_lock:
+        return index in _claimed
+
+
+def wait_for_probe(index, timeout=2.0):
+    """Attende (al massimo timeout) che una sonda in corso rilasci il dispositivo"""
+    with _device_lock:
+        done = _probing.get(index)
+    if done is not None:
+        done.wait(timeout)
+
+
+def _begin_probe(index):
+    """Segna il dispositivo come in sonda; False se è riservato alla registrazione"""
+    with _device_lock:
+        if index in _claimed or index in _probing:
+            return False
+        _probing[index] = threading.Event()
+        return True
+
+
+def _end_probe(index):
+    with _device_lock:
+        done = _probing.pop(index, None)
+    if done is not None:
+        done.set()
+
+
+def open_camera(index):
+    """Apre la camera; su Windows DirectShow è più veloce nell'apertura"""
+    try:
+        cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
+        if cap.isOpened():
+            return cap
+        cap.release()
+    except Exception:
+        pass
+    return cv2.VideoCapture(index)
+
+
+def decode_fourcc(value):
+    code = int(value)
+    chars = ''.join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+    return chars if chars.strip('\x00').isprintable() and code else None
+
+
+def read_mode(cap):
+    """Modalità effettivamente attiva sul dispositivo"""
+    return {
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'fps': round(float(cap.get(cv2.CAP_PROP_FPS) or 0), 2),
+        'fourcc': decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC))
+    }
+
+
+def apply_mode(cap, mode):
+    """
+    Richiede una modalità al dispositivo e restituisce quella negoziata.
+    Il FOURCC va impostato prima di risoluzione e fps (vincolo DirectShow/V4L2).
+    """
+    if mode.get('fourcc'):
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode['fourcc']))
+    if mode.get('width') and mode.get('height'):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(mode['width']))
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(mode['height']))
+    if mode.get('fps'):
+        cap.set(cv2.CAP_PROP_FPS, float(mode['fps']))
+    return read_mode(cap)
+
+
+def measure_fps(cap, frames=30, timeout=3.0, stop=None):
+    """FPS realmente consegnati dal dispositivo (grab senza decodifica); stop() interrompe la misura"""
+    start = None
+    count = 0
+    deadline = time.monotonic() + timeout
+    while count < frames and time.monotonic() < deadline:
+        if stop is not None and stop():
+            break
+        if not cap.grab():
+            break
+        now = time.monotonic()
+        if start is None:
+            start = now
+        else:
+            count += 1
+    if start is None or count == 0:
+        return 0.0
+    return round(count / (time.monotonic() - start), 2)
+
+
+def probe_modes(index, measure=False):
+    """
+    Sonda le modalità supportate dalla camera: una modalità è valida se il
+    dispositivo la accetta (risoluzione uguale, fps entro 1). Con measure=True
+    misura anche gli fps effettivi di ciascuna (più lento).
+    None se il dispositivo è (o viene nel frattempo) riservato alla registrazione.
+    """
+    if not _begin_probe(index):
+        return None
+    try:
+        cap = open_camera(index)
+        if not cap.isOpened():
+            cap.release()
+            return []
+        return _probe_open_camera(index, cap, measure)
+    finally:
+        _end_probe(index)
+
+
+def _probe_open_camera(index, cap, measure):
+    modes = []
+    seen = set()
+    stop = lambda: is_claimed(index)
+    try:
+        for fourcc in CANDIDATE_FOURCCS:
+            for width, height in CANDIDATE_RESOLUTIONS:
+                for fps in CANDIDATE_FPS:
+                    if stop():
+                        # La registrazione ha riservato il dispositivo: lo rilasciamo subito
+                        return None
+                    actual = apply_mode(cap, {'fourcc': fourcc, 'width': width, 'height': height, 'fps': fps})
+                    if (actual['width'], actual['height']) != (width, height) or abs(actual['fps'] - fps) > 1:
+                        continue
+                    key = (actual['width'], actual['height'], round(actual['fps']), actual['fourcc'])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    if measure:
+                        actual['measured_fps'] = measure_fps(cap, stop=stop)
+                    modes.append(actual)
+    finally:
+        cap.release()
+
+    modes.sort(key=lambda m: (m['fps'], m['width'] * m['height']), reverse=True)
+    return modes
+
+
+def get_camera_modes(index, refresh=False, measure=False):
+    """
+    Modalità della camera dalla cache, mai bloccante: se mancano (o refresh/measure
+    le richiedono) avvia una sonda in background. Restituisce (modalità, sonda in corso).
+    """
+    with _modes_lock:
+        cached = _modes_cache.get(index)
+        thread = _modes_threads.get(index)
+        if (cached is None or refresh or (measure and not cached['measured'])) and thread is None:
+            thread = threading.Thread(target=_probe_modes_async, args=(index, measure),
+                                      name=f"camera-modes-{index}", daemon=True)
+            _modes_threads[index] = thread
+            thread.start()
+    return (cached['modes'] if cached is not None else []), thread is not None
+
+
+def _probe_modes_async(index, measure):
+    try:
+        modes = probe_modes(index, measure=measure)
+        if modes is not None:
+            # Dispositivo occupato (None): resta la cache, anche vecchia
+            with _modes_lock:
+                _modes_cache[index] = {'modes': modes, 'measured': measure, 'probed_at': time.time()}
+    finally:
+        with _modes_lock:
+            _modes_threads.pop(index, None)
+
+
+class CameraWatcher:
+    """
+    Enumerazione delle camere in un thread in background.
+    L'elenco è in cache con un TTL: cameras() risponde subito con l'ultimo
+    elenco noto e, se scaduto, avvia un nuovo rilevamento asincrono.
+    """
+
+    def __init__(self, max_cameras=MAX_CAMERAS, ttl=CAMERA_LIST_TTL):
+        self.max_cameras = max_cameras
+        self.ttl = ttl
+        self.devices = None
+        self.updated_at = 0.0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Primo rilevamento all'avvio del server"""
+        self.refresh_async()
+
+    def refresh_async(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._refresh, name="camera-watcher", daemon=True)
+            self.thread.start()
+
+    def is_probing(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def cameras(self, refresh=False):
+        """Elenco in cache (None se non ancora rilevato); mai bloccante"""
+        if refresh or self.devices is None or time.time() - self.updated_at > self.ttl:
+            self.refresh_async()
+        return self.devices
+
+    def _refresh(self):
+        devices = []
+        for i in range(self.max_cameras):
+            with _device_lock:
+                claimed = i in _claimed
+            if claimed:
+                # In uso dalla registrazione: presente, ma non va riaperto
+                devices.append(i)
+                continue
+
+            if not _begin_probe(i):
+                if self.devices and i in self.devices:
+                    devices.append(i)
+                continue
+            try:
+                cap = open_camera(i)
+                opened = cap.isOpened()
+                cap.release()
+            finally:
+                _end_probe(i)
+
+            if opened:
+                devices.append(i)
+            elif i > 0:
+                # Se la 0 fallisce proviamo la 1, poi gli indici sono contigui
+                break
+
+        self.devices = devices
+        self.updated_at = time.time()
@@ -0,0 +1,271 @@
+"""
+Pipeline di cattura webcam.
+Un thread dedicato legge solo i frame dalla camera e li timestampa; i consumatori
+(scrittura video, anteprima, ...) li ricevono tramite code limitate su thread
+separati, così una scrittura o una codifica lenta non ritarda mai cap.read().
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+from lazy_imports import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+
+class FrameConsumer:
+    """
+    Consumatore di frame con coda limitata e thread dedicato.
+    handler(index, timestamp, frame) viene chiamato per ogni frame ricevuto.
+    keep_latest=True: se la coda è piena si scarta il frame più vecchio
+    (adatto all'anteprima), altrimenti si scarta il nuovo e lo si conta come perso.
+    """
+
+    def __init__(self, name, handler, maxsize=1, keep_latest=False):
+        self.name = name
+        self.handler = handler
+        self.keep_latest = keep_latest
+        self.queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.processed = 0
+        self.dropped = 0
+        self.thread = None
+
+    def offer(self, item):
+        """Inserimento non bloccante (chiamato dal thread di cattura)"""
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+
+        self.dropped += 1
+        if self.keep_latest:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                pass
+        return False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"capture-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Svuota la coda residua e termina il thread"""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self.handler(*item)
+                self.processed += 1
+            except Exception as e:
+                print(f"Errore consumatore {self.name}: {e}")
+
+        # Rilascio risorse del consumatore (es. modello di posa) sul suo thread
+        close = getattr(self.handler, 'close', None)
+        if close:
+            close()
+
+    def stats(self):
+        return {
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'queue_depth': self.queue.qsize()
+        }
+
+
+class CapturePipeline:
+    """Thread di cattura che distribuisce (indice, timestamp, frame) ai consumatori"""
+
+    # Un frame è "in ritardo" se arriva oltre 1.5 intervalli nominali dal precedente
+    LATE_FACTOR = 1.5
+
+    def __init__(self, cap, nominal_fps):
+        self.cap = cap
+        self.nominal_fps = nominal_fps if nominal_fps and nominal_fps > 0 else 30
+        self.consumers = []
+        self.running = False
+        self.thread = None
+        self.captured = 0
+        self.late = 0
+        self.last_timestamp = 0.0
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+        return consumer
+
+    def start(self):
+        for consumer in self.consumers:
+            consumer.start()
+        self.running = True
+        self.thread = threading.Thread(target=self._capture_loop, name="capture-reader", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        """Ferma la cattura, poi lascia che i consumatori smaltiscano le code"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        for consumer in self.consumers:
+            consumer.stop(timeout)
+
+    def _capture_loop(self):
+        interval = 1.0 / self.nominal_fps
+        first_capture = None
+        last = None
+
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            # Timestamp di cattura (clock monotono) relativo al primo frame
+            now = time.monotonic()
+            if first_capture is None:
+                first_capture = now
+            timestamp = now - first_capture
+
+            if last is not None and timestamp - last > interval * self.LATE_FACTOR:
+                self.late += 1
+            last = timestamp
+            self.last_timestamp = timestamp
+
+            item = (self.captured, timestamp, frame)
+            for consumer in self.consumers:
+                consumer.offer(item)
+            self.captured += 1
+
+        self.running = False
+
+    def stats(self):
+        measured = (self.captured - 1) / self.last_timestamp if self.captured > 1 and self.last_timestamp > 0 else 0.0
+        return {
+            'captured': self.captured,
+            'late': self.late,
+            'dropped': sum(c.dropped for c in self.consumers if not c.keep_latest),
+            'nominal_fps': self.nominal_fps,
+            'measured_fps': round(measured, 2),
+            'duration': round(self.last_timestamp, 3),
+            'consumers': {c.name: c.stats() for c in self.consumers}
+        }
+
+
+class MotionTrigger:
+    """
+    Rileva movimento per differenza tra frame consecutivi su un'immagine ridotta
+    in scala di grigi. update() restituisce la frazione di pixel cambiati.
+    """
+
+    def __init__(self, threshold=0.02, width=160, pixel_delta=25):
+        self.threshold = threshold
+        self.width = width
+        self.pixel_delta = pixel_delta
+        self.previous = None
+
+    def update(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        previous, self.previous = self.previous, gray
+        if previous is None:
+            return 0.0
+        return float(np.count_nonzero(cv2.absdiff(gray, previous) > self.pixel_delta)) / gray.size
+
+    def is_moving(self, frame):
+        return self.update(frame) > self.threshold
+
+
+class RingBufferRecorder:
+    """
+    Consumatore per la registrazione armata.
+    Mantiene in memoria gli ultimi pre_seconds di frame; al trigger (movimento,
+    oppure decollo rilevato dal JumpAnalyzer live se disponibile) scrive su disco
+    il buffer e i frame successivi fino a post_seconds dopo l'atterraggio
+    (o dopo la fine del movimento), con un limite di max_seconds.
+    """
+
+    ARMED = 'armed'
+    TRIGGERED = 'triggered'
+    DONE = 'done'
+
+    def __init__(self, writer, timestamps, fps, pre_seconds=2.0, post_seconds=1.0,
+                 max_seconds=10.0, max_buffer_bytes=512 * 1024 * 1024,
+                 analyzer=None, motion=None, on_done=None):
+        self.writer = writer
+        self.timestamps = timestamps
+        self.fps = fps if fps and fps > 0 else 30
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_seconds = max_seconds
+        self.max_buffer_bytes = max_buffer_bytes
+        self.analyzer = analyzer
+        self.motion = motion or MotionTrigger()
+        self.on_done = on_done
+        self.buffer = None
+        self.state = self.ARMED
+        self.trigger_time = None
+        self.end_reference = None  # Atterraggio o ultimo movimento rilevato
+
+    def __call__(self, index, timestamp, frame):
+        if self.state == self.DONE:
+            return
+
+        if self.buffer is None:
+            # Dimensione del buffer limitata anche in memoria (frame non compressi)
+            max_frames = max(1, self.max_buffer_bytes // max(1, frame.nbytes))
+            self.buffer = deque(maxlen=max(1, min(int(self.pre_seconds * self.fps), max_frames)))
+
+        # Differenza tra frame solo senza analizzatore: con l'analisi live il trigger è il suo
+        moving = self.motion.is_moving(frame) if self.analyzer is None else False
+
+        if self.state == self.ARMED:
+            self.buffer.append((timestamp, frame))
+            triggered = self.analyzer.jump_started if self.analyzer is not None else moving
+            if triggered:
+                self.state = self.TRIGGERED
+                self.trigger_time = timestamp
+                while self.buffer:
+                    self._write(*self.buffer.popleft())
+            return
+
+        self._write(timestamp, frame)
+
+        if self.analyzer is not None:
+            if self.analyzer.jump_ended and self.end_reference is None:
+                self.end_reference = timestamp
+        elif moving or self.end_reference is None:
+            self.end_reference = timestamp
+
+        settled = self.end_reference is not None and timestamp - self.end_reference >= self.post_seconds
+        if settled or timestamp - self.trigger_time >= self.max_seconds:
+            self.state = self.DONE
+            self.buffer = None
+            if self.on_done:
+                self.on_done()
+
+    def _write(self, timestamp, frame):
+        self.writer.write(frame)
+        self.timestamps.append(timestamp)
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'buffered_frames': len(self.buffer) if self.buffer else 0,
+            'trigger_time': round(self.trigger_time, 3) if self.trigger_time is not None else None
+        }
@@ -1,10 +1,18 @@
-import cv2
-import mediapipe as mp
-import numpy as np
+import threading
+
+from lazy_imports import lazy_module
+
+cv2 = lazy_module('cv2')
+mp = lazy_module('mediapipe')
+np = lazy_module('numpy')
 
 # === LAZY LOADING: Variabili globali inizializzate a None ===
 _segmenter = None
 _mp_selfie_segmentation = None
+_segmenter_lock = threading.Lock()  # Warm-up e calibrazione possono chiederlo insieme
+# L'istanza è condivisa da calibrazioni e analisi live di tutte le sessioni:
+# il grafo MediaPipe non è rientrante, un process() alla volta
+_process_lock = threading.Lock()
 
 def get_segmenter():
     """
@@ -13,10 +21,11 @@ def get_segmenter():
     """
     global _segmenter, _mp_selfie_segmentation
     
-    if _segmenter is None:
-        # Inizializza solo ora che serve davvero
-        _mp_selfie_segmentation = mp.solutions.selfie_segmentation
-        _segmenter = _mp_selfie_segmentation.SelfieSegmentation(model_selection=1)
+    with _segmenter_lock:
+        if _segmenter is None:
+            # Inizializza solo ora che serve davvero
+            _mp_selfie_segmentation = mp.solutions.selfie_segmentation
+            _segmenter = _mp_selfie_segmentation.SelfieSegmentation(model_selection=1)
     
     return _segmenter
 
@@ -35,7 +44,8 @@ def get_head_y(image):
     rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
     # Esegui segmentazione
-    result = segment.process(rgb_image)
+    with _process_lock:
+        result = segment.process(rgb_image)
     
     # Se non trova nulla, ritorna 0
     if result.segmentation_mask is None:
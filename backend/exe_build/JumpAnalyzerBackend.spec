@@ -2,9 +2,9 @@
 from PyInstaller.utils.hooks import collect_submodules
 from PyInstaller.utils.hooks import collect_all
 
-datas = [('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\contour.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\jump_analyzer.py', '.')]
+datas = [('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\contour.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\jump_analyzer.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\frame_timing.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\capture.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\cameras.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\frame_server.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\thumbnails.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\file_jobs.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\proxy.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\ingest.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\storage.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\results_store.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\series_codec.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\history.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\analysis_cache.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\metrics.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\profiling.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\analysis_trace.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\jump_metrics.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\sweep.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\lazy_imports.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\jobs.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\run_state.py', '.'), ('C:\\Users\\bradi\\Desktop\\jumpTestGUI2\\backend\\sessions.py', '.')]
 binaries = []
-hiddenimports = ['flask', 'flask_cors', 'cv2', 'mediapipe', 'numpy', 'werkzeug', 'contour', 'jump_analyzer', 'API_Call', 'Kinai_API']
+hiddenimports = ['flask', 'flask_cors', 'cv2', 'mediapipe', 'numpy', 'werkzeug', 'waitress', 'contour', 'jump_analyzer', 'frame_timing', 'capture', 'cameras', 'frame_server', 'thumbnails', 'file_jobs', 'proxy', 'ingest', 'storage', 'results_store', 'series_codec', 'history', 'analysis_cache', 'metrics', 'profiling', 'analysis_trace', 'jump_metrics', 'sweep', 'lazy_imports', 'jobs', 'run_state', 'sessions', 'API_Call', 'Kinai_API']
 hiddenimports += collect_submodules('mediapipe')
 tmp_ret = collect_all('mediapipe')
 datas += tmp_ret[0]; binaries += tmp_ret[1]; hiddenimports += tmp_ret[2]
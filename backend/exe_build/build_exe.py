@@ -22,14 +22,59 @@ args = [
     '--console',  # Mostra la console (cambia in --windowed per nasconderla)
     f'--add-data={os.path.join(backend_dir, "contour.py")}{separator}.',  # Includi i moduli necessari
     f'--add-data={os.path.join(backend_dir, "jump_analyzer.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "frame_timing.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "capture.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "cameras.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "frame_server.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "thumbnails.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "file_jobs.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "proxy.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "ingest.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "storage.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "results_store.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "series_codec.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "history.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "analysis_cache.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "metrics.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "profiling.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "analysis_trace.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "jump_metrics.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "sweep.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "lazy_imports.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "jobs.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "run_state.py")}{separator}.',
+    f'--add-data={os.path.join(backend_dir, "sessions.py")}{separator}.',
     '--hidden-import=flask',
     '--hidden-import=flask_cors',
     '--hidden-import=cv2',
     '--hidden-import=mediapipe',
     '--hidden-import=numpy',
     '--hidden-import=werkzeug',
+    '--hidden-import=waitress',
     '--hidden-import=contour',
     '--hidden-import=jump_analyzer',
+    '--hidden-import=frame_timing',
+    '--hidden-import=capture',
+    '--hidden-import=cameras',
+    '--hidden-import=frame_server',
+    '--hidden-import=thumbnails',
+    '--hidden-import=file_jobs',
+    '--hidden-import=proxy',
+    '--hidden-import=ingest',
+    '--hidden-import=storage',
+    '--hidden-import=results_store',
+    '--hidden-import=series_codec',
+    '--hidden-import=history',
+    '--hidden-import=analysis_cache',
+    '--hidden-import=metrics',
+    '--hidden-import=profiling',
+    '--hidden-import=analysis_trace',
+    '--hidden-import=jump_metrics',
+    '--hidden-import=sweep',
+    '--hidden-import=lazy_imports',
+    '--hidden-import=jobs',
+    '--hidden-import=run_state',
+    '--hidden-import=sessions',
     '--hidden-import=API_Call',
     '--hidden-import=Kinai_API',
     '--collect-all=mediapipe',  # Raccogli tutti i file di MediaPipe
@@ -0,0 +1,86 @@
+"""
+Job in background che producono un file derivato da un video
+(miniature, proxy di analisi, ...): un job per video, stato interrogabile.
+
+I job girano su un esecutore limitato e proprio (FILE_JOB_WORKERS decodifiche
+alla volta), separato da quello di calibrazione e analisi: un upload con proxy
+non avvia due passate di decodifica senza limite né compete con le analisi.
+I builder controllano jobs.cancelled() e sollevano BuildCancelled; alla
+chiusura del backend file_job_executor.shutdown() annulla e attende i job.
+"""
+
+import os
+import threading
+
+from jobs import JobExecutor, JobRejected
+
+FILE_JOB_WORKERS = 2
+FILE_JOB_PENDING = 64
+
+file_job_executor = JobExecutor(max_workers=FILE_JOB_WORKERS, max_pending=FILE_JOB_PENDING,
+                                max_pending_per_session=FILE_JOB_PENDING)
+
+
+class BuildCancelled(Exception):
+    """Job annullato (chiusura del backend): nessun file prodotto"""
+
+
+class FileJobs:
+    """builder(video_path) scrive il file output_path(video_path)"""
+
+    def __init__(self, name, builder, output_path):
+        self.name = name
+        self.builder = builder
+        self.output_path = output_path
+        self.status = {}
+        self.lock = threading.Lock()
+
+    def schedule(self, video_path):
+        if not video_path:
+            return
+        with self.lock:
+            if self.status.get(video_path) == 'pending':
+                return
+            self.status[video_path] = 'pending'
+        try:
+            file_job_executor.submit(self.name, self._run, video_path)
+        except JobRejected as e:
+            # Stato 'missing': il file verrà richiesto di nuovo al prossimo accesso
+            print(f"Job {self.name} non accodato: {e}")
+            with self.lock:
+                self.status.pop(video_path, None)
+
+    def _run(self, video_path):
+        try:
+            self.builder(video_path)
+            result = 'ready'
+        except BuildCancelled:
+            result = None
+        except Exception as e:
+            print(f"Errore job {self.name}: {e}")
+            result = 'error'
+        with self.lock:
+            if result is None:
+                self.status.pop(video_path, None)
+            else:
+                self.status[video_path] = result
+
+    def get_status(self, video_path):
+        with self.lock:
+            status = self.status.get(video_path)
+        if status is None and video_path and os.path.exists(self.output_path(video_path)):
+            return 'ready'
+        return status or 'missing'
+
+    def pending(self):
+        """Video con un job in corso"""
+        with self.lock:
+            return {path for path, status in self.status.items() if status == 'pending'}
+
+    def ready_path(self, video_path):
+        """Percorso del file derivato se pronto, altrimenti None"""
+        if self.get_status(video_path) == 'ready':
+            path = self.output_path(video_path)
+            if os.path.exists(path):
+                return path
+        return None
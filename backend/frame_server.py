@@ -0,0 +1,258 @@
+"""
+Accesso casuale ai frame dei video per lo scrubbing dei risultati.
+- Decoder persistenti per video (pool LRU), riusati tra le richieste
+- Letture sequenziali per indici vicini invece di un seek ogni volta
+- Indice dei keyframe costruito una volta per file in un thread in background
+  (lettura dei pacchetti senza decodifica): un seek riparte dal keyframe
+  precedente, costo limitato alla lunghezza del GOP. Finché l'indice non è
+  pronto vale l'euristica MAX_FORWARD_FRAMES
+- Cache LRU dei frame già codificati in JPEG, limitata in byte
+"""
+
+import base64
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+from lazy_imports import lazy_module
+
+cv2 = lazy_module('cv2')
+
+MAX_DECODERS = 2
+FRAME_CACHE_MAX_BYTES = 64 * 1024 * 1024
+MAX_FORWARD_FRAMES = 30  # Senza indice keyframe: oltre questa distanza si fa seek
+JPEG_QUALITY = 85
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def build_keyframe_index(path, stop=None):
+    """
+    Indici dei keyframe del video, letti in modalità raw (nessuna decodifica).
+    Lista vuota se il backend non espone l'informazione, None se stop viene impostato.
+    """
+    key_prop = getattr(cv2, 'CAP_PROP_LRF_HAS_KEY_FRAME', None)
+    if key_prop is None:
+        return []
+    cap = cv2.VideoCapture(path)
+    keyframes = []
+    try:
+        if not cap.isOpened() or not cap.set(cv2.CAP_PROP_FORMAT, -1):
+            return []
+        index = 0
+        while cap.grab():
+            if stop is not None and stop.is_set():
+                return None
+            if cap.get(key_prop):
+                keyframes.append(index)
+            index += 1
+    except Exception as e:
+        print(f"Errore indice keyframe: {e}")
+        return []
+    finally:
+        cap.release()
+    return keyframes
+
+
+class VideoDecoder:
+    """Decoder aperto su un video, con posizione corrente e indice keyframe"""
+
+    def __init__(self, path, keyframes):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        self.total = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)) if self.cap.isOpened() else 0
+        self.keyframes = keyframes
+        self.position = 0  # Indice del prossimo frame che cap.read() restituirà
+        self.lock = threading.Lock()
+
+    def is_open(self):
+        return self.cap.isOpened()
+
+    def set_keyframes(self, keyframes):
+        with self.lock:
+            self.keyframes = keyframes
+
+    def keyframe_before(self, index):
+        if not self.keyframes:
+            return None
+        i = bisect_right(self.keyframes, index) - 1
+        return self.keyframes[max(0, i)]
+
+    def read(self, index):
+        """Frame all'indice richiesto (BGR) oppure None"""
+        with self.lock:
+            keyframe = self.keyframe_before(index)
+            if keyframe is not None:
+                # Decodificare in avanti conviene se siamo già nello stesso GOP
+                forward = keyframe <= self.position <= index
+            else:
+                forward = self.position <= index <= self.position + MAX_FORWARD_FRAMES
+
+            if not forward:
+                target = keyframe if keyframe is not None else index
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                self.position = target
+
+            while self.position < index:
+                if not self.cap.grab():
+                    return None
+                self.position += 1
+
+            ret, frame = self.cap.read()
+            if not ret:
+                return None
+            self.position += 1
+            return frame
+
+    def close(self):
+        with self.lock:
+            self.cap.release()
+
+
+class FrameServer:
+    """Pool di decoder + cache LRU dei frame codificati"""
+
+    def __init__(self, max_decoders=MAX_DECODERS, cache_max_bytes=FRAME_CACHE_MAX_BYTES):
+        self.max_decoders = max_decoders
+        self.cache_max_bytes = cache_max_bytes
+        self.decoders = OrderedDict()   # firma file -> VideoDecoder
+        self.keyframes = {}             # firma file -> indice keyframe
+        self.indexing = {}              # firma file -> Event di arresto della costruzione in corso
+        self.cache = OrderedDict()      # (firma, indice) -> JPEG base64
+        self.cache_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _decoder(self, path):
+        signature = _file_signature(path)
+        with self.lock:
+            decoder = self.decoders.get(signature)
+            if decoder is not None:
+                self.decoders.move_to_end(signature)
+                return signature, decoder
+            keyframes = self.keyframes.get(signature)
+
+        decoder = VideoDecoder(path, keyframes)
+        if not decoder.is_open():
+            decoder.close()
+            return signature, None
+
+        evicted = []
+        with self.lock:
+            if keyframes is None:
+                # Il decoder nasce con l'indice se nel frattempo è stato completato
+                decoder.keyframes = self.keyframes.get(signature)
+                if decoder.keyframes is None:
+                    self._index_async(path, signature)
+            existing = self.decoders.get(signature)
+            if existing is not None:
+                evicted.append(decoder)
+                decoder = existing
+            else:
+                self.decoders[signature] = decoder
+            while len(self.decoders) > self.max_decoders:
+                evicted.append(self.decoders.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return signature, decoder
+
+    def _index_async(self, path, signature):
+        """Avvia la costruzione dell'indice keyframe (una sola per firma); chiamato con self.lock"""
+        if signature in self.indexing:
+            return
+        stop = threading.Event()
+        self.indexing[signature] = stop
+        threading.Thread(target=self._build_index, args=(path, signature, stop),
+                         name="keyframe-index", daemon=True).start()
+
+    def _build_index(self, path, signature, stop):
+        keyframes = None
+        try:
+            keyframes = build_keyframe_index(path, stop)
+        finally:
+            with self.lock:
+                self.indexing.pop(signature, None)
+                if keyframes is not None:
+                    self.keyframes[signature] = keyframes
+                decoder = self.decoders.get(signature)
+        if keyframes is not None and decoder is not None:
+            decoder.set_keyframes(keyframes)
+
+    def _cache_get(self, key):
+        with self.lock:
+            value = self.cache.get(key)
+            if value is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def _cache_put(self, key, value):
+        with self.lock:
+            if key in self.cache:
+                return
+            self.cache[key] = value
+            self.cache_bytes += len(value)
+            while self.cache_bytes > self.cache_max_bytes and self.cache:
+                _, old = self.cache.popitem(last=False)
+                self.cache_bytes -= len(old)
+
+    def frame_at(self, path, index):
+        """
+        Frame JPEG (base64) all'indice richiesto.
+        Restituisce (frame_b64, indice_effettivo, totale_frame) o None.
+        """
+        signature, decoder = self._decoder(path)
+        if decoder is None:
+            return None
+
+        total = decoder.total
+        index = max(0, min(index, total - 1))
+        key = (signature, index)
+
+        encoded = self._cache_get(key)
+        if encoded is None:
+            frame = decoder.read(index)
+            if frame is None:
+                return None
+            _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+            encoded = base64.b64encode(buffer).decode('utf-8')
+            self._cache_put(key, encoded)
+
+        return encoded, index, total
+
+    def release(self, path=None):
+        """Chiude i decoder (di un video o tutti), es. prima di cancellare il file"""
+        with self.lock:
+            if path is None:
+                targets = list(self.decoders.keys())
+            else:
+                absolute = os.path.abspath(path)
+                targets = [sig for sig in self.decoders if sig[0] == absolute]
+            decoders = [self.decoders.pop(sig) for sig in targets]
+            # Un indice ancora in costruzione non deve tenere aperto il file
+            for sig, stop in self.indexing.items():
+                if path is None or sig[0] == os.path.abspath(path):
+                    stop.set()
+        for decoder in decoders:
+            decoder.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'decoders': len(self.decoders),
+                'indexing': len(self.indexing),
+                'cached_frames': len(self.cache),
+                'cache_bytes': self.cache_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+frame_server = FrameServer()
@@ -0,0 +1,104 @@
+"""
+Timestamp reali dei frame (supporto video a frame rate variabile).
+Le registrazioni salvano un file sidecar con il tempo di cattura di ogni frame;
+per i video caricati si usa il timestamp del container (CAP_PROP_POS_MSEC).
+"""
+
+import json
+import os
+
+from lazy_imports import lazy_module
+
+cv2 = lazy_module('cv2')
+np = lazy_module('numpy')
+
+SIDECAR_SUFFIX = '.timestamps.json'
+
+
+def sidecar_path(video_path):
+    """Percorso del file sidecar con i timestamp del video"""
+    return f"{video_path}{SIDECAR_SUFFIX}"
+
+
+def save_timestamps(video_path, timestamps):
+    """Salva i timestamp (secondi, relativi al primo frame) accanto al video"""
+    origin = float(timestamps[0]) if timestamps else 0.0
+    data = {
+        'version': 1,
+        'timestamps': [round(float(t) - origin, 6) for t in timestamps]
+    }
+    with open(sidecar_path(video_path), 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def load_timestamps(video_path):
+    """Carica i timestamp dal sidecar, None se assente o non valido"""
+    path = sidecar_path(video_path) if video_path else None
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            timestamps = json.load(f).get('timestamps')
+        return [float(t) for t in timestamps] if timestamps else None
+    except Exception as e:
+        print(f"Errore lettura timestamp: {e}")
+        return None
+
+
+def measured_fps(timestamps):
+    """FPS effettivo stimato dalla mediana degli intervalli tra frame"""
+    if not timestamps or len(timestamps) < 2:
+        return None
+    deltas = np.diff(np.asarray(timestamps, dtype=np.float64))
+    deltas = deltas[deltas > 0]
+    if deltas.size == 0:
+        return None
+    return float(1.0 / np.median(deltas))
+
+
+def get_video_fps(video_path, default=None):
+    """
+    FPS del file: dal sidecar se presente (frame rate reale di cattura),
+    altrimenti quello dichiarato dal container.
+    """
+    fps = measured_fps(load_timestamps(video_path))
+    if fps:
+        return fps
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+    finally:
+        cap.release()
+    if fps and np.isfinite(fps) and fps > 0:
+        return float(fps)
+    return default
+
+
+class FrameClock:
+    """
+    Restituisce il timestamp reale (secondi) dei frame letti in sequenza.
+    Ordine di priorità: sidecar di registrazione, CAP_PROP_POS_MSEC del
+    container, infine indice / fps nominale se il backend non fornisce tempi.
+    """
+
+    def __init__(self, video_path, fps):
+        self.timestamps = load_timestamps(video_path)
+        self.fps = fps if fps and fps > 0 else 30
+        self.last = None
+
+    def timestamp(self, cap, frame_index):
+        """Timestamp del frame appena letto (frame_index a base 0)"""
+        t = None
+        if self.timestamps and frame_index < len(self.timestamps):
+            t = self.timestamps[frame_index]
+        else:
+            msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if msec and np.isfinite(msec) and (msec > 0 or frame_index == 0):
+                t = msec / 1000.0
+
+        # Timestamp mancanti o non monotoni: ricadi sul passo nominale
+        if t is None or (self.last is not None and t <= self.last):
+            t = frame_index / self.fps if self.last is None else self.last + 1.0 / self.fps
+
+        self.last = t
+        return t
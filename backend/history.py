@@ -0,0 +1,90 @@
+"""
+Aggregati dello storico dei salti (per atleta, test, periodo).
+Le righe arrivano dalla query indicizzata di results_store; le riduzioni sono
+fatte in NumPy sull'intera colonna (nessun ciclo per salto):
+- best, media, deviazione standard per metrica
+- andamento: valori giornalieri (media, best) e pendenza della retta di regressione
+"""
+
+from lazy_imports import lazy_module
+from results_store import METRICS
+
+np = lazy_module('numpy')
+
+# Per il tempo di contatto il valore migliore è il minimo
+LOWER_IS_BETTER = {'contact_time'}
+ROW_FIELDS = ('test_id', 'athlete_id', 'jump_number', 'timestamp') + METRICS
+
+
+def rows_to_jumps(rows):
+    return [dict(zip(ROW_FIELDS, row)) for row in rows]
+
+
+def _columns(rows):
+    """Righe della query -> (date giornaliere, giorni dal primo salto, {metrica: array})"""
+    instants = np.array([row[3][:19] for row in rows], dtype='datetime64[s]')
+    days = (instants - instants.min()) / np.timedelta64(1, 'D')
+    dates = instants.astype('datetime64[D]').astype(str)
+    values = np.array([row[4:] for row in rows], dtype=float).reshape(len(rows), len(METRICS))
+    return dates, days, {metric: values[:, i] for i, metric in enumerate(METRICS)}
+
+
+def _stats(values, metric):
+    valid = values[~np.isnan(values)]
+    if valid.size == 0:
+        return {'n': 0, 'best': None, 'mean': None, 'sd': None}
+    best = valid.min() if metric in LOWER_IS_BETTER else valid.max()
+    return {
+        'n': int(valid.size),
+        'best': round(float(best), 3),
+        'mean': round(float(valid.mean()), 3),
+        'sd': round(float(valid.std(ddof=1)), 3) if valid.size > 1 else 0.0
+    }
+
+
+def _trend(dates, days, values, metric):
+    valid = ~np.isnan(values)
+    dates, days, values = dates[valid], days[valid], values[valid]
+    if values.size == 0:
+        return {'slope_per_day': None, 'daily': []}
+
+    # Raggruppamento per giorno: le righe sono in ordine cronologico, quindi
+    # ogni giorno è un blocco contiguo che inizia al primo indice restituito da unique
+    unique_dates, starts, counts = np.unique(dates, return_index=True, return_counts=True)
+    sums = np.add.reduceat(values, starts)
+    reduce_best = np.minimum if metric in LOWER_IS_BETTER else np.maximum
+    bests = reduce_best.reduceat(values, starts)
+
+    # Pendenza (unità della metrica al giorno) solo se i salti coprono più giorni
+    slope = None
+    if unique_dates.size > 1:
+        slope = round(float(np.polyfit(days, values, 1)[0]), 4)
+
+    return {
+        'slope_per_day': slope,
+        'daily': [{'date': str(date), 'n': int(n), 'mean': round(float(total / n), 3), 'best': round(float(best), 3)}
+                  for date, n, total, best in zip(unique_dates, counts, sums, bests)]
+    }
+
+
+def summarize(rows, metrics=METRICS):
+    """Aggregati per metrica delle righe di results_store.query_jumps"""
+    if not rows:
+        return {'count': 0, 'metrics': {}, 'trends': {}}
+    dates, days, columns = _columns(rows)
+    return {
+        'count': len(rows),
+        'first': rows[0][3],
+        'last': rows[-1][3],
+        'metrics': {metric: _stats(columns[metric], metric) for metric in metrics},
+        'trends': {metric: _trend(dates, days, columns[metric], metric) for metric in metrics}
+    }
+
+
+def summarize_by(rows, field, metrics=METRICS):
+    """Aggregati separati per atleta o per test"""
+    index = ROW_FIELDS.index(field)
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[index], []).append(row)
+    return {str(key): summarize(group, metrics) for key, group in groups.items()}
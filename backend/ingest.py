@@ -0,0 +1,174 @@
+"""
+Ingest in streaming dei video caricati.
+- Il corpo della richiesta (o la parte del file di un upload multipart) è
+  scritto a blocchi su un file temporaneo, calcolando lo SHA-256 durante la
+  scrittura (nessuna seconda lettura né copia del file)
+- L'header del contenitore è verificato sul primo blocco: un file non video
+  viene rifiutato senza attendere il resto del trasferimento
+- Indice per contenuto (hash -> file): lo stesso video caricato di nuovo riusa
+  il file esistente e quindi gli artefatti già calcolati accanto ad esso
+  (miniature, proxy, sidecar dei timestamp)
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+HEADER_BYTES = 16
+INDEX_FILENAME = 'index.json'
+
+ASF_GUID = bytes.fromhex('3026b2758e66cf11a6d900aa0062ce6c')
+
+
+class IngestError(Exception):
+    """Upload rifiutato (contenuto non valido o troppo grande)"""
+
+
+def sniff_container(head):
+    """Formato del contenitore dai magic bytes, None se non riconosciuto"""
+    if len(head) >= 12 and head[4:8] == b'ftyp':
+        return 'mp4'
+    if len(head) >= 12 and head[:4] == b'RIFF' and head[8:12] == b'AVI ':
+        return 'avi'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        return 'mkv'
+    if head[:16] == ASF_GUID:
+        return 'wmv'
+    # QuickTime senza 'ftyp' iniziale (vecchi .mov): primo atomo noto
+    if len(head) >= 8 and head[4:8] in (b'moov', b'mdat', b'wide', b'free', b'skip'):
+        return 'mov'
+    return None
+
+
+class ContentIndex:
+    """Indice persistente hash -> nome file nella cartella degli upload"""
+
+    def __init__(self, folder):
+        self.path = os.path.join(folder, INDEX_FILENAME)
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def _load(self):
+        if self.entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+    def lookup(self, digest):
+        """Percorso del file già caricato con questo contenuto, se esiste ancora"""
+        with self.lock:
+            filename = self._load().get(digest)
+            if filename is None:
+                return None
+            path = os.path.join(self.folder, filename)
+            if os.path.exists(path):
+                return path
+            del self.entries[digest]
+            self._save()
+            return None
+
+    def add(self, digest, path):
+        with self.lock:
+            self._load()[digest] = os.path.basename(path)
+            self._save()
+
+    def remove_path(self, path):
+        """Toglie dall'indice un file (es. cancellato o sfrattato)"""
+        filename = os.path.basename(path)
+        with self.lock:
+            entries = self._load()
+            stale = [digest for digest, name in entries.items() if name == filename]
+            for digest in stale:
+                del entries[digest]
+            if stale:
+                self._save()
+
+
+class IngestFile:
+    """
+    Destinazione di un upload scritta a blocchi: SHA-256, header del contenitore
+    e dimensione massima sono verificati durante la scrittura. Serve anche da
+    stream_factory di werkzeug: la parte del file di un upload multipart arriva
+    qui mentre viene ricevuta, senza spool su un file temporaneo.
+    Il file è scritto con suffisso .part e rinominato solo da finish().
+    """
+
+    def __init__(self, filepath, max_bytes=None):
+        self.filepath = filepath
+        self.tmp_path = f"{filepath}.part"
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+        self.file = open(self.tmp_path, 'wb')
+
+    def write(self, chunk):
+        if len(self.head) < HEADER_BYTES:
+            self.head += chunk[:HEADER_BYTES - len(self.head)]
+            if len(self.head) >= HEADER_BYTES and sniff_container(self.head) is None:
+                raise IngestError('File video non valido')
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise IngestError('File troppo grande')
+        self.digest.update(chunk)
+        self.file.write(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=0):
+        # werkzeug riavvolge il contenitore a fine parte: il contenuto è già sul file
+        return self.size
+
+    def finish(self):
+        """Valida e rinomina il file; restituisce (digest, dimensione)"""
+        self.file.close()
+        if self.size == 0 or sniff_container(self.head) is None:
+            raise IngestError('File video non valido')
+        os.replace(self.tmp_path, self.filepath)
+        return self.digest.hexdigest(), self.size
+
+    def abort(self):
+        """Upload rifiutato o interrotto: il file parziale viene cancellato"""
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+def ingest_stream(stream, filepath, max_bytes=None):
+    """
+    Copia lo stream su `filepath` a blocchi con IngestFile.
+    Restituisce (digest, dimensione); solleva IngestError se il contenuto è rifiutato.
+    """
+    target = IngestFile(filepath, max_bytes)
+    try:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            target.write(chunk)
+        return target.finish()
+    except Exception:
+        target.abort()
+        raise
+
+
+def file_hash(path):
+    """SHA-256 di un file già su disco (es. registrazioni), letto a blocchi"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
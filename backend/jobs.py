@@ -0,0 +1,337 @@
+"""
+Esecutore limitato dei lavori in background (calibrazione, analisi) e limite
+alle inferenze contemporanee. La chiusura automatica della registrazione non
+passa di qui: ha un thread dedicato, per non attendere dietro ai lavori lunghi.
+
+- al massimo `max_workers` lavori in esecuzione e `max_pending` in coda
+  (`max_pending_per_session` per singola sessione): oltre, submit solleva
+  JobRejected invece di creare thread senza limite
+- i lavori in coda sono assegnati ai thread a turno tra le sessioni (round
+  robin), non in ordine di arrivo: l'arretrato di una postazione non blocca l'altra
+- ogni lavoro ha un id, uno stato (queued, running, done, error, cancelled),
+  un avanzamento 0..1 e un messaggio, letti dagli endpoint /api/jobs
+- l'annullamento è cooperativo: il target controlla job.cancelled
+  (current_job() restituisce il lavoro del thread corrente, None fuori dall'esecutore)
+- shutdown() annulla tutto e attende la fine dei lavori entro un timeout
+
+I thread delle richieste HTTP non eseguono mai lavori lunghi: un'analisi lenta
+occupa un thread dell'esecutore, non uno del server.
+
+InferenceLimiter limita le inferenze MediaPipe in corso nello stesso istante
+(analisi, calibrazione e live di tutte le sessioni): chi attende uno slot è
+servito in ordine di arrivo, quindi i loop di sessioni diverse si alternano
+frame per frame invece di contendersi la CPU.
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+
+MAX_WORKERS = 3
+MAX_PENDING = 8
+MAX_PENDING_PER_SESSION = 4
+MAX_HISTORY = 100  # Lavori terminati mantenuti per /api/jobs
+MAX_CONCURRENT_INFERENCE = 2
+
+_local = threading.local()
+
+
+class JobRejected(RuntimeError):
+    """Coda piena, esecutore in chiusura o lavoro precedente che non termina"""
+
+
+def current_job():
+    """Lavoro eseguito dal thread corrente (None se chiamato fuori dall'esecutore)"""
+    return getattr(_local, 'job', None)
+
+
+def cancelled():
+    """True se il lavoro del thread corrente è stato annullato"""
+    job = current_job()
+    return job is not None and job.cancelled
+
+
+def report_progress(current, total=None, message=None):
+    """Avanzamento del lavoro corrente (nessun effetto fuori dall'esecutore)"""
+    job = current_job()
+    if job is not None:
+        job.report(current, total, message)
+
+
+class Job:
+    def __init__(self, kind, session_id=None):
+        self.job_id = f"{kind}_{uuid.uuid4().hex[:8]}"
+        self.kind = kind
+        self.session_id = session_id
+        self.state = 'queued'
+        self.progress = None
+        self.message = None
+        self.error = None
+        self.result = None  # Valore restituito dal target (es. report dello sweep)
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def active(self):
+        return not self.done_event.is_set()
+
+    def report(self, current, total=None, message=None):
+        if total:
+            self.progress = round(min(max(current / total, 0.0), 1.0), 4)
+        elif total is None and current is not None:
+            self.progress = round(min(max(current, 0.0), 1.0), 4)
+        if message is not None:
+            self.message = message
+
+    def wait(self, timeout=None):
+        return self.done_event.wait(timeout)
+
+    def snapshot(self):
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'session_id': self.session_id,
+            'state': self.state,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'cancel_requested': self.cancelled,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobExecutor:
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING,
+                 max_pending_per_session=MAX_PENDING_PER_SESSION, max_history=MAX_HISTORY):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_pending_per_session = max_pending_per_session
+        self.max_history = max_history
+        self.jobs = {}  # job_id -> Job, in ordine di creazione
+        self.queues = OrderedDict()  # sessione -> deque di (job, target, args, kwargs), in ordine di turno
+        self.workers = []
+        self.idle = 0
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+        self.closed = False
+
+    def submit(self, kind, target, *args, session_id=None, **kwargs):
+        """Accoda target(*args, **kwargs); JobRejected se la coda è piena o in chiusura"""
+        with self.lock:
+            if self.closed:
+                raise JobRejected('Backend in chiusura')
+            active = sum(1 for job in self.jobs.values() if job.active)
+            if active >= self.max_workers + self.max_pending:
+                raise JobRejected(f"Troppi lavori in corso ({active})")
+            queued = len(self.queues.get(session_id, ()))
+            if queued >= self.max_pending_per_session:
+                raise JobRejected(f"Troppi lavori in coda per la sessione ({queued})")
+            job = Job(kind, session_id)
+            self.jobs[job.job_id] = job
+            self.queues.setdefault(session_id, deque()).append((job, target, args, kwargs))
+            self._trim()
+            # Thread creati al bisogno, fino a max_workers
+            pending = sum(len(queue) for queue in self.queues.values())
+            if pending > self.idle and len(self.workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, name=f"job_{len(self.workers)}", daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            self.available.notify()
+        return job
+
+    def _next(self):
+        """Prossimo lavoro in coda, a turno tra le sessioni (chiamato con il lock)"""
+        while self.queues:
+            session_id, queue = next(iter(self.queues.items()))
+            item = queue.popleft()
+            if queue:
+                self.queues.move_to_end(session_id)
+            else:
+                del self.queues[session_id]
+            if item[0].active:  # Annullato mentre era in coda
+                return item
+        return None
+
+    def _work(self):
+        while True:
+            with self.lock:
+                item = self._next()
+                while item is None:
+                    if self.closed:
+                        return
+                    self.idle += 1
+                    self.available.wait()
+                    self.idle -= 1
+                    item = self._next()
+            self._run(*item)
+
+    def _run(self, job, target, args, kwargs):
+        if job.cancelled:
+            self._finish(job, 'cancelled')
+            return
+        job.state = 'running'
+        job.started = time.time()
+        _local.job = job
+        try:
+            job.result = target(*args, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            self._finish(job, 'error')
+        else:
+            self._finish(job, 'cancelled' if job.cancelled else 'done')
+        finally:
+            _local.job = None
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished = time.time()
+        if state == 'done':
+            job.progress = 1.0
+        job.done_event.set()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.max_history)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self, kind=None, session_id=None):
+        """Lavori dal più recente (session_id=None: tutte le sessioni)"""
+        with self.lock:
+            jobs = [job for job in self.jobs.values()
+                    if (kind is None or job.kind == kind) and (session_id is None or job.session_id == session_id)]
+        return [job.snapshot() for job in reversed(jobs)]
+
+    def active(self, kind, session_id=None):
+        with self.lock:
+            return [job for job in self.jobs.values()
+                    if job.kind == kind and job.active and (session_id is None or job.session_id == session_id)]
+
+    def cancel(self, job_id):
+        """Richiede l'annullamento; un lavoro ancora in coda non parte. False se non esiste"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            job.cancel_event.set()
+            queued = job.state == 'queued'
+            if queued:
+                queue = self.queues.get(job.session_id)
+                if queue is not None:
+                    for item in queue:
+                        if item[0] is job:
+                            queue.remove(item)
+                            break
+                    if not queue:
+                        del self.queues[job.session_id]
+        if queued:
+            self._finish(job, 'cancelled')
+        return True
+
+    def stop_kind(self, kind, timeout, session_id=None):
+        """
+        Annulla i lavori attivi di un tipo (della sessione) e ne attende la fine: nuova
+        esecuzione che sostituisce la precedente. JobRejected se non terminano entro timeout.
+        """
+        deadline = time.monotonic() + timeout
+        for job in self.active(kind, session_id):
+            self.cancel(job.job_id)
+            if not job.wait(max(0.0, deadline - time.monotonic())):
+                raise JobRejected(f"Il lavoro precedente ({job.job_id}) non è ancora terminato")
+
+    def stats(self):
+        with self.lock:
+            return {
+                'workers': len(self.workers),
+                'max_workers': self.max_workers,
+                'running': sum(1 for job in self.jobs.values() if job.state == 'running'),
+                'queued': {session_id: len(queue) for session_id, queue in self.queues.items()},
+            }
+
+    def shutdown(self, timeout=10.0):
+        """Annulla tutti i lavori e attende la loro fine entro timeout (secondi)"""
+        with self.lock:
+            self.closed = True
+            jobs = list(self.jobs.values())
+            self.available.notify_all()
+        for job in jobs:
+            self.cancel(job.job_id)
+        deadline = time.monotonic() + timeout
+        for job in jobs:
+            job.wait(max(0.0, deadline - time.monotonic()))
+        return [job.job_id for job in jobs if job.active]
+
+
+class InferenceLimiter:
+    """
+    Al massimo `limit` inferenze contemporanee. Chi attende è servito in ordine di
+    arrivo: un loop che rilascia lo slot e lo richiede subito si mette in fondo,
+    dietro ai loop delle altre sessioni.
+    """
+
+    def __init__(self, limit=MAX_CONCURRENT_INFERENCE):
+        self.limit = max(1, int(limit))
+        self.running = 0
+        self.waiting = deque()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            if self.running < self.limit and not self.waiting:
+                self.running += 1
+                return
+            ticket = object()
+            self.waiting.append(ticket)
+            start = time.perf_counter()
+            while self.waiting[0] is not ticket or self.running >= self.limit:
+                self.condition.wait()
+            self.waiting.popleft()
+            self.running += 1
+            self.waits += 1
+            self.wait_seconds += time.perf_counter() - start
+            # Con il limite alzato può partire anche il successivo
+            self.condition.notify_all()
+
+    def release(self):
+        with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def set_limit(self, limit):
+        with self.condition:
+            self.limit = max(1, int(limit))
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'max_concurrent': self.limit,
+                'running': self.running,
+                'waiting': len(self.waiting),
+                'waits': self.waits,
+                'wait_s': round(self.wait_seconds, 3),
+            }
@@ -1,12 +1,26 @@
-import mediapipe as mp
-import numpy as np
 from contour import get_head_y
+from lazy_imports import lazy_module
+
+mp = lazy_module('mediapipe')
+np = lazy_module('numpy')
+
+# Soglie di rilevamento predefinite (frazioni della quota baseline dell'anca, cm/s)
+DEFAULT_THRESHOLDS = {
+    'baseline_frames': 30,          # Frame per la quota baseline dell'anca
+    'jump_start': 0.05,             # Spostamento verso l'alto per l'inizio salto
+    'jump_end': 0.03,               # Distanza dalla baseline per l'atterraggio
+    'phase_velocity': 5.0,          # Velocità (cm/s) per fasi eccentrica/concentrica
+    'landing_guard_frames': 5,      # Frame minimi dopo lo stacco prima di cercare l'atterraggio
+    'contact_guard_frames': 10,     # Frame minimi dopo lo stacco prima della fase di contatto
+}
+
 
 class JumpAnalyzer:
     """Classe per analizzare i salti verticali"""
 
-    def __init__(self, fps=30):
+    def __init__(self, fps=30, thresholds=None):
         self.fps = fps
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
         self.g = 9.81
         self.baseline_hip_y = None
         self.max_jump_height_pixels = 0
@@ -19,6 +33,7 @@ class JumpAnalyzer:
         self.landing_frame = None
         self.current_frame = 0
         self.hip_positions = []
+        self.frame_times = []  # Timestamp reale (s) di ogni frame processato
         self.calibration_frames = []
         self.pixel_to_cm_ratio = None
         self.calibrated_with_height = False
@@ -77,16 +92,28 @@ class JumpAnalyzer:
             print(f"Errore calibrazione: {e}")
             return False
 
+    def time_at(self, frame):
+        """Timestamp (s) del frame indicato; passo costante 1/fps se non disponibile"""
+        if frame is not None and 0 < frame <= len(self.frame_times):
+            return self.frame_times[frame - 1]
+        return frame / self.fps
+
+    def elapsed(self, start_frame, end_frame):
+        """Tempo reale trascorso tra due frame"""
+        return self.time_at(end_frame) - self.time_at(start_frame)
+
     def calibrate_baseline(self, hip_y):
         self.calibration_frames.append(hip_y)
-        if len(self.calibration_frames) >= 30:
+        if len(self.calibration_frames) >= self.thresholds['baseline_frames']:
             self.baseline_hip_y = np.mean(self.calibration_frames)
             return True
         return False
 
-    def detect_jump_start(self, current_hip_y, threshold=0.05):
+    def detect_jump_start(self, current_hip_y, threshold=None):
         if self.baseline_hip_y is None:
             return False
+        if threshold is None:
+            threshold = self.thresholds['jump_start']
         movement = self.baseline_hip_y - current_hip_y
         threshold_pixels = threshold * abs(self.baseline_hip_y)
         if movement > threshold_pixels and not self.jump_started:
@@ -95,15 +122,18 @@ class JumpAnalyzer:
             return True
         return False
 
-    def detect_jump_end(self, current_hip_y, threshold=0.03):
+    def detect_jump_end(self, current_hip_y, threshold=None):
         if not self.jump_started or self.jump_ended:
             return False
+        if threshold is None:
+            threshold = self.thresholds['jump_end']
         distance_from_baseline = abs(current_hip_y - self.baseline_hip_y)
         threshold_pixels = threshold * abs(self.baseline_hip_y)
-        if distance_from_baseline < threshold_pixels and self.current_frame > self.takeoff_frame + 5:
+        if (distance_from_baseline < threshold_pixels and
+                self.current_frame > self.takeoff_frame + self.thresholds['landing_guard_frames']):
             self.jump_ended = True
             self.landing_frame = self.current_frame
-            self.jump_fall = (self.landing_frame - self.jump_max_height_frame) / self.fps
+            self.jump_fall = self.elapsed(self.jump_max_height_frame, self.landing_frame)
             return True
         return False
 
@@ -119,21 +149,21 @@ class JumpAnalyzer:
 
     def get_flight_time(self):
         if self.takeoff_frame is not None and self.landing_frame is not None:
-            frames_in_air = self.landing_frame - self.takeoff_frame
-            return frames_in_air / self.fps
+            return self.elapsed(self.takeoff_frame, self.landing_frame)
         return 0
 
     def get_fall_time(self):
         if self.jump_max_height_frame is not None and self.landing_frame is not None:
-            frames_falling = self.landing_frame - self.jump_max_height_frame
-            return frames_falling / self.fps
+            return self.elapsed(self.jump_max_height_frame, self.landing_frame)
         return 0
 
     def calculate_velocity(self, current_hip_y):
         if len(self.hip_positions) < 2 or not self.pixel_to_cm_ratio:
             return 0.0
         delta_y_pixels = self.hip_positions[-1] - current_hip_y
-        delta_t = 1.0 / self.fps
+        delta_t = self.frame_times[-1] - self.frame_times[-2] if len(self.frame_times) >= 2 else 1.0 / self.fps
+        if delta_t <= 0:
+            delta_t = 1.0 / self.fps
         delta_y_cm = delta_y_pixels * self.pixel_to_cm_ratio
         return delta_y_cm / delta_t
 
@@ -142,7 +172,7 @@ class JumpAnalyzer:
             return
         if (self.contact_start_frame is None and 
             current_hip_y > self.baseline_hip_y and 
-            self.current_frame > self.takeoff_frame + 10):
+            self.current_frame > self.takeoff_frame + self.thresholds['contact_guard_frames']):
             self.contact_start_frame = self.current_frame
         if (self.contact_start_frame is not None and 
             self.contact_end_frame is None and 
@@ -150,26 +180,26 @@ class JumpAnalyzer:
             self.contact_end_frame = self.current_frame
         if (self.contact_start_frame is not None and 
             self.eccentric_start_frame is None and 
-            velocity < -5.0):
+            velocity < -self.thresholds['phase_velocity']):
             self.eccentric_start_frame = self.current_frame
         if (self.eccentric_start_frame is not None and 
             self.concentric_start_frame is None and 
-            velocity > 5.0):
+            velocity > self.thresholds['phase_velocity']):
             self.concentric_start_frame = self.current_frame
 
     def get_contact_time(self):
         if self.contact_start_frame is not None and self.contact_end_frame is not None:
-            return (self.contact_end_frame - self.contact_start_frame) / self.fps
+            return self.elapsed(self.contact_start_frame, self.contact_end_frame)
         return 0.0
 
     def get_eccentric_time(self):
         if self.eccentric_start_frame is not None and self.concentric_start_frame is not None:
-            return (self.concentric_start_frame - self.eccentric_start_frame) / self.fps
+            return self.elapsed(self.eccentric_start_frame, self.concentric_start_frame)
         return 0.0
 
     def get_concentric_time(self):
         if self.concentric_start_frame is not None and self.contact_end_frame is not None:
-            return (self.contact_end_frame - self.concentric_start_frame) / self.fps
+            return self.elapsed(self.concentric_start_frame, self.contact_end_frame)
         return 0.0
 
     def get_takeoff_velocity(self):
@@ -208,9 +238,15 @@ class JumpAnalyzer:
         v0_ms = v0 / 100.0
         return (body_mass_kg * v0_ms) / contact_time
 
-    def process_frame(self, hip_y):
+    def process_frame(self, hip_y, timestamp=None):
+        """
+        Processa la posizione dell'anca di un frame.
+        timestamp: tempo reale del frame in secondi (video a frame rate variabile);
+        se assente si assume un passo costante di 1/fps.
+        """
         self.current_frame += 1
         self.hip_positions.append(hip_y)
+        self.frame_times.append(self.current_frame / self.fps if timestamp is None else float(timestamp))
         
         if self.baseline_hip_y is None and self.calibrated_with_height:
             calibrated = self.calibrate_baseline(hip_y)
@@ -246,6 +282,7 @@ class JumpAnalyzer:
         self.landing_frame = None
         self.current_frame = 0
         self.hip_positions = []
+        self.frame_times = []
         self.calibration_frames = []
         self.hip_velocities = []
         self.contact_start_frame = None
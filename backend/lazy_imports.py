@@ -0,0 +1,145 @@
+"""
+Import differiti dei moduli pesanti (OpenCV, MediaPipe, NumPy) e warm-up in background.
+
+    cv2 = lazy_module('cv2')
+
+crea un segnaposto: il modulo vero è importato al primo accesso a un attributo
+(cv2.VideoCapture, np.array, ...). Dopo il caricamento gli attributi del modulo
+sono copiati nel segnaposto, quindi gli accessi successivi costano come con un
+import normale. L'import del backend non carica più MediaPipe/OpenCV: il server
+risponde subito e il warm-up li carica in un thread dopo il bind della porta.
+
+Tempi e stato di ogni import/modello sono esposti da status() (/api/health).
+"""
+
+import importlib
+import sys
+import threading
+import time
+import traceback
+
+_lock = threading.RLock()          # Registro degli stati (mai tenuto durante un import)
+_import_lock = threading.RLock()   # Import serializzati: nessun thread vede un modulo a metà
+_imports = {}  # nome modulo -> {'state', 'seconds', 'error'}
+_models = {}   # nome modello -> {'state', 'seconds', 'error'}
+_warm_up = {'state': 'idle', 'started': None, 'seconds': None}
+
+
+def _record(registry, name, state, seconds=None, error=None):
+    with _lock:
+        entry = registry.setdefault(name, {'state': 'pending', 'seconds': None, 'error': None})
+        entry['state'] = state
+        if seconds is not None:
+            entry['seconds'] = round(seconds, 3)
+        entry['error'] = error
+
+
+def load(name):
+    """Importa il modulo (una sola volta, anche da più thread) registrandone il tempo"""
+    module = sys.modules.get(name)
+    if module is not None and _imports.get(name, {}).get('state') == 'ready':
+        return module
+    with _import_lock:
+        if _imports.get(name, {}).get('state') == 'ready':
+            return sys.modules[name]
+        _record(_imports, name, 'loading')
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(name)
+        except Exception as e:
+            _record(_imports, name, 'error', time.perf_counter() - start, str(e))
+            raise
+        _record(_imports, name, 'ready', time.perf_counter() - start)
+        return module
+
+
+class LazyModule:
+    """Segnaposto di un modulo importato al primo accesso a un attributo"""
+
+    def __init__(self, name):
+        object.__setattr__(self, '_lazy_name', name)
+        with _lock:
+            _imports.setdefault(name, {'state': 'pending', 'seconds': None, 'error': None})
+
+    def _lazy_load(self):
+        module = load(self._lazy_name)
+        # Copia degli attributi: da qui in poi __getattr__ non viene più chiamato
+        self.__dict__.update({key: value for key, value in module.__dict__.items() if key not in self.__dict__})
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._lazy_load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._lazy_load(), attribute, value)
+        self.__dict__[attribute] = value
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        state = _imports.get(self._lazy_name, {}).get('state')
+        return f"<lazy module '{self._lazy_name}' ({state})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def is_loaded(name):
+    return _imports.get(name, {}).get('state') == 'ready'
+
+
+def register_model(name):
+    with _lock:
+        _models.setdefault(name, {'state': 'pending', 'seconds': None, 'error': None})
+
+
+def warm_up(modules, models=()):
+    """
+    Importa i moduli e inizializza i modelli in ordine.
+    models: [(nome, funzione senza argomenti)]. Un errore non interrompe gli altri passi.
+    """
+    with _lock:
+        _warm_up.update(state='running', started=time.time())
+    start = time.perf_counter()
+    for name in modules:
+        try:
+            load(name)
+        except Exception as e:
+            print(f"Warm-up: import di {name} fallito: {e}")
+    for name, loader in models:
+        _record(_models, name, 'loading')
+        step_start = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            traceback.print_exc()
+            _record(_models, name, 'error', time.perf_counter() - step_start, str(e))
+        else:
+            _record(_models, name, 'ready', time.perf_counter() - step_start)
+    with _lock:
+        _warm_up.update(state='done', seconds=round(time.perf_counter() - start, 3))
+
+
+def start_warm_up(modules, models=()):
+    for name, _ in models:
+        register_model(name)
+    thread = threading.Thread(target=warm_up, args=(modules, models), name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def status():
+    """Stato di import e modelli: ready quando tutto è caricato senza errori"""
+    with _lock:
+        imports = {name: dict(entry) for name, entry in _imports.items()}
+        models = {name: dict(entry) for name, entry in _models.items()}
+        warm_up_state = dict(_warm_up)
+    entries = list(imports.values()) + list(models.values())
+    return {
+        'ready': all(entry['state'] == 'ready' for entry in entries),
+        'warm_up': warm_up_state,
+        'imports': imports,
+        'models': models,
+    }
@@ -0,0 +1,179 @@
+"""
+Strumentazione del percorso critico (decodifica, conversioni colore, MediaPipe,
+disegno, JumpAnalyzer, attese sul lock dello stato, codifica JPEG).
+- Timer per fase con istogramma cumulativo (bucket Prometheus) e finestra mobile
+  degli ultimi campioni per i percentili
+- Gauge (fps ottenuti vs fps sorgente, profondità delle code)
+- Esposizione in formato testo Prometheus e riepilogo per singola esecuzione:
+  begin_run() lega al thread di lavoro i totali del run (conservati sull'oggetto
+  del run), quindi analisi contemporanee di sessioni diverse non si mescolano
+
+Disabilitata di default: `stage()` restituisce un context manager vuoto condiviso
+e `observe()` esce subito, quindi il costo nel loop è una chiamata e un if.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+# Limiti superiori dei bucket (secondi)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+WINDOW = 512  # Campioni recenti per fase (percentili)
+
+_NULL = nullcontext()
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+        self.recent.append(seconds)
+
+
+class _Stage:
+    """Context manager di misura di una fase"""
+    __slots__ = ('metrics', 'key', 'start')
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class RunTotals:
+    """Durate per fase di una singola calibrazione/analisi: (loop, fase) -> _Histogram"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, key, seconds):
+        histogram = self.stages.get(key)
+        if histogram is None:
+            histogram = self.stages[key] = _Histogram()
+        histogram.add(seconds)
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}   # (loop, fase) -> _Histogram
+        self.gauges = {}       # (nome, etichette) -> valore
+        self.local = threading.local()  # .run: RunTotals del run eseguito dal thread
+        self.collectors = []   # funzioni chiamate prima dell'esposizione (gauge aggiornati al volo)
+
+    def stage(self, loop, name):
+        """with metrics.stage('analysis', 'pose'): ..."""
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, (loop, name))
+
+    def observe(self, key, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram()
+            histogram.add(seconds)
+            run = getattr(self.local, 'run', None)
+            if run is not None:
+                run.add(key, seconds)
+
+    def set_gauge(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def begin_run(self):
+        """
+        Nuovi totali per il run eseguito dal thread corrente (gli istogrammi restano
+        cumulativi). Le misure del thread vanno nei totali restituiti fino a end_run().
+        """
+        run = RunTotals()
+        self.local.run = run
+        return run
+
+    def end_run(self):
+        self.local.run = None
+
+    def run_summary(self, loop, run):
+        """Tempo medio, totale e p95 per fase del run (ms), None se disabilitata"""
+        if not self.enabled:
+            return None
+        with self.lock:
+            summary = {}
+            for (run_loop, name), histogram in run.stages.items():
+                if run_loop != loop:
+                    continue
+                recent = histogram.recent
+                summary[name] = {
+                    'count': histogram.count,
+                    'mean_ms': round(histogram.total / histogram.count * 1000, 3),
+                    'total_ms': round(histogram.total * 1000, 1),
+                    'p95_ms': round(float(np.percentile(recent, 95)) * 1000, 3) if recent else None
+                }
+            return summary
+
+    def prometheus(self):
+        """Metriche in formato testo Prometheus (0.0.4)"""
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Errore raccolta metriche: {e}")
+
+        lines = [
+            '# HELP jump_stage_seconds Durata delle fasi del loop di analisi',
+            '# TYPE jump_stage_seconds histogram'
+        ]
+        with self.lock:
+            for (loop, name), histogram in sorted(self.histograms.items()):
+                labels = f'loop="{loop}",stage="{name}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'jump_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'jump_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'jump_stage_seconds_sum{{{labels}}} {histogram.total:.6f}')
+                lines.append(f'jump_stage_seconds_count{{{labels}}} {histogram.count}')
+
+            names = sorted({name for name, _ in self.gauges})
+            for name in names:
+                lines.append(f'# TYPE {name} gauge')
+                for (gauge, labels), value in sorted(self.gauges.items()):
+                    if gauge != name:
+                        continue
+                    label_text = ','.join(f'{key}="{val}"' for key, val in labels)
+                    lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+        lines.append(f'jump_metrics_enabled {int(self.enabled)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,169 @@
+"""
+Profilazione opzionale di una singola calibrazione o analisi.
+Il target del thread di lavoro è eseguito sotto:
+- cProfile (deterministico, solo il thread di lavoro) -> profile.pstats + summary.txt
+- un campionatore dello stack dello stesso thread ogni `interval` secondi
+  -> stacks.collapsed (formato "f1;f2;f3 N", pronto per flamegraph.pl / speedscope)
+
+I file di ogni esecuzione stanno in <cartella>/<run_id>/ con meta.json.
+Le esecuzioni senza profilazione usano il target originale: nessun costo aggiuntivo.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+SAMPLE_INTERVAL = 0.005
+MAX_PROFILES = 50
+SUMMARY_LINES = 60
+
+# Nome esposto dall'endpoint di download -> file su disco
+PROFILE_FILES = {
+    'pstats': 'profile.pstats',
+    'collapsed': 'stacks.collapsed',
+    'summary': 'summary.txt',
+    'meta': 'meta.json',
+}
+
+RUN_ID_PATTERN = re.compile(r'^[a-z]+_\d{8}_\d{6}_[0-9a-f]{6}$')
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Campiona lo stack Python di un thread a intervalli regolari.
+    root: codice della funzione da cui partono gli stack (esclusa, come i frame di threading sopra di essa)
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL, root=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and frame.f_code is not self.root:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    def __init__(self, folder, max_profiles=MAX_PROFILES, interval=SAMPLE_INTERVAL):
+        self.folder = folder
+        self.max_profiles = max_profiles
+        self.interval = interval
+
+    def new_run_id(self, kind):
+        return f"{kind}_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+    def wrap(self, target, kind):
+        """
+        Restituisce (run_id, target profilato). I file sono scritti alla fine
+        del target, anche se termina con un'eccezione.
+        """
+        run_id = self.new_run_id(kind)
+
+        def profiled_target(*args, **kwargs):
+            profiler = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident(), self.interval, root=sys._getframe().f_code)
+            started = datetime.now()
+            start = time.perf_counter()
+            sampler.start()
+            profiler.enable()
+            try:
+                return target(*args, **kwargs)
+            finally:
+                profiler.disable()
+                sampler.stop()
+                try:
+                    self._save(run_id, kind, profiler, sampler, started, time.perf_counter() - start)
+                except Exception as e:
+                    print(f"Errore salvataggio profilo {run_id}: {e}")
+
+        return run_id, profiled_target
+
+    def _save(self, run_id, kind, profiler, sampler, started, duration):
+        run_dir = os.path.join(self.folder, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(run_dir, PROFILE_FILES['pstats']))
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        with open(os.path.join(run_dir, PROFILE_FILES['summary']), 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+        with open(os.path.join(run_dir, PROFILE_FILES['collapsed']), 'w', encoding='utf-8') as f:
+            f.write(sampler.collapsed())
+        with open(os.path.join(run_dir, PROFILE_FILES['meta']), 'w', encoding='utf-8') as f:
+            json.dump({
+                'run_id': run_id,
+                'kind': kind,
+                'started': started.isoformat(timespec='seconds'),
+                'duration_s': round(duration, 3),
+                'samples': sampler.samples,
+                'sample_interval_s': self.interval,
+            }, f, indent=2)
+        self._evict()
+
+    def _evict(self):
+        """Oltre max_profiles si cancellano le esecuzioni più vecchie"""
+        runs = self.list()
+        for run in runs[self.max_profiles:]:
+            shutil.rmtree(os.path.join(self.folder, run['run_id']), ignore_errors=True)
+
+    def list(self):
+        """Profili salvati, dal più recente"""
+        runs = []
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return runs
+        for name in names:
+            try:
+                with open(os.path.join(self.folder, name, PROFILE_FILES['meta']), 'r', encoding='utf-8') as f:
+                    runs.append(json.load(f))
+            except (OSError, ValueError):
+                pass
+        runs.sort(key=lambda run: run.get('started', ''), reverse=True)
+        return runs
+
+    def path(self, run_id, name):
+        """Percorso di un file del profilo, None se inesistente o nome non valido"""
+        filename = PROFILE_FILES.get(name)
+        if filename is None or not RUN_ID_PATTERN.match(run_id):
+            return None
+        path = os.path.join(self.folder, run_id, filename)
+        return path if os.path.exists(path) else None
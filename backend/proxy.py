@@ -0,0 +1,87 @@
+"""
+Proxy di analisi per i video caricati.
+I file dei telefoni arrivano con codec e GOP arbitrari (es. H.265 4K a GOP lungo):
+decodifica e seek costano in modo imprevedibile. Il proxy viene creato una volta
+in background con risoluzione fissa di analisi, tutto intra (MJPG: ogni frame è un
+keyframe, seek immediati) e un frame per ogni frame sorgente; i timestamp originali
+sono conservati nel sidecar, quindi le metriche restano corrette anche per VFR.
+L'originale resta intatto come archivio.
+"""
+
+import os
+
+from file_jobs import BuildCancelled, FileJobs
+from jobs import cancelled
+from frame_timing import FrameClock, get_video_fps, save_timestamps
+from lazy_imports import lazy_module
+
+cv2 = lazy_module('cv2')
+
+PROXY_MAX_HEIGHT = 720  # Risoluzione di analisi (mai ingrandita)
+PROXY_QUALITY = 90
+
+
+def proxy_path(video_path):
+    return f"{video_path}.proxy.avi"
+
+
+def build_proxy(video_path):
+    """Transcodifica il video nel proxy MJPG con sidecar dei timestamp originali"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Impossibile aprire il video")
+
+    fps = get_video_fps(video_path, default=30)
+    clock = FrameClock(video_path, fps)
+    path = proxy_path(video_path)
+    tmp_path = f"{path}.tmp.avi"
+    writer = None
+    timestamps = []
+
+    try:
+        index = 0
+        while True:
+            if cancelled():
+                raise BuildCancelled()
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamps.append(clock.timestamp(cap, index))
+            index += 1
+
+            h, w = frame.shape[:2]
+            if h > PROXY_MAX_HEIGHT:
+                size = (round(w * PROXY_MAX_HEIGHT / h) // 2 * 2, PROXY_MAX_HEIGHT)
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+            if writer is None:
+                writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*'MJPG'), fps,
+                                         (frame.shape[1], frame.shape[0]))
+                writer.set(cv2.VIDEOWRITER_PROP_QUALITY, PROXY_QUALITY)
+                if not writer.isOpened():
+                    raise ValueError("Impossibile creare il proxy")
+            writer.write(frame)
+    except BuildCancelled:
+        if writer is not None:
+            writer.release()
+            writer = None
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        cap.release()
+        if writer is not None:
+            writer.release()
+
+    if not timestamps:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise ValueError("Video senza frame")
+
+    # Il proxy diventa visibile solo quando è completo, con i suoi timestamp
+    save_timestamps(path, timestamps)
+    os.replace(tmp_path, path)
+    return path
+
+
+proxy_jobs = FileJobs('proxy', build_proxy, proxy_path)
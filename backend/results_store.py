@@ -0,0 +1,261 @@
+"""
+Archivio dei risultati dei test su SQLite.
+Sostituisce i file test_results/<test_id>/results.json, che venivano letti e
+riscritti per intero a ogni salto: qui un salvataggio è un INSERT in una
+transazione, con costo indipendente dal numero di salti già presenti.
+
+Tabelle:
+- tests: un record per test
+- jumps: un record per salto (numero progressivo nel test, risultati, fasi, impostazioni)
+- trajectories: traiettoria e velocità del salto come blob float32 colonnari
+  (series_codec), separate dai dati scalari
+
+Al primo accesso i vecchi file JSON vengono importati (una sola volta per file,
+i file originali non sono modificati).
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import series_codec
+
+DATA_DIR = os.path.join(os.path.expanduser('~'), 'AppData', 'Roaming', 'Kin.ai')
+DB_FILENAME = 'results.db'
+
+# Migrazioni dello schema in ordine, la versione corrente è in PRAGMA user_version
+MIGRATIONS = [
+    """
+    CREATE TABLE tests (
+        id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL
+    );
+    CREATE TABLE jumps (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        test_id TEXT NOT NULL REFERENCES tests(id),
+        jump_number INTEGER NOT NULL,
+        timestamp TEXT NOT NULL,
+        results TEXT NOT NULL,
+        phase_times TEXT,
+        settings TEXT,
+        UNIQUE (test_id, jump_number)
+    );
+    CREATE INDEX jumps_timestamp ON jumps(timestamp);
+    CREATE TABLE trajectories (
+        jump_id INTEGER PRIMARY KEY REFERENCES jumps(id) ON DELETE CASCADE,
+        format TEXT NOT NULL,
+        trajectory BLOB,
+        velocity BLOB
+    );
+    CREATE TABLE imported_files (
+        path TEXT PRIMARY KEY,
+        imported_at TEXT NOT NULL
+    );
+    """,
+    # Storico: atleta e metriche principali come colonne indicizzabili
+    """
+    ALTER TABLE tests ADD COLUMN athlete_id TEXT;
+    ALTER TABLE jumps ADD COLUMN athlete_id TEXT;
+    ALTER TABLE jumps ADD COLUMN max_height REAL;
+    ALTER TABLE jumps ADD COLUMN flight_time REAL;
+    ALTER TABLE jumps ADD COLUMN contact_time REAL;
+    ALTER TABLE jumps ADD COLUMN estimated_power REAL;
+    UPDATE jumps SET
+        max_height = json_extract(results, '$.max_height'),
+        flight_time = json_extract(results, '$.flight_time'),
+        contact_time = json_extract(results, '$.contact_time'),
+        estimated_power = json_extract(results, '$.estimated_power');
+    CREATE INDEX jumps_athlete_timestamp ON jumps(athlete_id, timestamp);
+    CREATE INDEX jumps_test_timestamp ON jumps(test_id, timestamp);
+    """,
+]
+
+# Metriche salvate come colonne (query e aggregati dello storico)
+METRICS = ('max_height', 'flight_time', 'contact_time', 'estimated_power')
+
+
+def encode_series(series):
+    """Serie [{'t':..., 'y'/'v':...}] -> (formato, blob): colonne float32 (series_codec)"""
+    return 'f32', series_codec.encode_series(series)
+
+
+def decode_series(fmt, blob):
+    if blob is None:
+        return []
+    if fmt == 'f32':
+        return series_codec.decode_series(blob)
+    if fmt == 'json':
+        return json.loads(blob.decode('utf-8'))
+    raise ValueError(f"Formato serie sconosciuto: {fmt}")
+
+
+class ResultsStore:
+    """Connessione condivisa (serializzata da un lock), aperta al primo uso"""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, DB_FILENAME)
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        if self.conn is not None:
+            return self.conn
+        os.makedirs(self.data_dir, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            conn.executescript(f"BEGIN; {script} PRAGMA user_version = {number}; COMMIT;")
+        self.conn = conn
+        self._import_legacy()
+        return conn
+
+    def _insert_jump(self, conn, test_id, jump_number, data, athlete_id=None):
+        conn.execute('INSERT OR IGNORE INTO tests (id, created_at, athlete_id) VALUES (?, ?, ?)',
+                     (test_id, data.get('timestamp') or datetime.now().isoformat(), athlete_id))
+        if athlete_id is None:
+            # Salti successivi dello stesso test: atleta del test
+            row = conn.execute('SELECT athlete_id FROM tests WHERE id = ?', (test_id,)).fetchone()
+            athlete_id = row[0] if row else None
+        else:
+            conn.execute('UPDATE tests SET athlete_id = ? WHERE id = ? AND athlete_id IS NULL', (athlete_id, test_id))
+        results = data.get('results') or {}
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO jumps (test_id, jump_number, timestamp, results, phase_times, settings, '
+            'athlete_id, max_height, flight_time, contact_time, estimated_power) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (test_id, jump_number, data.get('timestamp') or datetime.now().isoformat(),
+             json.dumps(results), json.dumps(data.get('phase_times')), json.dumps(data.get('settings')),
+             athlete_id, *(results.get(metric) for metric in METRICS)))
+        if cursor.rowcount == 0:
+            return None
+        jump_id = cursor.lastrowid
+        fmt, trajectory = encode_series(data.get('trajectory'))
+        _, velocity = encode_series(data.get('velocity'))
+        conn.execute('INSERT INTO trajectories (jump_id, format, trajectory, velocity) VALUES (?, ?, ?, ?)',
+                     (jump_id, fmt, trajectory, velocity))
+        return jump_id
+
+    def _import_legacy(self):
+        """Importa i file test_results/<test_id>/results.json non ancora importati"""
+        conn = self.conn
+        pattern = os.path.join(self.data_dir, 'test_results', '*', 'results.json')
+        for path in glob.glob(pattern):
+            if conn.execute('SELECT 1 FROM imported_files WHERE path = ?', (path,)).fetchone():
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+            except Exception as e:
+                print(f"Errore lettura {path}: {e}")
+                continue
+            test_id = os.path.basename(os.path.dirname(path))
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for key, data in legacy.items():
+                    if not key.startswith('jump_') or not isinstance(data, dict):
+                        continue
+                    try:
+                        number = int(key.replace('jump_', ''))
+                    except ValueError:
+                        continue
+                    self._insert_jump(conn, test_id, number, data)
+                conn.execute('INSERT INTO imported_files (path, imported_at) VALUES (?, ?)',
+                             (path, datetime.now().isoformat()))
+                conn.execute('COMMIT')
+            except Exception as e:
+                conn.execute('ROLLBACK')
+                print(f"Errore importazione {path}: {e}")
+
+    def add_jump(self, test_id, data, athlete_id=None):
+        """Aggiunge un salto al test con il prossimo numero libero; restituisce il numero"""
+        with self.lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT MAX(jump_number) FROM jumps WHERE test_id = ?', (test_id,)).fetchone()
+                jump_number = (row[0] or 0) + 1
+                self._insert_jump(conn, test_id, jump_number, data, athlete_id)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return jump_number
+
+    def get_test(self, test_id):
+        """Salti del test nel formato dei vecchi file: {'jump_N': {...}}"""
+        with self.lock:
+            conn = self._connect()
+            rows = conn.execute(
+                'SELECT j.jump_number, j.timestamp, j.results, j.phase_times, j.settings, '
+                't.format, t.trajectory, t.velocity '
+                'FROM jumps j LEFT JOIN trajectories t ON t.jump_id = j.id '
+                'WHERE j.test_id = ? ORDER BY j.jump_number', (test_id,)).fetchall()
+        test = {}
+        for number, timestamp, results, phase_times, settings, fmt, trajectory, velocity in rows:
+            test[f'jump_{number}'] = {
+                'timestamp': timestamp,
+                'results': json.loads(results),
+                'trajectory': decode_series(fmt, trajectory),
+                'velocity': decode_series(fmt, velocity),
+                'phase_times': json.loads(phase_times) if phase_times else None,
+                'settings': json.loads(settings) if settings else None
+            }
+        return test
+
+
+    def _filters(self, athlete_id=None, test_id=None, date_from=None, date_to=None):
+        """Clausola WHERE e parametri per atleta, test e intervallo di date"""
+        clauses = []
+        params = []
+        if athlete_id is not None:
+            clauses.append('athlete_id = ?')
+            params.append(athlete_id)
+        if test_id is not None:
+            clauses.append('test_id = ?')
+            params.append(test_id)
+        if date_from:
+            clauses.append('timestamp >= ?')
+            params.append(date_from)
+        if date_to:
+            # Una data senza ora include tutto il giorno
+            clauses.append('timestamp <= ?')
+            params.append(date_to + '\uffff' if len(date_to) == 10 else date_to)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def query_jumps(self, athlete_id=None, test_id=None, date_from=None, date_to=None, limit=None):
+        """
+        Salti (solo dati scalari) filtrati per atleta, test e intervallo di date
+        (ISO, estremi inclusi), in ordine cronologico. Usa gli indici (atleta|test, timestamp).
+        """
+        where, params = self._filters(athlete_id, test_id, date_from, date_to)
+        sql = 'SELECT test_id, athlete_id, jump_number, timestamp, ' + ', '.join(METRICS) + ' FROM jumps' + where
+        if limit:
+            # Gli ultimi `limit` salti, restituiti comunque in ordine cronologico
+            sql += ' ORDER BY timestamp DESC LIMIT ?'
+            params.append(int(limit))
+        else:
+            sql += ' ORDER BY timestamp'
+        with self.lock:
+            conn = self._connect()
+            rows = conn.execute(sql, params).fetchall()
+        return rows[::-1] if limit else rows
+
+    def jump_traces(self, athlete_id=None, test_id=None, date_from=None, date_to=None):
+        """(test_id, jump_number, trace_id) dei salti salvati con un trace dell'analisi"""
+        where, params = self._filters(athlete_id, test_id, date_from, date_to)
+        trace = "json_extract(results, '$.trace_id')"
+        sql = (f'SELECT test_id, jump_number, {trace} FROM jumps' + where
+               + (' AND ' if where else ' WHERE ') + f'{trace} IS NOT NULL ORDER BY timestamp')
+        with self.lock:
+            conn = self._connect()
+            return conn.execute(sql, params).fetchall()
+
+
+results_store = ResultsStore()
@@ -0,0 +1,172 @@
+"""
+Stato per esecuzione di calibrazione e analisi, posseduto dal thread di lavoro.
+
+Il worker scrive sui campi del proprio oggetto senza lock (nessun altro thread li
+modifica) ed è l'unico a pubblicare: ai lettori HTTP passa uno snapshot immutabile
+(NamedTuple) con una singola assegnazione di attributo, atomica. Gli endpoint
+leggono `run.snapshot` senza lock e senza copiare lo stato della sessione.
+I comandi verso il worker (pausa, stop) sono Event: il worker li legge e pubblica
+lo stato risultante, quindi uno snapshot vecchio non può sostituirne uno più recente.
+
+Traiettoria e velocità non sono copiate a ogni pubblicazione: le liste del run
+crescono solo in coda e lo snapshot ne fissa la lunghezza, i punti fino a quella
+lunghezza non cambiano più. La copia (trajectory/velocity) la paga solo chi legge.
+
+    run = AnalysisRun('analysis', analyzer, body_mass_kg)   # richiesta HTTP
+    run.add_sample(...); run.publish()                      # thread di lavoro
+    run.snapshot.trajectory                                 # qualsiasi thread
+"""
+
+import threading
+import time
+import uuid
+from typing import NamedTuple, Optional
+
+
+class Published:
+    """Ultimo valore pubblicato (es. frame JPEG dell'anteprima): lettura e scrittura senza lock"""
+    __slots__ = ('value',)
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class AnalysisSnapshot(NamedTuple):
+    run_id: Optional[str]
+    kind: Optional[str]          # analysis, live, cached, replay
+    analyzing: bool
+    paused: bool
+    current_frame: int
+    total_frames: int
+    trajectory_points: list      # [{'t', 'y'}, ...] del run, solo accodamenti
+    trajectory_count: int        # Punti validi per questo snapshot
+    velocity_points: list        # [{'t', 'v'}, ...]
+    velocity_count: int
+    realtime: dict
+    final_results: Optional[dict]
+    published: float
+
+    @property
+    def trajectory(self):
+        return tuple(self.trajectory_points[:self.trajectory_count])
+
+    @property
+    def velocity(self):
+        return tuple(self.velocity_points[:self.velocity_count])
+
+
+EMPTY_ANALYSIS = AnalysisSnapshot(None, None, False, False, 0, 0, [], 0, [], 0, {}, None, 0.0)
+
+
+def new_run_id(kind):
+    return f"{kind}_{uuid.uuid4().hex[:8]}"
+
+
+class AnalysisRun:
+    """Un'analisi (video salvato o live): analyzer, serie e risultati del run"""
+
+    def __init__(self, kind, analyzer, body_mass_kg, total_frames=0):
+        self.run_id = new_run_id(kind)
+        self.kind = kind
+        self.analyzer = analyzer
+        self.body_mass_kg = body_mass_kg
+        self.total_frames = total_frames
+        self.current_frame = 0
+        self.trajectory = []
+        self.velocity = []
+        self.realtime = {}
+        self.final_results = None
+        self.analyzing = True
+        self.metrics = None  # metrics.RunTotals del worker (tempi per fase di questo run)
+        self.pause_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.snapshot = EMPTY_ANALYSIS
+        self.publish()
+
+    @classmethod
+    def completed(cls, kind, analyzer, body_mass_kg, trajectory, velocity, final_results):
+        """Run già concluso (risultati dalla cache o da un replay)"""
+        run = cls(kind, analyzer, body_mass_kg)
+        run.trajectory = list(trajectory)
+        run.velocity = list(velocity)
+        run.finish(final_results)
+        return run
+
+    # --- comandi dagli altri thread (solo Event: lo snapshot lo pubblica il worker) ---
+
+    @property
+    def paused(self):
+        return self.pause_event.is_set()
+
+    @property
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def pause(self):
+        self.pause_event.set()
+
+    def resume(self):
+        self.pause_event.clear()
+
+    def stop(self):
+        self.stop_event.set()
+        self.pause_event.clear()
+
+    # --- scritture del thread di lavoro ---
+
+    def add_sample(self, t, height, velocity=None, realtime=None):
+        self.trajectory.append({'t': round(t, 3), 'y': round(height, 2)})
+        if velocity is not None:
+            self.velocity.append({'t': round(t, 3), 'v': round(velocity, 2)})
+        if realtime is not None:
+            self.realtime = realtime
+
+    def finish(self, final_results):
+        self.final_results = final_results
+        self.analyzing = False
+        self.publish()
+
+    def publish(self):
+        """Nuovo snapshot, sostituito con un'unica assegnazione (O(1): le serie non sono copiate)"""
+        self.snapshot = AnalysisSnapshot(
+            run_id=self.run_id,
+            kind=self.kind,
+            analyzing=self.analyzing,
+            paused=self.paused,
+            current_frame=self.current_frame,
+            total_frames=self.total_frames,
+            trajectory_points=self.trajectory,
+            trajectory_count=len(self.trajectory),
+            velocity_points=self.velocity,
+            velocity_count=len(self.velocity),
+            realtime=self.realtime,
+            final_results=self.final_results,
+            published=time.time(),
+        )
+
+
+class CalibrationRun:
+    """Una calibrazione: analyzer da calibrare, statura e avanzamento"""
+
+    def __init__(self, analyzer, source, person_height_cm, max_frames=0):
+        self.run_id = new_run_id('calibration')
+        self.analyzer = analyzer
+        self.source = source
+        self.person_height_cm = person_height_cm
+        self.max_frames = max_frames
+        self.frames_checked = 0
+        self.metrics = None
+        self.stop_event = threading.Event()
+
+    @property
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,106 @@
+"""
+Formato binario colonnare per traiettoria e velocità.
+Le serie [{'t':..., 'y':...}, ...] diventano una colonna float32 per chiave:
+
+    serie:     uint8 n colonne | per colonna: uint8 lunghezza nome + nome ASCII
+               | uint32 LE numero campioni | colonne float32 LE contigue
+    payload:   b'JTRJ' | uint32 LE lunghezza header | header JSON | serie concatenate
+               (corpo opzionalmente compresso con zlib)
+
+L'header del payload contiene i metadati JSON (risultati, fasi, ...) e per ogni
+serie nome e lunghezza in byte. Usato nell'archivio dei risultati e come
+codifica alternativa delle risposte (Accept: application/octet-stream).
+"""
+
+import json
+import struct
+import zlib
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+MAGIC = b'JTRJ'
+VERSION = 1
+# I valori salvati hanno al più 3 decimali: in lettura si elimina il rumore del float32
+DECODE_DECIMALS = 4
+
+
+def encode_series(series):
+    """Lista di dict con le stesse chiavi numeriche -> bytes"""
+    series = series or []
+    columns = list(series[0].keys()) if series else []
+    parts = [struct.pack('<B', len(columns))]
+    for name in columns:
+        encoded = name.encode('ascii')
+        parts.append(struct.pack('<B', len(encoded)) + encoded)
+    parts.append(struct.pack('<I', len(series)))
+    for name in columns:
+        values = np.fromiter((np.nan if point.get(name) is None else point[name] for point in series),
+                             dtype='<f4', count=len(series))
+        parts.append(values.tobytes())
+    return b''.join(parts)
+
+
+def decode_columns(data, offset=0):
+    """bytes -> ({nome: array float32}, offset successivo)"""
+    count = data[offset]
+    offset += 1
+    names = []
+    for _ in range(count):
+        length = data[offset]
+        names.append(data[offset + 1:offset + 1 + length].decode('ascii'))
+        offset += 1 + length
+    (samples,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    columns = {}
+    for name in names:
+        columns[name] = np.frombuffer(data, dtype='<f4', count=samples, offset=offset)
+        offset += samples * 4
+    return columns, offset
+
+
+def decode_series(data):
+    """bytes -> lista di dict (formato JSON originale)"""
+    columns, _ = decode_columns(data)
+    if not columns:
+        return []
+    names = list(columns.keys())
+    rounded = []
+    for name in names:
+        values = np.round(columns[name].astype(np.float64), DECODE_DECIMALS)
+        # I valori mancanti (NaN) tornano None, come nel JSON originale
+        rounded.append([None if value != value else value for value in values.tolist()])
+    return [dict(zip(names, values)) for values in zip(*rounded)]
+
+
+def pack(meta, series, compress=False):
+    """Metadati JSON + serie nominate ({'trajectory': [...], ...}) -> payload binario"""
+    encoded = [(name, encode_series(values)) for name, values in series.items()]
+    body = b''.join(data for _, data in encoded)
+    if compress:
+        body = zlib.compress(body, 6)
+    header = json.dumps({
+        'version': VERSION,
+        'compression': 'zlib' if compress else 'none',
+        'series': [[name, len(data)] for name, data in encoded],
+        'meta': meta
+    }, separators=(',', ':')).encode('utf-8')
+    return MAGIC + struct.pack('<I', len(header)) + header + body
+
+
+def unpack(payload):
+    """Payload binario -> (metadati, {nome: lista di dict})"""
+    if payload[:4] != MAGIC:
+        raise ValueError('Payload non valido')
+    (header_length,) = struct.unpack_from('<I', payload, 4)
+    header = json.loads(payload[8:8 + header_length].decode('utf-8'))
+    body = payload[8 + header_length:]
+    if header.get('compression') == 'zlib':
+        body = zlib.decompress(body)
+    series = {}
+    offset = 0
+    for name, length in header['series']:
+        series[name] = decode_series(body[offset:offset + length])
+        offset += length
+    return header.get('meta'), series
@@ -0,0 +1,110 @@
+"""
+Sessioni indipendenti nello stesso backend (una per postazione o per attività).
+
+Ogni sessione ha il proprio stato (video, analyzer, registrazione, run di
+calibrazione e analisi, impostazioni dell'atleta), il proprio lock e il proprio
+frame di anteprima. Le richieste HTTP scelgono la sessione con l'header
+X-Session-Id o con ?session=; senza indicazione si usa 'default', quindi un
+client che non conosce le sessioni funziona come prima.
+
+I thread di lavoro non hanno una richiesta: il target viene legato alla sessione
+che lo ha avviato con bind() (o il blocco con activate()), e current() la
+restituisce dentro il thread.
+
+    registry = SessionRegistry(new_state)
+    session = registry.get('camera_2')            # creata al primo uso
+    job_target = bind(session, analysis_loop)     # eseguito nella sessione
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from run_state import Published
+
+DEFAULT_SESSION = 'default'
+MAX_SESSIONS = 8
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+_local = threading.local()
+
+
+class SessionError(ValueError):
+    """Id di sessione non valido o troppe sessioni aperte"""
+
+
+class Session:
+    def __init__(self, session_id, state):
+        self.session_id = session_id
+        self.state = state
+        self.lock = threading.RLock()
+        # Ultimo frame JPEG (base64) di anteprima, calibrazione o analisi: scritto dai worker senza lock
+        self.video_frame = Published()
+        self.created = time.time()
+        self.last_seen = self.created
+
+
+class SessionRegistry:
+    """Sessioni aperte per id; new_state() crea lo stato iniziale di una sessione"""
+
+    def __init__(self, new_state, max_sessions=MAX_SESSIONS):
+        self.new_state = new_state
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.default = self.get(DEFAULT_SESSION)
+
+    def get(self, session_id, create=True):
+        """Sessione con questo id (creata se manca). SessionError se l'id non è valido o si supera il limite"""
+        session_id = session_id or DEFAULT_SESSION
+        session = self.sessions.get(session_id)
+        if session is None:
+            if not create:
+                return None
+            if not SESSION_ID_PATTERN.match(session_id):
+                raise SessionError('Id sessione non valido (lettere, cifre, - e _, massimo 32 caratteri)')
+            with self.lock:
+                session = self.sessions.get(session_id)
+                if session is None:
+                    if len(self.sessions) >= self.max_sessions:
+                        raise SessionError(f"Troppe sessioni aperte (massimo {self.max_sessions})")
+                    session = Session(session_id, self.new_state())
+                    self.sessions[session_id] = session
+        session.last_seen = time.time()
+        return session
+
+    def list(self):
+        with self.lock:
+            return list(self.sessions.values())
+
+    def remove(self, session_id):
+        """Toglie la sessione dal registro (non la default); None se non esiste"""
+        if session_id == DEFAULT_SESSION:
+            raise SessionError('La sessione default non si può chiudere')
+        with self.lock:
+            return self.sessions.pop(session_id, None)
+
+
+def current():
+    """Sessione legata al thread corrente da bind() (None fuori da un thread di lavoro)"""
+    return getattr(_local, 'session', None)
+
+
+@contextmanager
+def activate(session):
+    """Blocco eseguito con current() == session (es. consumatori della pipeline di cattura)"""
+    previous = current()
+    _local.session = session
+    try:
+        yield session
+    finally:
+        _local.session = previous
+
+
+def bind(session, target):
+    """target eseguito con current() == session (per i lavori avviati da una richiesta)"""
+    def run_in_session(*args, **kwargs):
+        with activate(session):
+            return target(*args, **kwargs)
+    return run_in_session
@@ -0,0 +1,288 @@
+"""
+Gestione dello spazio della cartella degli upload.
+Ogni video (caricato o registrato) è una voce insieme ai file derivati salvati
+accanto con il suo nome come prefisso (miniature, proxy, sidecar dei timestamp, ...).
+Per ogni voce si tiene l'ultimo accesso; quando la dimensione totale supera la
+quota, un thread in background cancella le voci usate meno di recente.
+Le voci protette (video corrente, registrazione o job in corso) non vengono mai toccate.
+
+Le sottocartelle di file derivati non legati a un singolo video (cache delle
+analisi, trace, profili) contano nella stessa quota come voci "derivate": un
+elemento per file o cartella di primo livello, con ultimo accesso = data di
+modifica. Sono ricalcolabili e vengono sfrattate per prime, sempre in ordine LRU.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+ACCESS_FILENAME = 'access.json'
+DEFAULT_QUOTA_BYTES = 20 * 1024 * 1024 * 1024
+EVICTION_INTERVAL = 60.0  # Secondi tra due controlli periodici
+ACCESS_SAVE_INTERVAL = 5.0  # Gli accessi sono salvati su disco al massimo ogni 5s
+DERIVED_MIN_AGE = 60.0  # Derivati modificati più di recente (trace o profilo in scrittura) non si toccano
+
+
+def _tree_size(path):
+    """(byte, ultima modifica) di un file o di una cartella; (None, None) se non esiste più"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    if not os.path.isdir(path):
+        return stat.st_size, stat.st_mtime
+    size, modified = 0, stat.st_mtime
+    for root, _, files in os.walk(path):
+        for filename in files:
+            try:
+                file_stat = os.stat(os.path.join(root, filename))
+            except OSError:
+                continue
+            size += file_stat.st_size
+            modified = max(modified, file_stat.st_mtime)
+    return size, modified
+
+
+class StorageManager:
+    """
+    folder: cartella gestita
+    is_video(name): True se il file è un video (una voce)
+    protected(): insieme dei percorsi da non sfrattare (video o derivati)
+    on_evict(path): callback prima della cancellazione di una voce (es. chiudere i decoder)
+    derived: sottocartelle di file derivati conteggiate nella quota (es. 'analysis_cache')
+    """
+
+    def __init__(self, folder, is_video, quota_bytes=DEFAULT_QUOTA_BYTES,
+                 protected=None, on_evict=None, interval=EVICTION_INTERVAL, derived=()):
+        self.folder = folder
+        self.is_video = is_video
+        self.derived = tuple(derived)
+        self.quota_bytes = quota_bytes
+        self.protected = protected or (lambda: set())
+        self.on_evict = on_evict
+        self.interval = interval
+        self.access_path = os.path.join(folder, ACCESS_FILENAME)
+        self.access = None
+        self.access_dirty = False
+        self.last_save = 0.0
+        self.evicted_entries = 0
+        self.evicted_derived = 0
+        self.evicted_bytes = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    # --- Ultimo accesso ---
+
+    def _load_access(self):
+        if self.access is None:
+            try:
+                with open(self.access_path, 'r', encoding='utf-8') as f:
+                    self.access = json.load(f)
+            except (OSError, ValueError):
+                self.access = {}
+        return self.access
+
+    def _save_access(self, force=False):
+        if not self.access_dirty:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_save < ACCESS_SAVE_INTERVAL:
+            return
+        tmp_path = f"{self.access_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.access, f)
+            os.replace(tmp_path, self.access_path)
+            self.access_dirty = False
+            self.last_save = now
+        except OSError as e:
+            print(f"Errore salvataggio accessi: {e}")
+
+    def touch(self, path):
+        """Registra un accesso al video (o a un suo derivato)"""
+        if not path:
+            return
+        name = self._entry_name(os.path.basename(path))
+        with self.lock:
+            self._load_access()[name] = time.time()
+            self.access_dirty = True
+            self._save_access()
+
+    def _entry_name(self, filename):
+        """Nome del video a cui appartiene un file (derivati: '<video>.<suffisso>')"""
+        # Il video è il prefisso più corto con estensione video
+        parts = filename.split('.')
+        for i in range(2, len(parts) + 1):
+            candidate = '.'.join(parts[:i])
+            if self.is_video(candidate):
+                return candidate
+        return filename
+
+    # --- Inventario ---
+
+    def entries(self):
+        """Voci presenti su disco: nome -> {size, files, last_access}"""
+        entries = {}
+        try:
+            names = os.listdir(self.folder)
+        except OSError:
+            return entries
+        with self.lock:
+            access = dict(self._load_access())
+
+        for filename in names:
+            path = os.path.join(self.folder, filename)
+            # Upload ancora in corso: non fa parte dell'inventario
+            if filename.endswith('.part'):
+                continue
+            entry_name = self._entry_name(filename)
+            if not self.is_video(entry_name):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if not os.path.isfile(path):
+                continue
+            entry = entries.setdefault(entry_name, {'size': 0, 'files': [], 'last_access': 0.0})
+            entry['size'] += stat.st_size
+            entry['files'].append(filename)
+            # Senza accessi registrati vale la data di modifica più recente
+            entry['last_access'] = max(entry['last_access'], access.get(entry_name, stat.st_mtime))
+        return entries
+
+    def derived_items(self):
+        """Derivati delle sottocartelle: [{path, folder, size, last_access}]"""
+        items = []
+        for folder in self.derived:
+            root = os.path.join(self.folder, folder)
+            try:
+                names = os.listdir(root)
+            except OSError:
+                continue
+            for name in names:
+                # Scritture in corso (rinominate solo a fine scrittura)
+                if name.endswith(('.part', '.tmp')):
+                    continue
+                path = os.path.join(root, name)
+                size, modified = _tree_size(path)
+                if size is None:
+                    continue
+                items.append({'path': path, 'folder': folder, 'size': size, 'last_access': modified})
+        return items
+
+    def usage(self):
+        entries = self.entries()
+        derived = self.derived_items()
+        videos_bytes = sum(entry['size'] for entry in entries.values())
+        derived_bytes = sum(item['size'] for item in derived)
+        by_folder = {folder: {'size': 0, 'items': 0} for folder in self.derived}
+        for item in derived:
+            by_folder[item['folder']]['size'] += item['size']
+            by_folder[item['folder']]['items'] += 1
+        return {
+            'quota_bytes': self.quota_bytes,
+            'used_bytes': videos_bytes + derived_bytes,
+            'videos_bytes': videos_bytes,
+            'derived_bytes': derived_bytes,
+            'entries': len(entries),
+            'derived': by_folder,
+            'evicted_entries': self.evicted_entries,
+            'evicted_derived': self.evicted_derived,
+            'evicted_bytes': self.evicted_bytes,
+            'videos': sorted(
+                ({'name': name, 'size': entry['size'], 'files': len(entry['files']),
+                  'last_access': entry['last_access']} for name, entry in entries.items()),
+                key=lambda item: item['last_access'], reverse=True)
+        }
+
+    # --- Sfratto ---
+
+    def set_quota(self, quota_bytes):
+        self.quota_bytes = max(0, int(quota_bytes))
+        self.request_eviction()
+
+    def evict(self):
+        """Cancella derivati e poi voci meno usati finché la dimensione rientra nella quota"""
+        entries = self.entries()
+        derived = self.derived_items()
+        total = sum(entry['size'] for entry in entries.values()) + sum(item['size'] for item in derived)
+        if total <= self.quota_bytes:
+            return []
+
+        protected_paths = {os.path.abspath(path) for path in self.protected() if path}
+        protected = {self._entry_name(os.path.basename(path)) for path in protected_paths}
+
+        # Prima i derivati (ricalcolabili), dal meno usato di recente
+        now = time.time()
+        derived_removed = 0
+        for item in sorted(derived, key=lambda item: item['last_access']):
+            if total <= self.quota_bytes:
+                break
+            if os.path.abspath(item['path']) in protected_paths or now - item['last_access'] < DERIVED_MIN_AGE:
+                continue
+            try:
+                if os.path.isdir(item['path']):
+                    shutil.rmtree(item['path'])
+                else:
+                    os.remove(item['path'])
+            except OSError as e:
+                print(f"Errore cancellazione {item['path']}: {e}")
+                continue
+            total -= item['size']
+            derived_removed += 1
+            with self.lock:
+                self.evicted_derived += 1
+                self.evicted_bytes += item['size']
+
+        evicted = []
+        for name, entry in sorted(entries.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.quota_bytes:
+                break
+            if name in protected:
+                continue
+            path = os.path.join(self.folder, name)
+            if self.on_evict:
+                self.on_evict(path)
+            for filename in entry['files']:
+                try:
+                    os.remove(os.path.join(self.folder, filename))
+                except OSError as e:
+                    print(f"Errore cancellazione {filename}: {e}")
+            removed = entry['size']
+            total -= removed
+            evicted.append(name)
+            with self.lock:
+                self._load_access().pop(name, None)
+                self.access_dirty = True
+                self.evicted_entries += 1
+                self.evicted_bytes += removed
+        with self.lock:
+            self._save_access(force=True)
+        if evicted or derived_removed:
+            print(f"Storage: sfrattati {len(evicted)} video e {derived_removed} derivati, {total} byte in uso")
+        return evicted
+
+    def request_eviction(self):
+        """Chiede un controllo anticipato (es. dopo un upload o una registrazione)"""
+        self.wakeup.set()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self._run, name='storage', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.evict()
+            except Exception as e:
+                print(f"Errore gestione storage: {e}")
+            with self.lock:
+                self._save_access(force=True)
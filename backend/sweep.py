@@ -0,0 +1,222 @@
+"""
+Sweep delle soglie di rilevamento sui trace dei salti (nessuna nuova inferenza).
+Ogni combinazione della griglia è applicata a ogni trace con il replay del
+JumpAnalyzer e le metriche di jump_metrics; il lavoro è distribuito su più
+processi (un task = un trace x un blocco di combinazioni).
+
+Per ogni combinazione il report contiene, per metrica, media e deviazione
+standard sui salti, differenza media rispetto alle soglie registrate e quota di
+salti in cui il valore cambia: quanto è sensibile ogni metrica a ogni impostazione.
+
+run_sweep è eseguito come lavoro in background (jobs.py): riporta l'avanzamento
+per task completato e si ferma se il lavoro viene annullato. I processi di tutti
+gli sweep in corso sono limitati da sweep_processes (MAX_SWEEP_PROCESSES).
+"""
+
+import itertools
+import math
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from analysis_trace import read_trace, replay
+from jobs import cancelled, report_progress
+from jump_analyzer import DEFAULT_THRESHOLDS
+from jump_metrics import build_final_results, enhance_results
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+MAX_COMBINATIONS = 2000
+MAX_EVALUATIONS = 200000  # Combinazioni x trace per singolo sweep
+MAX_SWEEP_PROCESSES = min(os.cpu_count() or 1, 61)  # Totale per tutti gli sweep contemporanei
+CANCEL_POLL_SECONDS = 0.5
+
+SWEEP_METRICS = (
+    'max_height', 'flight_time', 'contact_time', 'eccentric_time', 'concentric_time',
+    'takeoff_velocity', 'estimated_power', 'calculated_contact_time', 'calculated_eccentric_time',
+    'calculated_concentric_time', 'calculated_takeoff_velocity', 'calculated_estimated_power',
+)
+
+
+class SweepError(ValueError):
+    """Griglia o richiesta di sweep non valida"""
+
+
+class ProcessBudget:
+    """Processi in uso da tutti gli sweep: ognuno ottiene quelli liberi (almeno uno, altrimenti attende)"""
+
+    def __init__(self, total):
+        self.total = total
+        self.used = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, wanted):
+        """Processi concessi (0 se il lavoro viene annullato durante l'attesa)"""
+        with self.condition:
+            while self.used >= self.total:
+                if cancelled():
+                    return 0
+                self.condition.wait(CANCEL_POLL_SECONDS)
+            granted = min(wanted, self.total - self.used)
+            self.used += granted
+            return granted
+
+    def release(self, count):
+        with self.condition:
+            self.used -= count
+            self.condition.notify_all()
+
+
+sweep_processes = ProcessBudget(MAX_SWEEP_PROCESSES)
+
+
+def expand_grid(grid):
+    """{"jump_start": [0.03, 0.05], ...} -> lista di dict di soglie (prodotto cartesiano)"""
+    if not isinstance(grid, dict) or not grid:
+        raise SweepError('Griglia vuota')
+    unknown = set(grid) - set(DEFAULT_THRESHOLDS)
+    if unknown:
+        raise SweepError(f"Parametri sconosciuti: {sorted(unknown)}")
+    axes = []
+    for name, values in grid.items():
+        if not isinstance(values, list) or not values:
+            raise SweepError(f"Valori non validi per {name}")
+        cast = type(DEFAULT_THRESHOLDS[name])
+        try:
+            axes.append([(name, cast(value)) for value in values])
+        except (TypeError, ValueError):
+            raise SweepError(f"Valori non validi per {name}")
+    count = math.prod(len(axis) for axis in axes)
+    if count > MAX_COMBINATIONS:
+        raise SweepError(f"Troppe combinazioni ({count}, massimo {MAX_COMBINATIONS})")
+    return [dict(combination) for combination in itertools.product(*axes)]
+
+
+def _metrics(analyzer, trajectory, body_mass):
+    final_results = build_final_results(analyzer, body_mass)
+    results, _ = enhance_results(final_results, trajectory, body_mass)
+    values = [float(results[metric]) for metric in SWEEP_METRICS]
+    return values + [1.0 if results['jump_detected'] else 0.0]
+
+
+def evaluate_trace(path, combinations):
+    """
+    Eseguito nei processi di lavoro: replay del trace con le soglie registrate
+    (riferimento) e con ogni combinazione. Restituisce (riferimento, [valori per combinazione]).
+    """
+    meta, records = read_trace(path)
+    body_mass = meta.get('body_mass_kg') or 70.0
+    analyzer, trajectory, _, _ = replay(meta, records)
+    reference = _metrics(analyzer, trajectory, body_mass)
+    rows = []
+    for thresholds in combinations:
+        analyzer, trajectory, _, _ = replay(meta, records, thresholds)
+        rows.append(_metrics(analyzer, trajectory, body_mass))
+    return reference, rows
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def check_sweep(traces, grid):
+    """Combinazioni della griglia; SweepError se la richiesta non è valida o troppo grande"""
+    combinations = expand_grid(grid)
+    if not traces:
+        raise SweepError('Nessun trace da analizzare')
+    if len(combinations) * len(traces) > MAX_EVALUATIONS:
+        raise SweepError(f"Sweep troppo grande ({len(combinations)} combinazioni x {len(traces)} salti)")
+    return combinations
+
+
+def run_sweep(traces, grid, workers=None):
+    """
+    traces: {trace_id: percorso}. Restituisce il report per combinazione
+    (None se il lavoro viene annullato). workers=1 esegue tutto nel processo corrente.
+    """
+    start_time = time.perf_counter()
+    combinations = check_sweep(traces, grid)
+    workers = max(1, min(workers or MAX_SWEEP_PROCESSES, MAX_SWEEP_PROCESSES))
+    # Blocchi di combinazioni in modo da avere qualche task per processo anche con pochi trace
+    size = max(1, math.ceil(len(combinations) * len(traces) / (workers * 4)))
+    tasks = [(trace_id, start, chunk)
+             for trace_id in traces
+             for start, chunk in zip(range(0, len(combinations), size), _chunks(combinations, size))]
+
+    columns = len(SWEEP_METRICS) + 1
+    values = np.full((len(combinations), len(traces), columns), np.nan)
+    references = np.full((len(traces), columns), np.nan)
+    index = {trace_id: i for i, trace_id in enumerate(traces)}
+    errors = {}
+
+    def collect(task, outcome):
+        trace_id, start, chunk = task
+        reference, rows = outcome
+        references[index[trace_id]] = reference
+        values[start:start + len(chunk), index[trace_id]] = rows
+
+    if workers == 1:
+        for done, task in enumerate(tasks):
+            if cancelled():
+                return None
+            try:
+                collect(task, evaluate_trace(traces[task[0]], task[2]))
+            except (OSError, ValueError) as e:
+                errors[task[0]] = str(e)
+            report_progress(done + 1, len(tasks))
+    else:
+        # Processi concessi dal budget globale: sweep contemporanei non li moltiplicano
+        workers = sweep_processes.acquire(workers)
+        if not workers:
+            return None
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(evaluate_trace, traces[task[0]], task[2]): task for task in tasks}
+                pending = set(futures)
+                while pending:
+                    if cancelled():
+                        for future in pending:
+                            future.cancel()
+                        return None
+                    finished, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        try:
+                            collect(futures[future], future.result())
+                        except (OSError, ValueError) as e:
+                            errors[futures[future][0]] = str(e)
+                    report_progress(len(tasks) - len(pending), len(tasks))
+        finally:
+            sweep_processes.release(workers)
+
+    valid = ~np.isnan(references[:, 0])
+    return {
+        'parameters': sorted(grid),
+        'combinations': len(combinations),
+        'jumps': int(valid.sum()),
+        'workers': workers,
+        'reference': _summary(references[valid], references[valid]),
+        'results': [{'thresholds': {**DEFAULT_THRESHOLDS, **thresholds},
+                     'metrics': _summary(values[i][valid], references[valid])}
+                    for i, thresholds in enumerate(combinations)],
+        'errors': errors,
+        'elapsed_s': round(time.perf_counter() - start_time, 3),
+    }
+
+
+def _summary(values, references):
+    """Per metrica: media, SD, differenza media dal riferimento, quota di salti cambiati"""
+    summary = {}
+    if not len(values):
+        return summary
+    for column, metric in enumerate(SWEEP_METRICS + ('jump_detected',)):
+        current = values[:, column]
+        delta = current - references[:, column]
+        summary[metric] = {
+            'mean': round(float(current.mean()), 4),
+            'sd': round(float(current.std(ddof=1)), 4) if len(current) > 1 else 0.0,
+            'delta_mean': round(float(delta.mean()), 4),
+            'changed': round(float(np.mean(np.abs(delta) > 1e-9)), 3),
+        }
+    return summary
@@ -0,0 +1,96 @@
+"""
+Miniature per lo scrubbing dei risultati.
+Dopo upload o registrazione un job in background decodifica il video una volta
+e salva accanto al file un unico binario con tutte le miniature JPEG:
+
+    b'JTHB' | uint32 LE lunghezza header | header JSON | dati JPEG concatenati
+
+L'header contiene dimensioni, passo (stride) e offset/lunghezza di ogni miniatura,
+così il frontend scarica un solo file (cacheabile) e scorre i frame in locale.
+"""
+
+import json
+import math
+import os
+import struct
+
+from file_jobs import BuildCancelled, FileJobs
+from jobs import cancelled
+from lazy_imports import lazy_module
+
+cv2 = lazy_module('cv2')
+
+MAGIC = b'JTHB'
+THUMB_WIDTH = 160
+THUMB_QUALITY = 60
+MAX_THUMBNAILS = 3000  # Oltre, una miniatura ogni `stride` frame
+
+
+def thumbnails_path(video_path):
+    return f"{video_path}.thumbs.bin"
+
+
+def build_thumbnails(video_path):
+    """Decodifica il video in sequenza e scrive il file delle miniature"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError("Impossibile aprire il video")
+
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        stride = max(1, math.ceil(total / MAX_THUMBNAILS)) if total > 0 else 1
+        chunks = []
+        offsets = []
+        size = None
+        offset = 0
+        index = 0
+
+        while True:
+            if cancelled():
+                raise BuildCancelled()
+            # grab() senza decodifica per i frame saltati
+            if index % stride:
+                if not cap.grab():
+                    break
+                index += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            h, w = frame.shape[:2]
+            if size is None:
+                size = (THUMB_WIDTH, max(1, round(h * THUMB_WIDTH / w)))
+            thumb = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            _, buffer = cv2.imencode('.jpg', thumb, [cv2.IMWRITE_JPEG_QUALITY, THUMB_QUALITY])
+            data = buffer.tobytes()
+            chunks.append(data)
+            offsets.append([offset, len(data)])
+            offset += len(data)
+            index += 1
+    finally:
+        cap.release()
+
+    header = json.dumps({
+        'version': 1,
+        'count': len(chunks),
+        'width': size[0] if size else 0,
+        'height': size[1] if size else 0,
+        'stride': stride,
+        'total_frames': index,
+        'offsets': offsets
+    }).encode('utf-8')
+
+    # Scrittura atomica: il file servito è sempre completo
+    path = thumbnails_path(video_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for data in chunks:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+thumbnail_jobs = FileJobs('thumbnails', build_thumbnails, thumbnails_path)
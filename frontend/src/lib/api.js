@@ -1,3 +1,5 @@
+import { unpackSeries } from './series.js';
+
 // Determine backend URL based on environment
 // When opening index.html directly (file://), use absolute URL
 // When served from a server, could use relative paths (but Flask is on different port)
@@ -12,9 +14,22 @@ export const getBackendUrl = () => {
 
 const BASE = getBackendUrl();
 
+// Sessione del backend di questa postazione (header X-Session-Id); senza, il backend usa 'default'
+export const getSessionId = () => {
+  if (typeof window !== 'undefined' && window.BACKEND_SESSION) {
+    return window.BACKEND_SESSION;
+  }
+  return null;
+};
+
+export const sessionHeaders = (headers = {}) => {
+  const sessionId = getSessionId();
+  return sessionId ? { ...headers, 'X-Session-Id': sessionId } : headers;
+};
+
 async function jsonFetch(path, options = {}) {
   const url = `${BASE}${path}`;
-  const res = await fetch(url, options);
+  const res = await fetch(url, { ...options, headers: sessionHeaders(options.headers) });
   try {
     return await res.json();
   } catch (_) {
@@ -23,6 +38,7 @@ async function jsonFetch(path, options = {}) {
 }
 
 export const api = {
+  health() { return jsonFetch('/api/health'); },
   setCamera(index) {
     return jsonFetch('/api/settings/camera', {
       method: 'POST',
@@ -30,6 +46,93 @@ export const api = {
       body: JSON.stringify({ index: Number(index) })
     });
   },
+  cameraModes(index, refresh = false) {
+    return jsonFetch(`/api/cameras/${Number(index)}/modes${refresh ? '?refresh=1' : ''}`);
+  },
+  setCameraMode(mode) {
+    return jsonFetch('/api/settings/camera_mode', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(mode)
+    });
+  },
+  setAnalysisCache(options) {
+    return jsonFetch('/api/settings/analysis_cache', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(options)
+    });
+  },
+  setMetrics(enabled) {
+    return jsonFetch('/api/settings/metrics', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ enabled: !!enabled })
+    });
+  },
+  setProfiling(enabled) {
+    return jsonFetch('/api/settings/profiling', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ enabled: !!enabled })
+    });
+  },
+  setTrace(enabled) {
+    return jsonFetch('/api/settings/trace', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ enabled: !!enabled })
+    });
+  },
+  replayAnalysis({ traceId = null, thresholds = null, apply = false } = {}) {
+    return jsonFetch('/api/analysis/replay', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ trace_id: traceId, thresholds, apply })
+    });
+  },
+  sweepThresholds({ grid, traceIds = null, athleteId = null, testId = null, from = null, to = null, workers = null }) {
+    return jsonFetch('/api/analysis/sweep', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ grid, trace_ids: traceIds, athlete_id: athleteId, test_id: testId, from, to, workers })
+    });
+  },
+  listProfiles() { return jsonFetch('/api/profiles'); },
+  listJobs(kind) { return jsonFetch(`/api/jobs${kind ? `?kind=${encodeURIComponent(kind)}` : ''}`); },
+  // Stato di un lavoro e, a lavoro concluso, il suo risultato (es. report dello sweep)
+  getJob(jobId) { return jsonFetch(`/api/jobs/${encodeURIComponent(jobId)}`); },
+  cancelJob(jobId) {
+    return jsonFetch(`/api/jobs/${encodeURIComponent(jobId)}/cancel`, { method: 'POST' });
+  },
+  listSessions() { return jsonFetch('/api/sessions'); },
+  createSession(sessionId) {
+    return jsonFetch('/api/sessions', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ session_id: sessionId })
+    });
+  },
+  closeSession(sessionId) {
+    return jsonFetch(`/api/sessions/${encodeURIComponent(sessionId)}`, { method: 'DELETE' });
+  },
+  setInferenceLimit(maxConcurrent) {
+    return jsonFetch('/api/settings/inference', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ max_concurrent: Number(maxConcurrent) })
+    });
+  },
+  profileUrl(profileId, file = 'collapsed') {
+    return `${BASE}/api/profiles/${encodeURIComponent(profileId)}/${file}`;
+  },
+  setProxy(enabled) {
+    return jsonFetch('/api/settings/proxy', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ enabled: Boolean(enabled) })
+    });
+  },
   setFps(fps) {
     return jsonFetch('/api/settings/fps', {
       method: 'POST',
@@ -51,17 +154,36 @@ export const api = {
       body: JSON.stringify({ mass })
     });
   },
-  startRecording() { return jsonFetch('/api/recording/start', { method: 'POST' }); },
+  startRecording(options = {}) {
+    return jsonFetch('/api/recording/start', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(options)
+    });
+  },
   stopRecording() { return jsonFetch('/api/recording/stop', { method: 'POST' }); },
+  recordingStatus() { return jsonFetch('/api/recording/status'); },
   startCalibration() { return jsonFetch('/api/calibration/start', { method: 'POST' }); },
   calibrationStatus() { return jsonFetch('/api/calibration/status'); },
   startAnalysis() { return jsonFetch('/api/analysis/start', { method: 'POST' }); },
   analysisStatus() { return jsonFetch('/api/analysis/status'); },
-  analysisResults() { return jsonFetch('/api/analysis/results'); },
+  // Risultati con traiettoria/velocità in formato binario colonnare (più compatto e veloce da leggere)
+  async analysisResults() {
+    try {
+      const res = await fetch(`${BASE}/api/analysis/results`, { headers: sessionHeaders({ 'Accept': 'application/octet-stream' }) });
+      const type = res.headers.get('Content-Type') || '';
+      if (type.includes('application/octet-stream')) return await unpackSeries(await res.arrayBuffer());
+      return await res.json();
+    } catch (_) {
+      return {};
+    }
+  },
   pauseAnalysis() { return jsonFetch('/api/analysis/pause', { method: 'POST' }); },
   resumeAnalysis() { return jsonFetch('/api/analysis/resume', { method: 'POST' }); },
   stopAnalysis() { return jsonFetch('/api/analysis/stop', { method: 'POST' }); },
   videoFrame() { return jsonFetch('/api/video/frame'); },
+  historyJumps(filters = {}) { return jsonFetch(`/api/history/jumps?${new URLSearchParams(filters)}`); },
+  historySummary(filters = {}) { return jsonFetch(`/api/history/summary?${new URLSearchParams(filters)}`); },
   analysisData() { return jsonFetch('/api/analysis/data'); },
   
   /**
@@ -0,0 +1,66 @@
+// Formato binario colonnare delle serie (vedi backend/series_codec.py):
+// 'JTRJ' | uint32 LE lunghezza header | header JSON | serie (opzionalmente zlib)
+// serie: uint8 n colonne | (uint8 len + nome)* | uint32 LE campioni | colonne float32 LE
+const MAGIC = 'JTRJ';
+const DECIMALS = 1e4;
+
+function decodeSeries(bytes) {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const decoder = new TextDecoder();
+  let offset = 0;
+  const count = view.getUint8(offset++);
+  const names = [];
+  for (let i = 0; i < count; i++) {
+    const length = view.getUint8(offset++);
+    names.push(decoder.decode(bytes.subarray(offset, offset + length)));
+    offset += length;
+  }
+  const samples = view.getUint32(offset, true);
+  offset += 4;
+  const columns = names.map(() => {
+    // Copia allineata: l'offset nel buffer non è necessariamente multiplo di 4
+    const column = new Float32Array(bytes.slice(offset, offset + samples * 4).buffer);
+    offset += samples * 4;
+    return column;
+  });
+
+  const points = new Array(samples);
+  for (let i = 0; i < samples; i++) {
+    const point = {};
+    for (let c = 0; c < names.length; c++) {
+      const value = columns[c][i];
+      point[names[c]] = Number.isNaN(value) ? null : Math.round(value * DECIMALS) / DECIMALS;
+    }
+    points[i] = point;
+  }
+  return points;
+}
+
+async function inflate(bytes) {
+  const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+  return new Uint8Array(await new Response(stream).arrayBuffer());
+}
+
+/**
+ * Decodifica un payload binario delle serie.
+ * @param {ArrayBuffer} buffer
+ * @returns {Promise<Object>} metadati del payload con le serie aggiunte per nome
+ */
+export async function unpackSeries(buffer) {
+  const bytes = new Uint8Array(buffer);
+  const decoder = new TextDecoder();
+  if (decoder.decode(bytes.subarray(0, 4)) !== MAGIC) throw new Error('Payload non valido');
+
+  const headerLength = new DataView(buffer).getUint32(4, true);
+  const header = JSON.parse(decoder.decode(bytes.subarray(8, 8 + headerLength)));
+  let body = bytes.subarray(8 + headerLength);
+  if (header.compression === 'zlib') body = await inflate(body);
+
+  const result = { ...header.meta };
+  let offset = 0;
+  for (const [name, length] of header.series) {
+    result[name] = decodeSeries(body.subarray(offset, offset + length));
+    offset += length;
+  }
+  return result;
+}
@@ -0,0 +1,44 @@
+import { getBackendUrl, sessionHeaders } from './api.js';
+
+// Formato (vedi backend/thumbnails.py):
+// 'JTHB' | uint32 LE lunghezza header | header JSON | JPEG concatenati
+const MAGIC = 'JTHB';
+
+/**
+ * Scarica le miniature del video corrente in un'unica richiesta.
+ * @returns {Promise<Object|null>} { header, urlAt(frameIndex), dispose() } oppure null se non pronte
+ */
+export async function loadThumbnails() {
+  const res = await fetch(`${getBackendUrl()}/api/video/thumbnails`, { headers: sessionHeaders() });
+  const type = res.headers.get('Content-Type') || '';
+  if (!res.ok || !type.includes('application/octet-stream')) return null;
+
+  const buffer = await res.arrayBuffer();
+  const view = new DataView(buffer);
+  const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4));
+  if (magic !== MAGIC) return null;
+
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const dataStart = 8 + headerLength;
+  const urls = new Map();
+
+  return {
+    header,
+    // URL (object URL creato al primo uso) della miniatura più vicina al frame
+    urlAt(frameIndex) {
+      const i = Math.min(header.count - 1, Math.max(0, Math.round(frameIndex / header.stride)));
+      if (i < 0) return null;
+      if (!urls.has(i)) {
+        const [offset, length] = header.offsets[i];
+        const blob = new Blob([new Uint8Array(buffer, dataStart + offset, length)], { type: 'image/jpeg' });
+        urls.set(i, URL.createObjectURL(blob));
+      }
+      return urls.get(i);
+    },
+    dispose() {
+      urls.forEach(url => URL.revokeObjectURL(url));
+      urls.clear();
+    }
+  };
+}